@@ -0,0 +1,29 @@
+"""unique (port, sensor_id) on sensor_configs
+
+Revision ID: 2e6f1d9a4c57
+Revises: 9c4a7f3e2b18
+Create Date: 2026-10-18 09:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2e6f1d9a4c57'
+down_revision = '9c4a7f3e2b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 已存在重复数据时需先清理，否则约束创建失败
+    with op.batch_alter_table('sensor_configs') as batch_op:
+        batch_op.create_unique_constraint(
+            'uq_sensor_configs_port_sensor_id', ['port', 'sensor_id']
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('sensor_configs') as batch_op:
+        batch_op.drop_constraint('uq_sensor_configs_port_sensor_id', type_='unique')
@@ -0,0 +1,33 @@
+"""sensor config bundles
+
+Revision ID: 4f8a2c6e9d13
+Revises: 7d3b9e5c1f62
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f8a2c6e9d13'
+down_revision = '7d3b9e5c1f62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 已有串口的配置包在首次下载时构建
+    op.create_table(
+        'sensor_config_bundles',
+        sa.Column('port', sa.String(), nullable=False),
+        sa.Column('format', sa.String(), nullable=False),
+        sa.Column('encoding', sa.String(), nullable=False),
+        sa.Column('revision', sa.Integer(), nullable=False),
+        sa.Column('content', sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint('port', 'format', 'encoding'),
+    )
+
+
+def downgrade():
+    op.drop_table('sensor_config_bundles')
@@ -0,0 +1,66 @@
+"""initial schema
+
+Revision ID: 5b2d8e1f0a31
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2d8e1f0a31'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('account', sa.String(), nullable=False),
+        sa.Column('password', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('company_name', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_users_account'), 'users', ['account'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+
+    op.create_table(
+        'sensor_configs',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('port', sa.String(), nullable=False),
+        sa.Column('sensor_id', sa.Integer(), nullable=False),
+        sa.Column('sensor_name', sa.String(), nullable=False),
+        sa.Column('model_token', sa.String(), nullable=False),
+        sa.Column('model_name', sa.String(), nullable=False),
+        sa.Column('model_fields', sa.JSON(), nullable=False),
+        sa.Column('creator_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updater_id', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_sensor_configs_id'), 'sensor_configs', ['id'], unique=False)
+
+    op.create_table(
+        'sensor_config_port_revisions',
+        sa.Column('port', sa.String(), nullable=False),
+        sa.Column('revision', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('port'),
+    )
+
+
+def downgrade():
+    op.drop_table('sensor_config_port_revisions')
+    op.drop_index(op.f('ix_sensor_configs_id'), table_name='sensor_configs')
+    op.drop_table('sensor_configs')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_account'), table_name='users')
+    op.drop_table('users')
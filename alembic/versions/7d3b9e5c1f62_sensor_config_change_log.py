@@ -0,0 +1,63 @@
+"""sensor config change log and tombstones
+
+Revision ID: 7d3b9e5c1f62
+Revises: 2e6f1d9a4c57
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3b9e5c1f62'
+down_revision = '2e6f1d9a4c57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('sensor_configs') as batch_op:
+        batch_op.add_column(sa.Column('revision', sa.BigInteger(), server_default='0', nullable=False))
+    op.create_index('ix_sensor_configs_revision', 'sensor_configs', ['revision'], unique=False)
+    op.create_index('ix_sensor_configs_port_revision', 'sensor_configs', ['port', 'revision'], unique=False)
+
+    op.create_table(
+        'sensor_config_change_log',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('revision', sa.BigInteger(), nullable=False),
+        sa.Column('compacted_revision', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'sensor_config_tombstones',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('config_id', sa.Integer(), nullable=False),
+        sa.Column('port', sa.String(), nullable=False),
+        sa.Column('sensor_id', sa.Integer(), nullable=False),
+        sa.Column('revision', sa.BigInteger(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_sensor_config_tombstones_revision', 'sensor_config_tombstones', ['revision'], unique=False)
+    op.create_index(
+        'ix_sensor_config_tombstones_port_revision', 'sensor_config_tombstones', ['port', 'revision'], unique=False
+    )
+
+    # 已有配置按ID分配版本号，保证全量同步(since=0)能取到全部数据
+    op.execute('UPDATE sensor_configs SET revision = id')
+    op.execute(
+        'INSERT INTO sensor_config_change_log (id, revision, compacted_revision) '
+        'SELECT 1, COALESCE(MAX(id), 0), 0 FROM sensor_configs'
+    )
+
+
+def downgrade():
+    op.drop_index('ix_sensor_config_tombstones_port_revision', table_name='sensor_config_tombstones')
+    op.drop_index('ix_sensor_config_tombstones_revision', table_name='sensor_config_tombstones')
+    op.drop_table('sensor_config_tombstones')
+    op.drop_table('sensor_config_change_log')
+    op.drop_index('ix_sensor_configs_port_revision', table_name='sensor_configs')
+    op.drop_index('ix_sensor_configs_revision', table_name='sensor_configs')
+    with op.batch_alter_table('sensor_configs') as batch_op:
+        batch_op.drop_column('revision')
@@ -0,0 +1,36 @@
+"""sensor_name trigram index
+
+Revision ID: 9c4a7f3e2b18
+Revises: 5b2d8e1f0a31
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4a7f3e2b18'
+down_revision = '5b2d8e1f0a31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 仅PostgreSQL支持pg_trgm，其他数据库使用进程内n-gram索引
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'ix_sensor_configs_sensor_name_trgm',
+        'sensor_configs',
+        ['sensor_name'],
+        postgresql_using='gin',
+        postgresql_ops={'sensor_name': 'gin_trgm_ops'},
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_sensor_configs_sensor_name_trgm', table_name='sensor_configs')
@@ -0,0 +1,134 @@
+"""model templates
+
+Revision ID: a5d8f2c7e1b4
+Revises: e7b1d4a9c2f5
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5d8f2c7e1b4'
+down_revision = 'e7b1d4a9c2f5'
+branch_labels = None
+depends_on = None
+
+JSON_TYPE = sa.JSON().with_variant(postgresql.JSONB(), 'postgresql')
+OVERRIDES_TYPE = sa.JSON(none_as_null=True).with_variant(postgresql.JSONB(none_as_null=True), 'postgresql')
+
+# 每个(公司, 物模型编号)以引用最多的字段列表作为模板，引用数相同时取最早出现的
+INSERT_TEMPLATES = """
+INSERT INTO model_templates (company_id, model_token, model_name, model_fields, updater_id)
+SELECT DISTINCT ON (company_id, model_token) company_id, model_token, model_name, model_fields, creator_id
+FROM (
+    SELECT id, company_id, model_token, model_name, model_fields, creator_id,
+           count(*) OVER (PARTITION BY company_id, model_token, model_fields) AS uses
+    FROM sensor_configs
+) AS variants
+ORDER BY company_id, model_token, uses DESC, id
+"""
+
+# 与app.core.model_fields.diff_model_fields相同：逐个字段保留与模板同位置字段不同的属性，
+# 超出模板长度的字段保留完整属性，迁移不依赖应用代码
+UPDATE_OVERRIDES = """
+UPDATE sensor_configs
+SET model_field_overrides = (
+    SELECT COALESCE(jsonb_agg(
+        (
+            SELECT COALESCE(jsonb_object_agg(attribute.key, attribute.value), '{}'::jsonb)
+            FROM jsonb_each(config_field.value) AS attribute
+            WHERE model_templates.model_fields -> (config_field.ordinality::int - 1) -> attribute.key
+                IS DISTINCT FROM attribute.value
+        )
+        ORDER BY config_field.ordinality
+    ), '[]'::jsonb)
+    FROM jsonb_array_elements(sensor_configs.model_fields) WITH ORDINALITY AS config_field(value, ordinality)
+)
+FROM model_templates
+WHERE model_templates.company_id = sensor_configs.company_id
+    AND model_templates.model_token = sensor_configs.model_token
+    AND sensor_configs.model_fields <> model_templates.model_fields
+"""
+
+# 与app.core.model_fields.merge_model_fields相同：按模板和差异还原每条配置的完整字段列表
+RESTORE_MODEL_FIELDS = """
+UPDATE sensor_configs
+SET model_fields = CASE
+    WHEN sensor_configs.model_field_overrides IS NULL THEN COALESCE(template.model_fields, '[]'::jsonb)
+    ELSE (
+        SELECT COALESCE(jsonb_agg(
+            COALESCE(template.model_fields -> (override.ordinality::int - 1), '{}'::jsonb) || override.value
+            ORDER BY override.ordinality
+        ), '[]'::jsonb)
+        FROM jsonb_array_elements(sensor_configs.model_field_overrides) WITH ORDINALITY AS override(value, ordinality)
+    )
+END
+FROM sensor_configs AS config
+LEFT JOIN model_templates AS template
+    ON template.company_id = config.company_id AND template.model_token = config.model_token
+WHERE config.id = sensor_configs.id
+"""
+
+
+def upgrade():
+    op.create_table(
+        'model_templates',
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('model_token', sa.String(), nullable=False),
+        sa.Column('model_name', sa.String(), nullable=False),
+        sa.Column('model_fields', JSON_TYPE, nullable=False),
+        sa.Column('updater_id', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('company_id', 'model_token'),
+    )
+    op.add_column('sensor_configs', sa.Column('model_field_overrides', OVERRIDES_TYPE, nullable=True))
+
+    # 生成模板，其余配置保存与模板的差异；回填全部在数据库中执行，alembic upgrade --sql可离线生成脚本
+    op.execute(INSERT_TEMPLATES)
+    op.execute(UPDATE_OVERRIDES)
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_sensor_configs_model_fields', table_name='sensor_configs')
+        op.create_index(
+            'ix_model_templates_model_fields',
+            'model_templates',
+            ['model_fields'],
+            postgresql_using='gin',
+            postgresql_ops={'model_fields': 'jsonb_path_ops'},
+        )
+    op.drop_column('sensor_configs', 'model_fields')
+    op.create_index(
+        'ix_sensor_configs_company_model_token', 'sensor_configs', ['company_id', 'model_token'], unique=False
+    )
+    op.create_index(
+        'ix_sensor_configs_company_overridden',
+        'sensor_configs',
+        ['company_id'],
+        unique=False,
+        postgresql_where=sa.text('model_field_overrides IS NOT NULL'),
+        sqlite_where=sa.text('model_field_overrides IS NOT NULL'),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_sensor_configs_company_overridden', table_name='sensor_configs')
+    op.drop_index('ix_sensor_configs_company_model_token', table_name='sensor_configs')
+    op.add_column('sensor_configs', sa.Column('model_fields', JSON_TYPE, nullable=True))
+
+    op.execute(RESTORE_MODEL_FIELDS)
+    op.alter_column('sensor_configs', 'model_fields', existing_type=JSON_TYPE, nullable=False)
+    op.drop_column('sensor_configs', 'model_field_overrides')
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_model_templates_model_fields', table_name='model_templates')
+        op.create_index(
+            'ix_sensor_configs_model_fields',
+            'sensor_configs',
+            ['model_fields'],
+            postgresql_using='gin',
+            postgresql_ops={'model_fields': 'jsonb_path_ops'},
+        )
+    op.drop_table('model_templates')
@@ -0,0 +1,137 @@
+"""company scoped sensor configs
+
+Revision ID: c3e9a7d2f4b6
+Revises: 4f8a2c6e9d13
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e9a7d2f4b6'
+down_revision = '4f8a2c6e9d13'
+branch_labels = None
+depends_on = None
+
+# 创建者已不在用户表中的配置无法确定所属公司，归入该公司ID，任何用户都查询不到，
+# 升级后可按实际归属执行 UPDATE sensor_configs SET company_id = ... WHERE company_id = -1
+ORPHAN_COMPANY_ID = -1
+
+
+def upgrade():
+    # 已有配置按创建者所在公司归属
+    op.add_column('sensor_configs', sa.Column('company_id', sa.Integer(), nullable=True))
+    op.execute(
+        'UPDATE sensor_configs SET company_id = COALESCE('
+        '(SELECT users.company_id FROM users WHERE users.id = sensor_configs.creator_id), '
+        f'{ORPHAN_COMPANY_ID})'
+    )
+    op.alter_column('sensor_configs', 'company_id', nullable=False)
+    op.drop_constraint('uq_sensor_configs_port_sensor_id', 'sensor_configs', type_='unique')
+    op.create_unique_constraint(
+        'uq_sensor_configs_company_port_sensor_id', 'sensor_configs', ['company_id', 'port', 'sensor_id']
+    )
+    op.drop_index('ix_sensor_configs_port_revision', table_name='sensor_configs')
+    op.drop_index('ix_sensor_configs_revision', table_name='sensor_configs')
+    op.create_index('ix_sensor_configs_company_id_id', 'sensor_configs', ['company_id', 'id'], unique=False)
+    op.create_index(
+        'ix_sensor_configs_company_revision', 'sensor_configs', ['company_id', 'revision'], unique=False
+    )
+    op.create_index(
+        'ix_sensor_configs_company_port_revision', 'sensor_configs', ['company_id', 'port', 'revision'], unique=False
+    )
+
+    # 移出串口的配置仍存在，按配置归属；已删除的配置无法确定公司，其删除记录按已清理处理：
+    # 删除这些记录并推进已清理版本号，since更早的增量同步改为全量同步，不会漏掉删除
+    op.add_column('sensor_config_tombstones', sa.Column('company_id', sa.Integer(), nullable=True))
+    op.execute(
+        'UPDATE sensor_config_tombstones SET company_id = ('
+        'SELECT sensor_configs.company_id FROM sensor_configs '
+        'WHERE sensor_configs.id = sensor_config_tombstones.config_id)'
+    )
+    op.execute(
+        'UPDATE sensor_config_change_log SET compacted_revision = GREATEST(compacted_revision, COALESCE('
+        '(SELECT MAX(revision) FROM sensor_config_tombstones WHERE company_id IS NULL), 0))'
+    )
+    op.execute('DELETE FROM sensor_config_tombstones WHERE company_id IS NULL')
+    op.alter_column('sensor_config_tombstones', 'company_id', nullable=False)
+    op.drop_index('ix_sensor_config_tombstones_port_revision', table_name='sensor_config_tombstones')
+    op.create_index(
+        'ix_sensor_config_tombstones_company_revision',
+        'sensor_config_tombstones',
+        ['company_id', 'revision'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_sensor_config_tombstones_company_port_revision',
+        'sensor_config_tombstones',
+        ['company_id', 'port', 'revision'],
+        unique=False,
+    )
+
+    # 串口版本号改为按(公司, 串口)记录。新版本号在原串口版本号上加一，
+    # 设备缓存的升级前ETag（包含所有公司的配置）不会再命中304。
+    # 每个原串口版本号都复制到所有公司（包括当前没有配置的串口），版本号不会回退，
+    # 否则已清空的串口从0重新计数，新增配置后回到设备缓存的版本号时会误返回304
+    op.add_column('sensor_config_port_revisions', sa.Column('company_id', sa.Integer(), nullable=True))
+    op.drop_constraint('sensor_config_port_revisions_pkey', 'sensor_config_port_revisions', type_='primary')
+    op.execute(
+        'INSERT INTO sensor_config_port_revisions (company_id, port, revision) '
+        'SELECT companies.company_id, old.port, old.revision + 1 '
+        'FROM sensor_config_port_revisions AS old CROSS JOIN ('
+        'SELECT company_id FROM users WHERE company_id IS NOT NULL '
+        'UNION SELECT company_id FROM sensor_configs '
+        'UNION SELECT company_id FROM sensor_config_tombstones'
+        ') AS companies '
+        'WHERE old.company_id IS NULL'
+    )
+    op.execute('DELETE FROM sensor_config_port_revisions WHERE company_id IS NULL')
+    op.alter_column('sensor_config_port_revisions', 'company_id', nullable=False)
+    op.create_primary_key(
+        'sensor_config_port_revisions_pkey', 'sensor_config_port_revisions', ['company_id', 'port']
+    )
+
+    # 配置包在首次下载时按公司重新构建
+    op.execute('DELETE FROM sensor_config_bundles')
+    op.add_column('sensor_config_bundles', sa.Column('company_id', sa.Integer(), nullable=False))
+    op.drop_constraint('sensor_config_bundles_pkey', 'sensor_config_bundles', type_='primary')
+    op.create_primary_key(
+        'sensor_config_bundles_pkey', 'sensor_config_bundles', ['company_id', 'port', 'format', 'encoding']
+    )
+
+
+def downgrade():
+    op.execute('DELETE FROM sensor_config_bundles')
+    op.drop_constraint('sensor_config_bundles_pkey', 'sensor_config_bundles', type_='primary')
+    op.drop_column('sensor_config_bundles', 'company_id')
+    op.create_primary_key('sensor_config_bundles_pkey', 'sensor_config_bundles', ['port', 'format', 'encoding'])
+
+    # 各公司同一串口的版本号合并为最大值加一
+    op.drop_constraint('sensor_config_port_revisions_pkey', 'sensor_config_port_revisions', type_='primary')
+    op.alter_column('sensor_config_port_revisions', 'company_id', nullable=True)
+    op.execute(
+        'INSERT INTO sensor_config_port_revisions (company_id, port, revision) '
+        'SELECT NULL, port, MAX(revision) + 1 FROM sensor_config_port_revisions GROUP BY port'
+    )
+    op.execute('DELETE FROM sensor_config_port_revisions WHERE company_id IS NOT NULL')
+    op.drop_column('sensor_config_port_revisions', 'company_id')
+    op.create_primary_key('sensor_config_port_revisions_pkey', 'sensor_config_port_revisions', ['port'])
+
+    op.drop_index('ix_sensor_config_tombstones_company_port_revision', table_name='sensor_config_tombstones')
+    op.drop_index('ix_sensor_config_tombstones_company_revision', table_name='sensor_config_tombstones')
+    op.create_index(
+        'ix_sensor_config_tombstones_port_revision', 'sensor_config_tombstones', ['port', 'revision'], unique=False
+    )
+    op.drop_column('sensor_config_tombstones', 'company_id')
+
+    # 不同公司存在相同(串口, 传感器ID)时需先清理，否则约束创建失败
+    op.drop_index('ix_sensor_configs_company_port_revision', table_name='sensor_configs')
+    op.drop_index('ix_sensor_configs_company_revision', table_name='sensor_configs')
+    op.drop_index('ix_sensor_configs_company_id_id', table_name='sensor_configs')
+    op.create_index('ix_sensor_configs_revision', 'sensor_configs', ['revision'], unique=False)
+    op.create_index('ix_sensor_configs_port_revision', 'sensor_configs', ['port', 'revision'], unique=False)
+    op.drop_constraint('uq_sensor_configs_company_port_sensor_id', 'sensor_configs', type_='unique')
+    op.create_unique_constraint('uq_sensor_configs_port_sensor_id', 'sensor_configs', ['port', 'sensor_id'])
+    op.drop_column('sensor_configs', 'company_id')
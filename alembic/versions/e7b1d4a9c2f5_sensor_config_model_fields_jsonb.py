@@ -0,0 +1,52 @@
+"""sensor_config model_fields jsonb
+
+Revision ID: e7b1d4a9c2f5
+Revises: c3e9a7d2f4b6
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b1d4a9c2f5'
+down_revision = 'c3e9a7d2f4b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 仅PostgreSQL有JSONB和GIN索引，其他数据库继续使用JSON列
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.alter_column(
+        'sensor_configs',
+        'model_fields',
+        type_=postgresql.JSONB(),
+        existing_type=sa.JSON(),
+        existing_nullable=False,
+        postgresql_using='model_fields::jsonb',
+    )
+    op.create_index(
+        'ix_sensor_configs_model_fields',
+        'sensor_configs',
+        ['model_fields'],
+        postgresql_using='gin',
+        postgresql_ops={'model_fields': 'jsonb_path_ops'},
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_sensor_configs_model_fields', table_name='sensor_configs')
+    op.alter_column(
+        'sensor_configs',
+        'model_fields',
+        type_=sa.JSON(),
+        existing_type=postgresql.JSONB(),
+        existing_nullable=False,
+        postgresql_using='model_fields::json',
+    )
@@ -1,7 +1,8 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth, config
+from app.api.v1.endpoints import auth, config, internal
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
-api_router.include_router(config.router, prefix="/config", tags=["config"]) 
\ No newline at end of file
+api_router.include_router(config.router, prefix="/config", tags=["config"])
+api_router.include_router(internal.router, prefix="/internal", tags=["internal"])
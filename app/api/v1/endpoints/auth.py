@@ -3,13 +3,12 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, Header, status
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.core.deps import get_current_user
-from app.core.security import create_access_token
-from app.crud.user import authenticate_user
-from app.db.session import get_db
+from app.core.security import PasswordHasherBusyError, create_access_token, verify_password_async
+from app.crud.user import get_user_by_account
+from app.db.session import run_in_session
 from app.models.user import User
 from app.schemas.response import ResponseModel
 from app.schemas.user import Token, UserLogin, UserResponse, UserInDB
@@ -18,9 +17,8 @@ router = APIRouter()
 
 
 @router.post("/SignIn", response_model=ResponseModel[str])
-def login_access_token(
+async def login_access_token(
     user_login: UserLogin,
-    db: Session = Depends(get_db),
     access_type: str = Header(None)
 ) -> Any:
     """
@@ -28,7 +26,19 @@ def login_access_token(
     """
     # TODO: 后续可以根据access_type适配不同的客户端
     
-    user = authenticate_user(db, user_login)
+    # bcrypt校验为CPU密集操作，放到独立进程池中执行，繁忙时快速失败，避免拖慢配置查询；
+    # 用户在独立的短会话中读取，排队等待校验期间不占用数据库连接
+    user = await run_in_session(get_user_by_account, user_login.account)
+    if user:
+        try:
+            if not await verify_password_async(user_login.password, user.password):
+                user = None
+        except PasswordHasherBusyError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(exc),
+                headers={"Retry-After": "1"},
+            )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -52,7 +62,7 @@ def login_access_token(
 
 
 @router.get("/GetUserByToken", response_model=ResponseModel[UserResponse])
-def get_user_by_token(
+async def get_user_by_token(
     current_user: UserInDB = Depends(get_current_user),
 ) -> Any:
     """
@@ -1,25 +1,57 @@
+import asyncio
+import json
 from datetime import datetime
-from typing import Any, List
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
 
-from app.core.deps import get_current_user
-from app.crud.sensor_config import (check_sensor_id_exists, create_sensor_config,
-                               delete_sensor_configs, get_sensor_config_by_id,
-                               get_sensor_configs, update_sensor_config)
-from app.db.session import get_db
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.config_bundle import BUNDLE_MEDIA_TYPES, negotiate_encoding, negotiate_format
+from app.core.deps import get_current_user, get_current_user_detached
+from app.core.notify import company_topic, hub, port_topic
+from app.core.result_cache import make_digest, query_cache, query_coalescer
+from app.core.sensor_config_io import (ImportFormatError, convert_to_response_dict,
+                                      detect_import_format, format_export_rows,
+                                      gzip_stream, iter_import_records,
+                                      validate_import_record)
+from app.core.serialization import dumps
+from app.crud.sensor_config import (ChangeLogResyncError, ConcurrentUpdateError,
+                               SensorIdConflictError, build_sensor_config_bundle,
+                               count_sensor_configs,
+                               create_sensor_config, delete_sensor_configs,
+                               get_change_log_revision, get_port_revision,
+                               get_sensor_config_bundle, get_sensor_config_changes,
+                               get_sensor_config_page,
+                               get_sensor_configs, import_sensor_configs,
+                               prepare_sensor_config_export, update_model_template,
+                               update_sensor_config, update_sensor_configs)
+from app.crud.model_template import get_model_templates
+from app.db.session import (ReadSessionRunner, SessionRunner, get_read_session_runner,
+                            get_session_runner, run_in_session, stream_partitions)
 from app.models.sensor_config import SensorConfig
+from app.schemas.model_template import (ModelTemplateInDB, ModelTemplateResponse,
+                                        ModelTemplateUpdate, ModelTemplateUpdateResponse)
 from app.schemas.response import ResponseModel
-from app.schemas.sensor_config import (SensorConfigCreate, SensorConfigCreateResponse,
-                                  SensorConfigDeleteRequest, SensorConfigInDB,
+from app.schemas.sensor_config import (SensorConfigBatchUpdateRequest,
+                                  SensorConfigBatchUpdateResponse,
+                                  SensorConfigBatchUpdateResult, SensorConfigChange,
+                                  SensorConfigChangesResponse,
+                                  SensorConfigCreate, SensorConfigCreateResponse,
+                                  SensorConfigDeleteRequest, SensorConfigImportError,
+                                  SensorConfigImportResponse, SensorConfigInDB,
                                   SensorConfigQuery, SensorConfigResponse,
                                   SensorConfigUpdate)
 from app.schemas.user import UserInDB
 
 router = APIRouter()
 
+# 设备拉取接口的响应体缓存，键为(公司ID, 串口, 版本号)，版本号变化后旧条目自然淘汰
+config_bundle_cache = LRUCache(maxsize=settings.CONFIG_BUNDLE_CACHE_SIZE)
+
 
 def convert_to_response_model(sensor_config: SensorConfig) -> SensorConfigInDB:
     """
@@ -40,94 +72,614 @@ def convert_to_response_model(sensor_config: SensorConfig) -> SensorConfigInDB:
     )
 
 
+def render_sensor_config_response(
+    sensor_configs: Sequence[SensorConfig], total: Optional[int], next_cursor: Optional[str] = None
+) -> bytes:
+    """
+    序列化传感器配置列表响应
+
+    开启FAST_JSON_RESPONSE时直接由数据库行生成JSON，跳过逐行的pydantic校验；否则走响应模型，两者输出逐字节一致
+    """
+    if settings.FAST_JSON_RESPONSE:
+        return dumps({
+            "code": 0,
+            "msg": None,
+            "data": {
+                "sensorList": [convert_to_response_dict(sensor_config) for sensor_config in sensor_configs],
+                "total": total,
+                "nextCursor": next_cursor,
+            },
+        })
+    response = ResponseModel[SensorConfigResponse](
+        data=SensorConfigResponse(
+            sensorList=[convert_to_response_model(sensor_config) for sensor_config in sensor_configs],
+            total=total,
+            nextCursor=next_cursor,
+        )
+    )
+    return JSONResponse(content=jsonable_encoder(response)).body
+
+
 @router.post("/QueryMR702SensorConfigList", response_model=ResponseModel[SensorConfigResponse])
-def query_mr702_sensor_config_list(
+async def query_mr702_sensor_config_list(
     query: SensorConfigQuery,
-    db: Session = Depends(get_db),
+    db: SessionRunner = Depends(get_read_session_runner),
+    primary_db: SessionRunner = Depends(get_session_runner),
     current_user: UserInDB = Depends(get_current_user)
 ) -> Any:
     """
     获取MR702-遥测终端机传感器配置列表
+
+    开启查询结果缓存时，相同的查询直接返回缓存的响应字节，配置变更提交后按串口失效。
+    缓存未命中时在主库查询，避免把从库尚未同步的旧数据写入失效后的新缓存。
+    开启相同查询合并时，与正在执行的相同查询共用其响应字节
     """
-    sensor_configs = get_sensor_configs(
-        db, port=query.port, sensor_name=query.sensorName
-    )
-    
+    if query_cache is not None or query_coalescer is not None:
+        # 空字符串与未指定的过滤条件等价
+        port = query.port or None
+        company_id = current_user.company_id
+        tag = port_topic(company_id, port) if port else company_topic(company_id)
+        digest = make_digest(
+            company_id, port, query.sensorName or None, model_field_filter(query), query.pageSize, query.pageNum,
+            query.cursor, query.orderBy, query.countMode,
+        )
+
+    if query_cache is not None:
+        key, body = await query_cache.lookup(tag, digest)
+        if body is None:
+            body = await coalesce_sensor_config_list(primary_db, query, company_id, tag, digest)
+            await query_cache.store(key, body)
+        return Response(content=body, media_type="application/json")
+
+    if query_coalescer is not None:
+        # 刚提交过写入的请求方在主库读，不与从库上的查询合并
+        on_replica = isinstance(db, ReadSessionRunner) and db.replica is not None
+        body = await coalesce_sensor_config_list(
+            db, query, company_id, tag, make_digest(digest, "replica" if on_replica else "primary")
+        )
+        return Response(content=body, media_type="application/json")
+
+    sensor_configs, total, next_cursor = await load_sensor_config_list(db, query, current_user.company_id)
+    if settings.FAST_JSON_RESPONSE:
+        return Response(
+            content=render_sensor_config_response(sensor_configs, total, next_cursor),
+            media_type="application/json",
+        )
+
     response_sensor_configs = [
         convert_to_response_model(sensor_config)
         for sensor_config in sensor_configs
     ]
     
     return ResponseModel[SensorConfigResponse](
-        data=SensorConfigResponse(sensorList=response_sensor_configs)
+        data=SensorConfigResponse(
+            sensorList=response_sensor_configs, total=total, nextCursor=next_cursor
+        )
+    )
+
+
+async def coalesce_sensor_config_list(
+    db: SessionRunner, query: SensorConfigQuery, company_id: int, tag: str, digest: str
+) -> bytes:
+    """
+    查询并序列化传感器配置列表，开启相同查询合并时与正在执行的相同查询共用结果
+    """
+    async def render() -> bytes:
+        sensor_configs, total, next_cursor = await load_sensor_config_list(db, query, company_id)
+        return render_sensor_config_response(sensor_configs, total, next_cursor)
+
+    if query_coalescer is None:
+        return await render()
+    return await query_coalescer.run(tag, digest, render)
+
+
+def model_field_filter(query: SensorConfigQuery) -> Optional[Dict[str, str]]:
+    """
+    取出查询中指定了的物模型字段属性，未指定任何属性时返回None
+    """
+    if query.modelField is None:
+        return None
+    return query.modelField.model_dump(exclude_none=True) or None
+
+
+async def load_sensor_config_list(
+    db: SessionRunner, query: SensorConfigQuery, company_id: int
+) -> Tuple[Sequence[SensorConfig], Optional[int], Optional[str]]:
+    """
+    按查询条件获取公司的传感器配置列表，返回(配置列表, 总数, 下一页游标)
+    """
+    next_cursor = None
+    model_field = model_field_filter(query)
+    if query.pageSize is None:
+        sensor_configs = await db.run(
+            get_sensor_configs,
+            company_id=company_id,
+            port=query.port,
+            sensor_name=query.sensorName,
+            model_field=model_field,
+        )
+        return sensor_configs, len(sensor_configs), next_cursor
+
+    try:
+        sensor_configs, next_cursor = await db.run(
+            get_sensor_config_page,
+            company_id=company_id,
+            port=query.port,
+            sensor_name=query.sensorName,
+            model_field=model_field,
+            page_size=query.pageSize,
+            page_num=query.pageNum,
+            cursor=query.cursor,
+            order_by=query.orderBy,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    total = None
+    if query.countMode != "none":
+        total = await db.run(
+            count_sensor_configs,
+            company_id=company_id,
+            port=query.port,
+            sensor_name=query.sensorName,
+            model_field=model_field,
+            approximate=query.countMode == "approximate",
+        )
+    return sensor_configs, total, next_cursor
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    判断If-None-Match请求头是否命中当前ETag
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@router.get("/PullMR702SensorConfigList")
+async def pull_mr702_sensor_config_list(
+    port: str,
+    if_none_match: Optional[str] = Header(None),
+    db: SessionRunner = Depends(get_read_session_runner),
+    primary_db: SessionRunner = Depends(get_session_runner),
+    current_user: UserInDB = Depends(get_current_user)
+) -> Response:
+    """
+    设备拉取MR702-遥测终端机指定串口的传感器配置列表
+
+    根据串口版本号生成ETag，配置未变化时直接返回304，不查询和序列化配置数据
+    """
+    company_id = current_user.company_id
+    revision = await db.run(get_port_revision, company_id=company_id, port=port)
+    if is_stale_replica_read(db, if_none_match, revision):
+        db = primary_db
+        revision = await db.run(get_port_revision, company_id=company_id, port=port)
+    etag = f'"{revision}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    key = (company_id, port, revision)
+    body = config_bundle_cache.get(key)
+    if body is None:
+        sensor_configs = await db.run(get_sensor_configs, company_id=company_id, port=port)
+        body = render_sensor_config_response(sensor_configs, len(sensor_configs))
+        config_bundle_cache.set(key, body)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/DownloadMR702SensorConfigBundle")
+async def download_mr702_sensor_config_bundle(
+    port: str,
+    accept: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    db: SessionRunner = Depends(get_read_session_runner),
+    primary_db: SessionRunner = Depends(get_session_runner),
+    current_user: UserInDB = Depends(get_current_user)
+) -> Response:
+    """
+    设备下载MR702-遥测终端机指定串口的紧凑配置包
+
+    配置包在串口配置变更后首次下载时编码（JSON/MessagePack）并压缩（gzip/brotli）保存，
+    之后按Accept和Accept-Encoding选择后直接返回保存的字节，配置未变化时返回304
+    """
+    bundle_format = negotiate_format(accept)
+    if bundle_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+            detail=f"仅支持 {', '.join(BUNDLE_MEDIA_TYPES.values())}",
+        )
+    encoding = negotiate_encoding(accept_encoding)
+
+    company_id = current_user.company_id
+    revision = await db.run(get_port_revision, company_id=company_id, port=port)
+    if is_stale_replica_read(db, if_none_match, revision):
+        db = primary_db
+        revision = await db.run(get_port_revision, company_id=company_id, port=port)
+    key = (company_id, port, revision, bundle_format, encoding)
+    body = config_bundle_cache.get(key)
+    if body is None and not etag_matches(if_none_match, bundle_etag(revision, bundle_format, encoding)):
+        body = await db.run(
+            get_sensor_config_bundle,
+            company_id=company_id,
+            port=port,
+            revision=revision,
+            bundle_format=bundle_format,
+            encoding=encoding,
+        )
+        if body is None:
+            # 变更后首次下载新版本时在主库补建配置包
+            revision, contents = await build_port_bundle(primary_db, company_id, port, revision)
+            key = (company_id, port, revision, bundle_format, encoding)
+            body = contents[(bundle_format, encoding)]
+        config_bundle_cache.set(key, body)
+
+    headers = {
+        "ETag": bundle_etag(revision, bundle_format, encoding),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept, Accept-Encoding",
+    }
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type=BUNDLE_MEDIA_TYPES[bundle_format], headers=headers)
+
+
+async def build_port_bundle(
+    db: SessionRunner, company_id: int, port: str, revision: int
+) -> Tuple[int, Dict[Tuple[str, str], bytes]]:
+    """
+    补建串口配置包，开启相同查询合并时同一串口同一版本的并发下载只补建一次
+    """
+    async def build() -> Tuple[int, Dict[Tuple[str, str], bytes]]:
+        return await db.run(build_sensor_config_bundle, company_id=company_id, port=port)
+
+    if query_coalescer is None:
+        return await build()
+    return await query_coalescer.run(port_topic(company_id, port), make_digest("bundle", revision), build)
+
+
+def is_stale_replica_read(db: SessionRunner, if_none_match: Optional[str], revision: int) -> bool:
+    """
+    判断从库读到的串口版本号是否比设备已有的版本旧
+
+    设备可能已从主库或其他从库拉取到更新的版本，此时应改在主库读取，避免设备回退到旧配置
+    """
+    if not isinstance(db, ReadSessionRunner) or db.replica is None or not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        etag_revision = candidate.strip().removeprefix("W/").strip('"').split("-", 1)[0]
+        if etag_revision.isdigit() and int(etag_revision) > revision:
+            return True
+    return False
+
+
+def bundle_etag(revision: int, bundle_format: str, encoding: str) -> str:
+    """
+    配置包ETag，不同格式和压缩方式的内容不同，ETag也不同
+    """
+    return f'"{revision}-{bundle_format}-{encoding}"'
+
+
+@router.get("/GetMR702SensorConfigChanges", response_model=ResponseModel[SensorConfigChangesResponse])
+async def get_mr702_sensor_config_changes(
+    since: int = Query(0, ge=0, description="上次同步返回的revision，0表示全量同步"),
+    port: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    db: SessionRunner = Depends(get_read_session_runner),
+    primary_db: SessionRunner = Depends(get_session_runner),
+    current_user: UserInDB = Depends(get_current_user)
+) -> Any:
+    """
+    增量获取MR702-遥测终端机传感器配置变更
+
+    返回版本号大于since的新增、更新和删除，客户端应用变更后保存返回的revision作为下次的since
+    """
+    try:
+        changes, next_revision, has_more = await db.run(
+            get_sensor_config_changes, company_id=current_user.company_id, since=since, port=port, limit=limit
+        )
+    except ChangeLogResyncError as exc:
+        if not isinstance(db, ReadSessionRunner) or db.replica is None:
+            return build_resync_response(exc)
+        # 从库复制延迟时since可能大于从库的当前版本号，以主库为准判断是否需要全量同步
+        try:
+            changes, next_revision, has_more = await primary_db.run(
+                get_sensor_config_changes, company_id=current_user.company_id, since=since, port=port, limit=limit
+            )
+        except ChangeLogResyncError as exc:
+            return build_resync_response(exc)
+    return build_changes_response(changes, next_revision, has_more)
+
+
+def build_resync_response(exc: ChangeLogResyncError) -> ResponseModel[SensorConfigChangesResponse]:
+    """
+    构建需要全量同步的增量同步响应
+    """
+    return ResponseModel[SensorConfigChangesResponse](
+        msg=str(exc),
+        data=SensorConfigChangesResponse(revision=0, resync=True),
+    )
+
+
+def build_changes_response(
+    changes: Sequence[tuple], next_revision: int, has_more: bool
+) -> ResponseModel[SensorConfigChangesResponse]:
+    """
+    将变更列表转换为增量同步响应
+    """
+    response_changes = []
+    for revision, sensor_config, tombstone in changes:
+        if sensor_config is not None:
+            response_changes.append(SensorConfigChange(
+                revision=revision,
+                op="upsert",
+                id=sensor_config.id,
+                port=sensor_config.port,
+                sensorID=sensor_config.sensor_id,
+                sensorConfig=convert_to_response_model(sensor_config),
+            ))
+        else:
+            response_changes.append(SensorConfigChange(
+                revision=revision,
+                op="delete",
+                id=tombstone.config_id,
+                port=tombstone.port,
+                sensorID=tombstone.sensor_id,
+            ))
+    return ResponseModel[SensorConfigChangesResponse](
+        data=SensorConfigChangesResponse(changes=response_changes, revision=next_revision, hasMore=has_more)
+    )
+
+
+def subscription_topics(company_id: int, port: Optional[str]) -> List[str]:
+    """
+    订阅主题，指定串口时只订阅公司的该串口，否则订阅公司的全部配置变更，不会收到其他公司的变更
+    """
+    return [port_topic(company_id, port)] if port else [company_topic(company_id)]
+
+
+@router.get("/WaitMR702SensorConfigChanges", response_model=ResponseModel[SensorConfigChangesResponse])
+async def wait_mr702_sensor_config_changes(
+    since: int = Query(..., ge=0, description="上次同步返回的revision"),
+    port: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    timeout: int = Query(30, ge=0, description="最长等待秒数"),
+    current_user: UserInDB = Depends(get_current_user_detached)
+) -> Any:
+    """
+    长轮询获取MR702-遥测终端机传感器配置变更
+
+    有版本号大于since的变更时立即返回，否则挂起等待变更通知，超时返回空变更列表。
+    返回格式与GetMR702SensorConfigChanges相同，等待期间不占用数据库连接
+    """
+    timeout = min(timeout, settings.NOTIFY_LONG_POLL_MAX_SECONDS)
+    # 先订阅再查询，避免查询与订阅之间的变更被遗漏
+    subscription = hub.subscribe(subscription_topics(current_user.company_id, port))
+    try:
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            try:
+                changes, next_revision, has_more = await run_in_session(
+                    get_sensor_config_changes, company_id=current_user.company_id, since=since, port=port, limit=limit
+                )
+            except ChangeLogResyncError as exc:
+                return build_resync_response(exc)
+            remaining = deadline - asyncio.get_running_loop().time()
+            if changes or remaining <= 0:
+                return build_changes_response(changes, next_revision, has_more)
+            if await subscription.wait(remaining) is None:
+                return build_changes_response(changes, next_revision, has_more)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+def format_sse_event(event: str, data: dict, event_id: Optional[int] = None) -> bytes:
+    """
+    格式化SSE事件
+    """
+    lines = [f"id: {event_id}"] if event_id else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, ensure_ascii=False)}"]
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+@router.get("/SubscribeMR702SensorConfigChanges")
+async def subscribe_mr702_sensor_config_changes(
+    port: Optional[str] = None,
+    since: Optional[int] = Query(None, ge=0, description="上次同步返回的revision，有更新的变更时立即推送一次"),
+    last_event_id: Optional[str] = Header(None),
+    current_user: UserInDB = Depends(get_current_user_detached)
+) -> StreamingResponse:
+    """
+    通过SSE订阅MR702-遥测终端机传感器配置变更
+
+    每次提交变更后推送change事件，data为{"revision": 变更版本号}，客户端收到后调用GetMR702SensorConfigChanges拉取；
+    短时间内的多次变更合并为一次推送。断线重连时浏览器通过Last-Event-ID带上最后收到的版本号，
+    有遗漏的变更会立即补发。空闲时定期发送注释行作为心跳，订阅期间不占用数据库连接
+    """
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+
+    async def events():
+        # 在生成器内订阅，客户端在响应开始前断开时不会遗留订阅
+        subscription = hub.subscribe(subscription_topics(current_user.company_id, port))
+        try:
+            yield b": connected\n\n"
+            if since is not None:
+                try:
+                    changes, _, _ = await run_in_session(
+                        get_sensor_config_changes, company_id=current_user.company_id, since=since, port=port, limit=1
+                    )
+                except ChangeLogResyncError as exc:
+                    yield format_sse_event("resync", {"msg": str(exc)})
+                else:
+                    if changes:
+                        revision = await run_in_session(get_change_log_revision)
+                        yield format_sse_event("change", {"revision": revision}, revision)
+            while True:
+                revision = await subscription.wait(settings.NOTIFY_SSE_HEARTBEAT_SECONDS)
+                if revision is None:
+                    yield b": ping\n\n"
+                else:
+                    # 监听连接重连后以0通知，版本号未知，客户端应按上次的版本号拉取
+                    yield format_sse_event("change", {"revision": revision}, revision)
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+@router.get("/ExportMR702SensorConfigList")
+async def export_mr702_sensor_config_list(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    port: Optional[str] = None,
+    sensorName: Optional[str] = None,
+    accept_encoding: Optional[str] = Header(None),
+    current_user: UserInDB = Depends(get_current_user)
+) -> StreamingResponse:
+    """
+    导出MR702-遥测终端机传感器配置
+
+    过滤条件与查询接口相同，按ID排序以NDJSON或CSV流式输出。数据通过服务端游标分批读取，
+    整个导出在同一个只读快照中完成；请求头Accept-Encoding包含gzip时边输出边压缩
+    """
+    async def generate():
+        if format == "csv":
+            yield format_export_rows([], format, header=True)
+        async for rows in stream_partitions(
+            prepare_sensor_config_export, company_id=current_user.company_id, port=port, sensor_name=sensorName
+        ):
+            yield format_export_rows(rows, format)
+
+    headers = {"Content-Disposition": f'attachment; filename="sensor_configs.{format}"'}
+    body = generate()
+    if accept_encoding and "gzip" in accept_encoding.lower():
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return StreamingResponse(body, media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+
+
 @router.post("/AddMR702SensorConfigItem", response_model=ResponseModel[SensorConfigCreateResponse])
-def add_mr702_sensor_config_item(
+async def add_mr702_sensor_config_item(
     sensor_config: SensorConfigCreate,
-    db: Session = Depends(get_db),
+    db: SessionRunner = Depends(get_session_runner),
     current_user: UserInDB = Depends(get_current_user)
 ) -> Any:
     """
     添加MR702-遥测终端机传感器配置项
     """
-    # 验证传感器ID在同一串口下是否唯一
-    if check_sensor_id_exists(db, port=sensor_config.port, sensor_id=sensor_config.sensorID):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"传感器ID {sensor_config.sensorID} 在串口 {sensor_config.port} 下已存在"
+    # 创建传感器配置，传感器ID在同一串口下的唯一性由数据库约束保证
+    try:
+        sensor_config_id = await db.run(
+            create_sensor_config,
+            company_id=current_user.company_id,
+            sensor_config=sensor_config,
+            creator_id=current_user.id,
         )
-    
-    # 创建传感器配置
-    db_sensor_config = create_sensor_config(
-        db, sensor_config=sensor_config, creator_id=current_user.id
-    )
+    except SensorIdConflictError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
     
     return ResponseModel[SensorConfigCreateResponse](
         code=200,
         msg="success",
-        data=SensorConfigCreateResponse(id=db_sensor_config.id)
+        data=SensorConfigCreateResponse(id=sensor_config_id)
+    )
+
+
+@router.post("/ImportMR702SensorConfigList", response_model=ResponseModel[SensorConfigImportResponse])
+async def import_mr702_sensor_config_list(
+    request: Request,
+    format: Optional[Literal["json", "ndjson", "csv"]] = None,
+    db: SessionRunner = Depends(get_session_runner),
+    current_user: UserInDB = Depends(get_current_user)
+) -> Any:
+    """
+    批量导入MR702-遥测终端机传感器配置
+
+    请求体为JSON数组、NDJSON或CSV，格式由format参数指定，未指定时按Content-Type判断。
+    NDJSON和CSV边接收边逐行校验，校验通过的记录在一个事务中批量插入，校验失败或冲突的记录在errors中逐行返回
+    """
+    import_format = format or detect_import_format(request.headers.get("content-type"))
+    sensor_configs: List[SensorConfigCreate] = []
+    rows: List[int] = []
+    errors: List[SensorConfigImportError] = []
+    total = 0
+    try:
+        async for row, record in iter_import_records(request.stream(), import_format):
+            total += 1
+            if total > settings.SENSOR_CONFIG_IMPORT_MAX_ROWS:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"单次最多导入 {settings.SENSOR_CONFIG_IMPORT_MAX_ROWS} 条传感器配置",
+                )
+            result = validate_import_record(record)
+            if isinstance(result, str):
+                errors.append(SensorConfigImportError(row=row, msg=result))
+            else:
+                sensor_configs.append(result)
+                rows.append(row)
+    except ImportFormatError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+    imported, conflicts = await db.run(
+        import_sensor_configs,
+        company_id=current_user.company_id,
+        sensor_configs=sensor_configs,
+        creator_id=current_user.id,
+    )
+    errors.extend(SensorConfigImportError(row=rows[index], msg=msg) for index, msg in conflicts)
+    errors.sort(key=lambda error: error.row)
+
+    return ResponseModel[SensorConfigImportResponse](
+        code=200,
+        msg="success",
+        data=SensorConfigImportResponse(total=total, imported=imported, failed=len(errors), errors=errors)
     )
 
 
 @router.post("/EditMR702SensorConfigItem", response_model=ResponseModel[None])
-def edit_mr702_sensor_config_item(
+async def edit_mr702_sensor_config_item(
     sensor_config: SensorConfigUpdate,
-    db: Session = Depends(get_db),
+    db: SessionRunner = Depends(get_session_runner),
     current_user: UserInDB = Depends(get_current_user)
 ) -> Any:
     """
     编辑MR702-遥测终端机传感器配置项
     """
+    # 更新传感器配置，传感器ID在同一串口下的唯一性由数据库约束保证
+    try:
+        updated = await db.run(
+            update_sensor_config,
+            company_id=current_user.company_id,
+            sensor_config=sensor_config,
+            updater_id=current_user.id
+        )
+    except SensorIdConflictError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    
     # 验证传感器配置是否存在
-    db_sensor_config = get_sensor_config_by_id(db, sensor_config.id)
-    if not db_sensor_config:
+    if not updated:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"传感器配置 ID {sensor_config.id} 不存在"
         )
     
-    # 验证传感器ID在同一串口下是否唯一
-    if check_sensor_id_exists(
-        db, 
-        port=sensor_config.port, 
-        sensor_id=sensor_config.sensorID,
-        exclude_id=sensor_config.id
-    ):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"传感器ID {sensor_config.sensorID} 在串口 {sensor_config.port} 下已存在"
-        )
-    
-    # 更新传感器配置
-    update_sensor_config(
-        db, 
-        db_sensor_config=db_sensor_config, 
-        sensor_config=sensor_config,
-        updater_id=current_user.id
-    )
-    
     return ResponseModel[None](
         code=200,
         msg="success",
@@ -135,20 +687,112 @@ def edit_mr702_sensor_config_item(
     )
 
 
+@router.post("/BatchEditMR702SensorConfigItem", response_model=ResponseModel[SensorConfigBatchUpdateResponse])
+async def batch_edit_mr702_sensor_config_item(
+    batch_request: SensorConfigBatchUpdateRequest,
+    db: SessionRunner = Depends(get_session_runner),
+    current_user: UserInDB = Depends(get_current_user)
+) -> Any:
+    """
+    批量编辑MR702-遥测终端机传感器配置项
+
+    所有项在一个事务中校验和更新，results与请求items一一对应
+    """
+    try:
+        errors = await db.run(
+            update_sensor_configs,
+            company_id=current_user.company_id,
+            sensor_configs=batch_request.items,
+            updater_id=current_user.id,
+            atomic=batch_request.atomic,
+        )
+    except ConcurrentUpdateError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+
+    results = [
+        SensorConfigBatchUpdateResult(id=item.id, success=error is None, msg=error)
+        for item, error in zip(batch_request.items, errors)
+    ]
+    updated = sum(result.success for result in results)
+    return ResponseModel[SensorConfigBatchUpdateResponse](
+        code=200,
+        msg="success",
+        data=SensorConfigBatchUpdateResponse(updated=updated, failed=len(results) - updated, results=results)
+    )
+
+
 @router.post("/BatchDeleteMR702SensorConfigItem", response_model=ResponseModel[None])
-def batch_delete_mr702_sensor_config_item(
+async def batch_delete_mr702_sensor_config_item(
     delete_request: SensorConfigDeleteRequest,
-    db: Session = Depends(get_db),
+    db: SessionRunner = Depends(get_session_runner),
     current_user: UserInDB = Depends(get_current_user)
 ) -> Any:
     """
     批量删除MR702-遥测终端机传感器配置项
     """
     # 删除传感器配置
-    delete_sensor_configs(db, ids=delete_request.ids)
+    await db.run(delete_sensor_configs, company_id=current_user.company_id, ids=delete_request.ids)
     
     return ResponseModel[None](
         code=200,
         msg="success",
         data=None
-    ) 
\ No newline at end of file
+    ) 
+
+@router.post("/QueryMR702ModelTemplateList", response_model=ResponseModel[ModelTemplateResponse])
+async def query_mr702_model_template_list(
+    db: SessionRunner = Depends(get_read_session_runner),
+    current_user: UserInDB = Depends(get_current_user)
+) -> Any:
+    """
+    获取MR702-遥测终端机物模型模板列表
+
+    模板在首次添加或导入使用该物模型编号的传感器配置时创建
+    """
+    templates = await db.run(get_model_templates, company_id=current_user.company_id)
+    return ResponseModel[ModelTemplateResponse](
+        data=ModelTemplateResponse(
+            templateList=[
+                ModelTemplateInDB(
+                    modelToken=template.model_token,
+                    modelName=template.model_name,
+                    modelFieldList=template.model_fields,
+                    sensorCount=sensor_count,
+                    overriddenCount=overridden_count,
+                    updateUserID=template.updater_id,
+                    updateTime=template.updated_at,
+                )
+                for template, sensor_count, overridden_count in templates
+            ]
+        )
+    )
+
+
+@router.post("/EditMR702ModelTemplate", response_model=ResponseModel[ModelTemplateUpdateResponse])
+async def edit_mr702_model_template(
+    model_template: ModelTemplateUpdate,
+    db: SessionRunner = Depends(get_session_runner),
+    current_user: UserInDB = Depends(get_current_user)
+) -> Any:
+    """
+    编辑MR702-遥测终端机物模型模板
+
+    引用该模板的传感器配置随之变更，单独修改过的字段属性保持不变
+    """
+    updated = await db.run(
+        update_model_template,
+        company_id=current_user.company_id,
+        model_template=model_template,
+        updater_id=current_user.id,
+    )
+    if updated is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"物模型模板 {model_template.modelToken} 不存在"
+        )
+
+    return ResponseModel[ModelTemplateUpdateResponse](
+        code=200,
+        msg="success",
+        data=ModelTemplateUpdateResponse(updated=updated)
+    )
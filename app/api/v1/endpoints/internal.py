@@ -0,0 +1,72 @@
+from datetime import timedelta
+from typing import Any, List
+
+from fastapi import APIRouter, Depends
+
+from app.api.v1.endpoints.config import config_bundle_cache
+from app.core.config import settings
+from app.core.deps import require_internal_token, token_cache, user_cache
+from app.core.result_cache import query_cache, query_coalescer
+from app.crud.sensor_config import compact_sensor_config_tombstones
+from app.db import session
+from app.db.pool import get_pool_status
+from app.db.session import SessionRunner, get_session_runner
+from app.schemas.internal import CacheStats, ChangeLogCompactResult, DBPoolStats
+from app.schemas.response import ResponseModel
+
+# 内部接口只允许持有内部接口令牌的调用方访问
+router = APIRouter(dependencies=[Depends(require_internal_token)])
+
+
+@router.get("/GetDBPoolStats", response_model=ResponseModel[List[DBPoolStats]])
+async def get_db_pool_stats() -> Any:
+    """
+    获取当前worker的数据库连接池统计，用于按实际负载调整连接池大小，配置了从库时同时返回各从库的连接池和健康状态
+    """
+    pool_stats = [DBPoolStats(engine="sync", **get_pool_status(session.engine.pool))]
+    if session.async_engine is not None:
+        pool_stats.append(
+            DBPoolStats(engine="async", **get_pool_status(session.async_engine.sync_engine.pool))
+        )
+    if session.replica_set is not None:
+        pool_stats.extend(
+            DBPoolStats(engine=replica.name, healthy=replica.healthy, **get_pool_status(replica.pool))
+            for replica in session.replica_set.replicas
+        )
+    return ResponseModel[List[DBPoolStats]](data=pool_stats)
+
+
+@router.get("/GetCacheStats", response_model=ResponseModel[List[CacheStats]])
+async def get_cache_stats() -> Any:
+    """
+    获取当前worker的缓存命中统计，共享的查询结果缓存只统计当前worker的命中次数
+    """
+    caches = {
+        "token": token_cache,
+        "user": user_cache,
+        "configBundle": config_bundle_cache,
+    }
+    if query_cache is not None:
+        caches["sensorConfigQuery"] = query_cache
+    if query_coalescer is not None:
+        # hits为加入正在执行的相同查询的请求数，misses为实际执行的查询数，size为正在执行的查询数
+        caches["sensorConfigQueryCoalescing"] = query_coalescer
+    return ResponseModel[List[CacheStats]](
+        data=[CacheStats(name=name, **cache.stats()) for name, cache in caches.items()]
+    )
+
+
+@router.post("/CompactSensorConfigChangeLog", response_model=ResponseModel[ChangeLogCompactResult])
+async def compact_sensor_config_change_log(
+    db: SessionRunner = Depends(get_session_runner),
+) -> Any:
+    """
+    清理超过CHANGE_LOG_TOMBSTONE_RETENTION_DAYS的传感器配置删除记录，可由定时任务调用
+
+    清理所有公司的删除记录并推进全局的已清理版本号，since更早的客户端都需要全量同步
+    """
+    deleted = await db.run(
+        compact_sensor_config_tombstones,
+        retention=timedelta(days=settings.CHANGE_LOG_TOMBSTONE_RETENTION_DAYS),
+    )
+    return ResponseModel[ChangeLogCompactResult](data=ChangeLogCompactResult(deleted=deleted))
@@ -0,0 +1,57 @@
+"""
+运维命令行工具，生产模式(STARTUP_MODE=production)下worker启动时不再建表和创建默认用户，由部署流程单独执行
+
+用法:
+    alembic upgrade head
+    python -m app.cli seed-default-user
+    python -m app.cli init-db    # 开发环境：按模型建表并创建默认用户
+    python -m app.cli partition-sensor-configs --partitions 16    # 传感器配置表转为按公司哈希分区
+"""
+import argparse
+import logging
+
+from app.db.init_db import create_tables, seed_default_user
+from app.db.partition import partition_sensor_configs
+from app.db.session import SessionLocal, engine
+
+
+def seed_default_user_command(args: argparse.Namespace) -> None:
+    db = SessionLocal()
+    try:
+        created = seed_default_user(db)
+    finally:
+        db.close()
+    print("默认用户已创建" if created else "默认用户已存在，跳过")
+
+
+def init_db_command(args: argparse.Namespace) -> None:
+    create_tables()
+    seed_default_user_command(args)
+
+
+def partition_sensor_configs_command(args: argparse.Namespace) -> None:
+    with engine.begin() as connection:
+        partition_sensor_configs(connection, args.partitions)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("seed-default-user", help="创建默认用户，已存在时跳过").set_defaults(
+        handler=seed_default_user_command
+    )
+    subparsers.add_parser("init-db", help="按模型建表并创建默认用户，仅用于开发环境").set_defaults(
+        handler=init_db_command
+    )
+    partition_parser = subparsers.add_parser(
+        "partition-sensor-configs", help="将传感器配置表转换为按company_id哈希分区的表，仅PostgreSQL"
+    )
+    partition_parser.add_argument("--partitions", type=int, default=16, help="分区数")
+    partition_parser.set_defaults(handler=partition_sensor_configs_command)
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import logging
+import time
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 并发计数键的过期时间，worker异常退出未释放的计数最长在该时间后清除
+SLOT_TTL_SECONDS = 300
+
+
+class AdmissionBudget:
+    """
+    一组路由的准入预算，path为路由前缀
+    """
+    __slots__ = ("name", "path", "key", "rate", "burst", "concurrency", "max_inflight")
+
+    def __init__(
+        self, name: str, path: str, key: str, rate: float, burst: int, concurrency: int, max_inflight: int
+    ):
+        self.name = name
+        self.path = path
+        self.key = key
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.max_inflight = max_inflight
+
+
+def build_admission_budgets() -> List[AdmissionBudget]:
+    """
+    按配置生成登录接口和配置接口的准入预算
+    """
+    return [
+        AdmissionBudget(
+            "signin",
+            f"{settings.API_V1_STR}/auth/SignIn",
+            settings.ADMISSION_SIGNIN_KEY,
+            settings.ADMISSION_SIGNIN_RATE,
+            settings.ADMISSION_SIGNIN_BURST,
+            settings.ADMISSION_SIGNIN_CONCURRENCY,
+            settings.ADMISSION_SIGNIN_MAX_INFLIGHT,
+        ),
+        AdmissionBudget(
+            "config",
+            f"{settings.API_V1_STR}/config/",
+            settings.ADMISSION_CONFIG_KEY,
+            settings.ADMISSION_CONFIG_RATE,
+            settings.ADMISSION_CONFIG_BURST,
+            settings.ADMISSION_CONFIG_CONCURRENCY,
+            settings.ADMISSION_CONFIG_MAX_INFLIGHT,
+        ),
+    ]
+
+
+def _gcra(stored_tat: Optional[float], now: float, rate: float, burst: int) -> tuple:
+    """
+    令牌桶的GCRA形式，每个键只保存下一个令牌的理论到达时间
+
+    返回(新的理论到达时间, 需要等待的秒数)，等待秒数为0表示放行
+    """
+    interval = 1 / rate
+    new_tat = max(stored_tat or now, now) + interval
+    excess = new_tat - now - burst * interval
+    return new_tat, max(excess, 0.0)
+
+
+class MemoryAdmissionStore:
+    """
+    进程内准入计数，每个worker独立限流
+
+    只在事件循环线程中访问，不需要加锁；令牌已补满的键等同于不存在，键数量增长时顺带清除
+    """
+    def __init__(self, sweep_threshold: int = 10000):
+        self._tats: Dict[str, float] = {}
+        self._slots: Dict[str, int] = {}
+        self._sweep_threshold = sweep_threshold
+        self._sweep_at = sweep_threshold
+
+    async def take_token(self, key: str, rate: float, burst: int) -> float:
+        """
+        从令牌桶取一个令牌，返回需要等待的秒数，0为放行
+        """
+        now = time.monotonic()
+        new_tat, retry_after = _gcra(self._tats.get(key), now, rate, burst)
+        if retry_after:
+            return retry_after
+        self._tats[key] = new_tat
+        if len(self._tats) > self._sweep_at:
+            self._tats = {k: tat for k, tat in self._tats.items() if tat > now}
+            self._sweep_at = max(self._sweep_threshold, len(self._tats) * 2)
+        return 0.0
+
+    async def acquire_slot(self, key: str, limit: int) -> Optional[bool]:
+        """
+        占用一个并发名额，返回True为已占用，False为名额已满，None为计数不可用（放行且不需要释放）
+        """
+        count = self._slots.get(key, 0)
+        if count >= limit:
+            return False
+        self._slots[key] = count + 1
+        return True
+
+    async def release_slot(self, key: str) -> None:
+        count = self._slots.get(key, 0) - 1
+        if count > 0:
+            self._slots[key] = count
+        else:
+            self._slots.pop(key, None)
+
+
+# 令牌桶：KEYS[1]保存理论到达时间，ARGV为(速率, 突发量, 键过期毫秒数)，返回需要等待的秒数（字符串），"0"为放行
+# 时间取Redis服务器时间，各主机时钟不一致不影响限流
+RATE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local interval = 1 / tonumber(ARGV[1])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+local excess = new_tat - now - tonumber(ARGV[2]) * interval
+if excess > 0 then
+    return tostring(excess)
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000) + tonumber(ARGV[3]))
+return '0'
+"""
+# 并发名额：KEYS[1]为计数，ARGV为(上限, 过期秒数)，返回1为已占用，0为名额已满
+SLOT_SCRIPT = """
+local count = redis.call('INCR', KEYS[1])
+if count > tonumber(ARGV[1]) then
+    redis.call('DECR', KEYS[1])
+    return 0
+end
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]))
+return 1
+"""
+
+
+class RedisAdmissionStore:
+    """
+    基于Redis（或兼容Redis协议的服务）的共享准入计数，所有worker和主机共用令牌桶和并发名额
+
+    令牌桶和并发名额各通过一个Lua脚本原子更新，每次判断只需一次往返；并发名额的计数键带过期时间。
+    Redis不可用时放行请求，不因限流组件故障拒绝服务。redis为可选依赖，仅在使用该后端时导入
+    """
+    def __init__(self, url: str, prefix: str = "admission:"):
+        import redis
+        import redis.asyncio as redis_asyncio
+
+        self._errors = redis.RedisError
+        self.prefix = prefix
+        self._client = redis_asyncio.from_url(url)
+        self._rate_script = self._client.register_script(RATE_SCRIPT)
+        self._slot_script = self._client.register_script(SLOT_SCRIPT)
+
+    async def take_token(self, key: str, rate: float, burst: int) -> float:
+        try:
+            retry_after = await self._rate_script(keys=[f"{self.prefix}rate:{key}"], args=[rate, burst, 1000])
+        except self._errors:
+            logger.warning("准入控制令牌桶读取失败，直接放行", exc_info=True)
+            return 0.0
+        return float(retry_after)
+
+    async def acquire_slot(self, key: str, limit: int) -> Optional[bool]:
+        try:
+            held = await self._slot_script(keys=[f"{self.prefix}slot:{key}"], args=[limit, SLOT_TTL_SECONDS])
+        except self._errors:
+            logger.warning("准入控制并发计数失败，直接放行", exc_info=True)
+            return None
+        return bool(held)
+
+    async def release_slot(self, key: str) -> None:
+        try:
+            await self._client.decr(f"{self.prefix}slot:{key}")
+        except self._errors:
+            # 未释放的名额在计数键过期后清除
+            logger.warning("准入控制并发计数释放失败", exc_info=True)
+
+
+def create_admission_store():
+    """
+    按ADMISSION_BACKEND创建准入计数存储，未开启时返回None
+    """
+    backend = settings.ADMISSION_BACKEND
+    if backend == "memory":
+        return MemoryAdmissionStore()
+    if backend == "redis":
+        if not settings.ADMISSION_REDIS_URL:
+            raise RuntimeError("ADMISSION_BACKEND=redis 需要设置ADMISSION_REDIS_URL")
+        return RedisAdmissionStore(settings.ADMISSION_REDIS_URL)
+    return None
@@ -0,0 +1,172 @@
+import gzip
+import math
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import msgpack
+
+from app.core.serialization import dumps
+from app.core.sensor_config_io import MODEL_FIELD_KEYS
+
+try:
+    import brotli
+except ImportError:  # brotli为可选依赖，未安装时只提供gzip压缩
+    brotli = None
+
+# 配置包中传感器的字段顺序，传感器和物模型字段都以数组表示，字段名只在包头出现一次
+BUNDLE_SENSOR_KEYS = ("id", "sensorID", "sensorName", "modelToken", "modelName", "modelFieldList")
+BUNDLE_FIELD_KEYS = MODEL_FIELD_KEYS
+# 写入时解析为数值的物模型字段，无法解析的值保留原字符串
+NUMERIC_FIELD_KEYS = frozenset(("ratio", "triggerValue", "upperLimit", "lowerLimit", "correctValue", "ngateval"))
+
+BUNDLE_MEDIA_TYPES = {"json": "application/json", "msgpack": "application/msgpack"}
+# 服务端偏好顺序，客户端对多个候选给出相同权重时按该顺序选择
+BUNDLE_FORMATS = ("json", "msgpack")
+BUNDLE_ENCODINGS = ("br", "gzip", "identity") if brotli is not None else ("gzip", "identity")
+
+# 配置包写入一次、下载多次，使用较高的压缩级别
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+
+def parse_number(value: str) -> Union[int, float, str]:
+    """
+    将数值字符串解析为int或float，无法解析或非有限值时返回原字符串
+    """
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return number if math.isfinite(number) else value
+
+
+def build_bundle(port: str, revision: int, sensor_configs: Iterable[Any]) -> Dict[str, Any]:
+    """
+    构建串口配置包，sensor_configs为数据库模型或列名相同的查询行
+    """
+    sensors = []
+    for sensor_config in sensor_configs:
+        fields = [
+            [
+                parse_number(model_field[key]) if key in NUMERIC_FIELD_KEYS else model_field[key]
+                for key in BUNDLE_FIELD_KEYS
+            ]
+            for model_field in sensor_config.model_fields
+        ]
+        sensors.append([
+            sensor_config.id,
+            sensor_config.sensor_id,
+            sensor_config.sensor_name,
+            sensor_config.model_token,
+            sensor_config.model_name,
+            fields,
+        ])
+    return {
+        "port": port,
+        "revision": revision,
+        "sensorKeys": BUNDLE_SENSOR_KEYS,
+        "fieldKeys": BUNDLE_FIELD_KEYS,
+        "sensors": sensors,
+    }
+
+
+def encode_bundle(bundle: Dict[str, Any]) -> Dict[Tuple[str, str], bytes]:
+    """
+    将配置包编码为全部格式和压缩方式，返回{(格式, 压缩方式): 字节}
+    """
+    encoded = {
+        "json": dumps(bundle),
+        "msgpack": msgpack.packb(bundle, use_bin_type=True),
+    }
+    contents = {}
+    for bundle_format, content in encoded.items():
+        contents[(bundle_format, "identity")] = content
+        # mtime固定为0，相同内容的压缩结果在各worker中逐字节一致
+        contents[(bundle_format, "gzip")] = gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)
+        if brotli is not None:
+            contents[(bundle_format, "br")] = brotli.compress(content, quality=BROTLI_QUALITY)
+    return contents
+
+
+def _parse_qualities(header: Optional[str]) -> List[Tuple[str, float]]:
+    """
+    解析Accept/Accept-Encoding请求头，返回[(值, 权重)]
+    """
+    qualities = []
+    for item in (header or "").split(","):
+        value, *params = [part.strip() for part in item.split(";")]
+        if not value:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, param_value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(param_value)
+                except ValueError:
+                    quality = 0.0
+        qualities.append((value.lower(), quality))
+    return qualities
+
+
+def _select(candidates: Sequence[str], matches, default_quality) -> Optional[str]:
+    """
+    按权重选择候选值，精确匹配优先于通配符，权重相同时按候选顺序
+    """
+    best = None
+    best_rank = (0.0, 0)
+    for candidate in candidates:
+        rank = matches(candidate)
+        if rank is None:
+            rank = (default_quality(candidate), 0)
+        if rank[0] > 0 and rank > best_rank:
+            best, best_rank = candidate, rank
+    return best
+
+
+def negotiate_format(accept: Optional[str]) -> Optional[str]:
+    """
+    根据Accept请求头选择配置包格式，没有可接受的格式时返回None
+    """
+    qualities = _parse_qualities(accept)
+    if not qualities:
+        return BUNDLE_FORMATS[0]
+
+    def matches(bundle_format: str):
+        media_type = BUNDLE_MEDIA_TYPES[bundle_format]
+        main_type = media_type.split("/")[0]
+        ranks = []
+        for value, quality in qualities:
+            # application/x-msgpack为msgpack常用的旧类型名
+            if value == media_type or (bundle_format == "msgpack" and value == "application/x-msgpack"):
+                ranks.append((2, quality))
+            elif value == f"{main_type}/*":
+                ranks.append((1, quality))
+            elif value == "*/*":
+                ranks.append((0, quality))
+        if not ranks:
+            return None
+        specificity, quality = max(ranks)
+        return quality, specificity
+
+    return _select(BUNDLE_FORMATS, matches, lambda bundle_format: 0.0)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> str:
+    """
+    根据Accept-Encoding请求头选择压缩方式，未声明时不压缩
+    """
+    qualities = dict(_parse_qualities(accept_encoding))
+
+    def matches(encoding: str):
+        if encoding in qualities:
+            return qualities[encoding], 1
+        if "*" in qualities:
+            return qualities["*"], 0
+        return None
+
+    # identity未被明确排除时始终可接受，但优先级最低
+    return _select(BUNDLE_ENCODINGS, matches, lambda encoding: 0.001 if encoding == "identity" else 0.0) or "identity"
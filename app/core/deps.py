@@ -1,13 +1,17 @@
-from typing import Generator, Optional
+import secrets
+import time
+from typing import Awaitable, Callable, Optional, Tuple
 
 from fastapi import Depends, HTTPException, status, Request
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.security import APIKeyHeader, HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy import event
 
+from app.core.cache import LRUCache
 from app.core.config import settings
 from app.crud.user import get_user_by_id
-from app.db.session import get_db
+from app.db.session import SessionRunner, get_read_session_runner, run_in_session
+from app.models.user import User
 from app.schemas.user import UserInDB
 
 class CustomHTTPBearer(HTTPBearer):
@@ -29,45 +33,129 @@ class CustomHTTPBearer(HTTPBearer):
 
 # 使用自定义的Bearer认证
 security = CustomHTTPBearer()
+# 内部接口令牌
+internal_token_header = APIKeyHeader(name="X-Internal-Token", auto_error=False)
 
+# token -> (用户ID, 公司ID)，过期时间不超过token本身的有效期
+token_cache = LRUCache(maxsize=settings.AUTH_CACHE_MAX_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+# 用户ID -> UserInDB，用户记录变更时失效
+user_cache = LRUCache(maxsize=settings.AUTH_CACHE_MAX_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def invalidate_user_cache(mapper, connection, target: User) -> None:
+    """
+    用户记录通过ORM更新或删除时清除缓存，其他worker中的缓存在TTL后过期
+    """
+    user_cache.pop(target.id)
+
+
+def decode_token_claims(token: str) -> Optional[Tuple[int, Optional[int]]]:
+    """
+    校验token签名和有效期，返回(用户ID, 公司ID)，token无效时返回None
+
+    解码结果按token缓存，认证依赖和准入控制中间件共用
+    """
+    # 如果token以"Bearer "开头，则去掉前缀
+    if token.startswith("Bearer "):
+        token = token[7:]
+
+    claims: Optional[Tuple[int, Optional[int]]] = token_cache.get(token)
+    if claims is None:
+        try:
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+            )
+            sub: Optional[str] = payload.get("sub")
+            if sub is None:
+                return None
+            company_id = payload.get("companyID")
+            claims = (int(sub), int(company_id) if company_id is not None else None)
+        except (JWTError, ValueError):
+            return None
+        ttl = settings.AUTH_CACHE_TTL_SECONDS
+        if payload.get("exp") is not None:
+            ttl = min(ttl, payload["exp"] - time.time())
+        token_cache.set(token, claims, ttl=ttl)
+    return claims
+
+
+async def _authenticate(
+    credentials: HTTPAuthorizationCredentials, load_user: Callable[[int], Awaitable[Optional[User]]]
 ) -> UserInDB:
     """
-    获取当前用户
+    校验token并返回用户，缓存未命中时通过load_user查询数据库
+
+    返回用户的company_id取自token中的companyID，配置数据按该公司隔离，确定租户不需要额外查询；
+    不含companyID的token使用用户记录中的公司
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        token = credentials.credentials
-        # 如果token以"Bearer "开头，则去掉前缀
-        if token.startswith("Bearer "):
-            token = token[7:]
-            
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        user_id: Optional[str] = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+    claims = decode_token_claims(credentials.credentials)
+    if claims is None:
         raise credentials_exception
-    
-    user = get_user_by_id(db, int(user_id))
-    if user is None:
-        raise credentials_exception
-    
-    return UserInDB.model_validate(
-        {
-            "id": user.id,
-            "account": user.account,
-            "name": user.name,
-            "company_id": user.company_id,
-            "company_name": user.company_name,
-        }
-    ) 
\ No newline at end of file
+    user_id, company_id = claims
+
+    current_user: Optional[UserInDB] = user_cache.get(user_id)
+    if current_user is None:
+        user = await load_user(user_id)
+        if user is None:
+            raise credentials_exception
+
+        current_user = UserInDB.model_validate(
+            {
+                "id": user.id,
+                "account": user.account,
+                "name": user.name,
+                "company_id": user.company_id,
+                "company_name": user.company_name,
+            }
+        )
+        user_cache.set(user_id, current_user)
+
+    if company_id is not None and company_id != current_user.company_id:
+        current_user = current_user.model_copy(update={"company_id": company_id})
+    return current_user
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: SessionRunner = Depends(get_read_session_runner)
+) -> UserInDB:
+    """
+    获取当前用户，缓存未命中时在只读会话中查询用户
+    """
+    return await _authenticate(credentials, lambda user_id: db.run(get_user_by_id, user_id))
+
+
+async def require_internal_token(internal_token: Optional[str] = Depends(internal_token_header)) -> None:
+    """
+    校验内部接口令牌
+
+    内部接口影响所有公司的数据或返回整个worker的运行状态，不接受用户token，
+    只允许持有INTERNAL_API_TOKEN的运维工具和定时任务调用；未设置INTERNAL_API_TOKEN时全部拒绝
+    """
+    expected = settings.INTERNAL_API_TOKEN
+    if not expected or internal_token is None or not secrets.compare_digest(
+        internal_token.encode("utf-8"), expected.encode("utf-8")
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="内部接口需要有效的X-Internal-Token",
+        )
+
+
+async def get_current_user_detached(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+) -> UserInDB:
+    """
+    获取当前用户，不使用请求级数据库会话
+
+    用于SSE、长轮询等长时间挂起的请求。请求级会话要到响应结束才关闭，查询用户后会一直占用连接；
+    这里在独立的短会话中查询，查完即归还连接
+    """
+    return await _authenticate(credentials, lambda user_id: run_in_session(get_user_by_id, user_id))
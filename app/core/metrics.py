@@ -0,0 +1,289 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+DB_STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+
+class Counter:
+    """
+    计数器，按标签值累加
+    """
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.series: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1) -> None:
+        self.series[labels] = self.series.get(labels, 0) + amount
+
+    def dump(self) -> List[list]:
+        return [[list(labels), value] for labels, value in self.series.items()]
+
+
+class Histogram:
+    """
+    直方图，每个标签组合保存[各桶计数, 总和, 总数]，桶计数为非累积值，输出时再累加
+    """
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        data = self.series.get(labels)
+        if data is None:
+            # 最后一个桶对应+Inf
+            data = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        data[0][bisect_left(self.buckets, value)] += 1
+        data[1] += value
+        data[2] += 1
+
+    def dump(self) -> List[list]:
+        return [[list(labels), [list(data[0]), data[1], data[2]]] for labels, data in self.series.items()]
+
+
+class MetricsRegistry:
+    """
+    进程内指标注册表
+
+    指标只在事件循环线程中更新，不需要加锁；多worker部署时各worker定期把快照写入
+    METRICS_MULTIPROC_DIR下的独立文件，/metrics读取全部文件合并后输出
+    """
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str]) -> Counter:
+        metric = self.metrics[name] = Counter(name, documentation, labelnames)
+        return metric
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str],
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        metric = self.metrics[name] = Histogram(name, documentation, labelnames, buckets)
+        return metric
+
+    def snapshot(self) -> dict:
+        """
+        导出可JSON序列化的快照
+        """
+        return {
+            name: {
+                "type": metric.type,
+                "help": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", ())),
+                "series": metric.dump(),
+            }
+            for name, metric in self.metrics.items()
+        }
+
+
+def merge_snapshots(snapshots: Iterable[dict]) -> dict:
+    """
+    合并多个worker的快照，同名同标签的计数、桶计数、总和相加
+    """
+    merged: dict = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "series": {}})
+            for labels, value in metric["series"]:
+                key = tuple(labels)
+                if metric["type"] == "counter":
+                    target["series"][key] = target["series"].get(key, 0) + value
+                    continue
+                current = target["series"].get(key)
+                if current is None or len(current[0]) != len(value[0]):
+                    target["series"][key] = [list(value[0]), value[1], value[2]]
+                else:
+                    current[0] = [a + b for a, b in zip(current[0], value[0])]
+                    current[1] += value[1]
+                    current[2] += value[2]
+    for metric in merged.values():
+        metric["series"] = [[list(labels), value] for labels, value in metric["series"].items()]
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def render_prometheus(snapshot: dict) -> str:
+    """
+    按Prometheus文本格式(0.0.4)输出快照
+    """
+    lines = []
+    for name, metric in sorted(snapshot.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labelnames = metric["labelnames"]
+        for labels, value in sorted(metric["series"], key=lambda item: item[0]):
+            if metric["type"] == "counter":
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+                continue
+            bucket_counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(list(metric["buckets"]) + ["+Inf"], bucket_counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else _format_value(float(bound))
+                lines.append(f"{name}_bucket{_format_labels(labelnames, labels, ('le', le))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labelnames, labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP请求数", ("method", "route", "status")
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP请求处理耗时(秒)", ("method", "route", "status")
+)
+http_request_db_statements = registry.histogram(
+    "http_request_db_statements", "单个请求执行的SQL语句数", ("method", "route"), DB_STATEMENT_BUCKETS
+)
+http_request_db_duration_seconds = registry.histogram(
+    "http_request_db_duration_seconds", "单个请求的SQL执行总耗时(秒)", ("method", "route")
+)
+http_requests_rejected_total = registry.counter(
+    "http_requests_rejected_total", "准入控制拒绝的请求数", ("budget", "reason")
+)
+
+
+class RequestDBStats:
+    """
+    单个请求的数据库统计，由SQLAlchemy引擎事件累加
+    """
+    __slots__ = ("statements", "duration")
+
+    def __init__(self):
+        self.statements = 0
+        self.duration = 0.0
+
+
+# 当前请求的数据库统计，在中间件中设置；线程池中执行的CRUD函数会复制上下文，累加到同一个对象
+request_db_stats: ContextVar[Optional[RequestDBStats]] = ContextVar("request_db_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("metrics_query_start")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats = request_db_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.duration += elapsed
+
+
+def _handle_error(exception_context):
+    # 执行出错时不会触发after_cursor_execute，丢弃对应的开始时间
+    conn = exception_context.connection
+    if conn is not None:
+        started = conn.info.get("metrics_query_start")
+        if started:
+            started.pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    为同步引擎注册SQL计时事件，异步引擎传入async_engine.sync_engine
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _snapshot_path(pid: Optional[int] = None) -> str:
+    return os.path.join(settings.METRICS_MULTIPROC_DIR, f"metrics_{pid or os.getpid()}.json")
+
+
+def _write_snapshot(snapshot: dict) -> None:
+    path = _snapshot_path()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+
+def _read_snapshots(own_snapshot: dict) -> List[dict]:
+    snapshots = [own_snapshot]
+    own_path = _snapshot_path()
+    for path in glob.glob(os.path.join(settings.METRICS_MULTIPROC_DIR, "metrics_*.json")):
+        if path == own_path:
+            continue
+        try:
+            with open(path, encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            # 其他worker正在替换文件或文件已损坏，本次跳过
+            logger.warning(f"读取指标文件失败: {path}")
+    return snapshots
+
+
+async def collect_metrics() -> str:
+    """
+    生成/metrics响应内容，配置了METRICS_MULTIPROC_DIR时合并所有worker的数据
+    """
+    snapshot = registry.snapshot()
+    if not settings.METRICS_MULTIPROC_DIR:
+        return render_prometheus(snapshot)
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, _write_snapshot, snapshot)
+    snapshots = await loop.run_in_executor(None, _read_snapshots, snapshot)
+    return render_prometheus(merge_snapshots(snapshots))
+
+
+async def metrics_flush_loop() -> None:
+    """
+    多worker模式下定期把本worker的快照写入文件，供其他worker的/metrics合并
+    """
+    os.makedirs(settings.METRICS_MULTIPROC_DIR, exist_ok=True)
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, _write_snapshot, registry.snapshot())
+        except OSError:
+            logger.exception("写入指标文件失败")
+        await asyncio.sleep(settings.METRICS_FLUSH_INTERVAL_SECONDS)
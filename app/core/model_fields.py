@@ -0,0 +1,78 @@
+from typing import Any, Dict, List, Optional
+
+
+def merge_model_fields(
+    template_fields: List[Dict[str, Any]], overrides: Optional[List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """
+    由物模型模板字段列表和配置的差异还原配置的物模型字段列表
+
+    没有差异时直接返回模板列表本身，同一模板的配置共用一个列表，调用方不应修改
+    """
+    if overrides is None:
+        return template_fields
+    return [
+        {**(template_fields[index] if index < len(template_fields) else {}), **override}
+        for index, override in enumerate(overrides)
+    ]
+
+
+def diff_model_fields(
+    template_fields: List[Dict[str, Any]], model_fields: List[Dict[str, Any]]
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    计算物模型字段列表与模板的差异，与模板相同时返回None
+
+    差异列表与model_fields等长，每项只保留与模板同一下标字段不同的属性，超出模板长度的字段保留全部属性
+    """
+    if model_fields == template_fields:
+        return None
+    return [
+        {
+            key: value
+            for key, value in model_field.items()
+            if index >= len(template_fields) or template_fields[index].get(key) != value
+        }
+        for index, model_field in enumerate(model_fields)
+    ]
+
+
+def rebase_model_field_overrides(
+    old_template_fields: List[Dict[str, Any]],
+    new_template_fields: List[Dict[str, Any]],
+    overrides: Optional[List[Dict[str, Any]]],
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    模板变更后重新计算配置的差异，与新模板相同时返回None
+
+    与模板相同的属性随新模板变更，差异保持不变。字段数与旧模板相同的配置随新模板增减字段；
+    字段数与旧模板不同的配置保持原字段数，超出新模板长度的字段保存完整属性
+    """
+    if overrides is None:
+        return None
+    if len(overrides) == len(old_template_fields):
+        model_fields = [
+            {**template_field, **(overrides[index] if index < len(overrides) else {})}
+            for index, template_field in enumerate(new_template_fields)
+        ]
+    else:
+        old_fields = merge_model_fields(old_template_fields, overrides)
+        model_fields = [
+            {**new_template_fields[index], **override} if index < len(new_template_fields) else old_fields[index]
+            for index, override in enumerate(overrides)
+        ]
+    return diff_model_fields(new_template_fields, model_fields)
+
+
+class ResolvedRow:
+    """
+    查询行加上合并后的物模型字段列表，属性访问方式与数据库模型相同
+    """
+    __slots__ = ("_row", "model_fields")
+
+    def __init__(self, row: Any, model_fields: List[Dict[str, Any]]):
+        self._row = row
+        self.model_fields = model_fields
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._row, name)
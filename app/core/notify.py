@@ -0,0 +1,217 @@
+import asyncio
+import json
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL LISTEN/NOTIFY通道名
+CHANNEL = "sensor_config_changes"
+# 监听连接重连后发送给变更监听回调，表示期间任意配置都可能已变更
+RESYNC_TOPIC = "resync"
+
+
+def company_topic(company_id: int) -> str:
+    """
+    公司全部配置变更的主题
+    """
+    return f"company:{company_id}"
+
+
+def port_topic(company_id: int, port: str) -> str:
+    """
+    公司指定串口配置变更的主题
+    """
+    return f"company:{company_id}:port:{port}"
+
+
+class Subscription:
+    """
+    变更订阅，只保存最新的变更版本号和一个事件，多次变更合并为一次通知，空闲连接几乎不占内存
+    """
+    __slots__ = ("topics", "revision", "event")
+
+    def __init__(self, topics: Iterable[str]):
+        self.topics = tuple(topics)
+        self.revision = 0
+        self.event = asyncio.Event()
+
+    def notify(self, revision: int) -> None:
+        self.revision = max(self.revision, revision)
+        self.event.set()
+
+    async def wait(self, timeout: Optional[float] = None) -> Optional[int]:
+        """
+        等待下一次变更，返回变更版本号，超时返回None
+        """
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self.event.clear()
+        return self.revision
+
+
+class NotificationHub:
+    """
+    进程内变更通知分发
+
+    订阅和分发都在事件循环线程中执行；线程池中提交的事务通过publish_threadsafe切换到事件循环分发
+    """
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        self.loop = asyncio.get_running_loop()
+        subscription = Subscription(topics)
+        for topic in subscription.topics:
+            self._subscriptions.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        for topic in subscription.topics:
+            subscriptions = self._subscriptions.get(topic)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[topic]
+
+    def dispatch(self, topics: Iterable[str], revision: int) -> None:
+        for topic in topics:
+            for subscription in self._subscriptions.get(topic, ()):
+                subscription.notify(revision)
+
+    def publish_threadsafe(self, topics: Iterable[str], revision: int) -> None:
+        if self.loop is None or self.loop.is_closed():
+            # 还没有任何订阅，无需分发
+            return
+        self.loop.call_soon_threadsafe(self.dispatch, tuple(topics), revision)
+
+    def __len__(self) -> int:
+        return len({subscription for subscriptions in self._subscriptions.values() for subscription in subscriptions})
+
+
+hub = NotificationHub()
+
+
+# 变更监听回调，参数为变更主题，用于缓存失效等需要同步执行的处理
+ChangeListener = Callable[[Sequence[str]], None]
+_change_listeners: List[Tuple[ChangeListener, bool]] = []
+
+
+def add_change_listener(listener: ChangeListener, *, include_remote: bool = True) -> None:
+    """
+    注册变更监听回调
+
+    本进程提交的变更在提交后于提交线程中同步回调；include_remote为True时，
+    PostgreSQL下其他worker和主机提交的变更也会在收到通知时于事件循环中回调
+    """
+    _change_listeners.append((listener, include_remote))
+
+
+def _call_change_listeners(topics: Sequence[str], remote: bool) -> None:
+    for listener, include_remote in _change_listeners:
+        if remote and not include_remote:
+            continue
+        try:
+            listener(topics)
+        except Exception:
+            logger.exception("配置变更监听回调异常")
+
+
+def _use_postgres(db: Session) -> bool:
+    if settings.NOTIFY_BACKEND == "local":
+        return False
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def notify_sensor_config_change(db: Session, *, company_id: int, ports: Iterable[str], revision: int) -> None:
+    """
+    通知传感器配置变更，与变更在同一事务中调用，事务提交后才会送达，回滚时丢弃
+
+    PostgreSQL下通过pg_notify发送，所有worker和主机的监听连接都会收到；其他数据库在提交后分发给本进程的订阅
+    """
+    topics = [company_topic(company_id), *(port_topic(company_id, port) for port in sorted(set(ports)))]
+    use_postgres = _use_postgres(db)
+    if use_postgres:
+        payload = json.dumps({"topics": topics, "revision": revision}, ensure_ascii=False)
+        db.execute(select(func.pg_notify(CHANNEL, payload)))
+    db.info.setdefault("pending_notifications", []).append((topics, revision, use_postgres))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_notifications(session: Session) -> None:
+    for topics, revision, sent in session.info.pop("pending_notifications", ()):
+        _call_change_listeners(topics, remote=False)
+        if not sent:
+            hub.publish_threadsafe(topics, revision)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_notifications(session: Session) -> None:
+    session.info.pop("pending_notifications", None)
+
+
+async def _listen_postgres(dsn: str) -> None:
+    """
+    使用独立的asyncpg连接LISTEN变更通道，断线后自动重连
+    """
+    import asyncpg
+
+    def on_notification(connection, pid, channel, payload):
+        try:
+            message = json.loads(payload)
+            topics, revision = message["topics"], message["revision"]
+        except (ValueError, KeyError):
+            logger.warning(f"无效的配置变更通知: {payload}")
+            return
+        hub.dispatch(topics, revision)
+        _call_change_listeners(topics, remote=True)
+
+    while True:
+        connection = None
+        try:
+            connection = await asyncpg.connect(dsn)
+            await connection.add_listener(CHANNEL, on_notification)
+            # 重连期间的变更可能丢失，通知所有订阅者和监听回调重新检查
+            hub.dispatch(list(hub._subscriptions), 0)
+            _call_change_listeners([RESYNC_TOPIC], remote=True)
+            while not connection.is_closed():
+                await asyncio.sleep(settings.NOTIFY_LISTEN_HEALTHCHECK_SECONDS)
+                await connection.execute("SELECT 1")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("配置变更监听连接异常，稍后重连")
+        finally:
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+        await asyncio.sleep(settings.NOTIFY_LISTEN_RECONNECT_SECONDS)
+
+
+_listener_task: Optional[asyncio.Task] = None
+
+
+def start_notifications(dialect_name: str) -> None:
+    """
+    启动变更通知，PostgreSQL下启动LISTEN任务
+    """
+    global _listener_task
+    hub.loop = asyncio.get_running_loop()
+    if settings.NOTIFY_BACKEND == "local" or dialect_name != "postgresql" or _listener_task is not None:
+        return
+    dsn = "postgresql://" + str(settings.DATABASE_URL).split("://", 1)[1]
+    _listener_task = asyncio.create_task(_listen_postgres(dsn))
+
+
+def stop_notifications() -> None:
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        _listener_task = None
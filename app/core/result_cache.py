@@ -0,0 +1,231 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple, TypeVar
+
+from app.core.config import settings
+from app.core.notify import RESYNC_TOPIC, add_change_listener
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def make_digest(*parts: Any) -> str:
+    """
+    由规范化后的查询参数生成缓存键摘要
+    """
+    return hashlib.sha1(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class MemoryResultCache:
+    """
+    进程内查询结果缓存，保存序列化后的响应字节，按条目数和总字节数LRU淘汰
+
+    每个失效标签有一个代数，缓存键包含查询开始前读取的代数。写入提交后代数加一，
+    与提交并发的查询即使晚于失效写入缓存，也只会写到旧代数的键上，不会被再次读到，随LRU淘汰
+    """
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    async def lookup(self, tag: str, digest: str) -> Tuple[str, Optional[bytes]]:
+        """
+        返回(缓存键, 缓存内容)，未命中时内容为None，查询完成后用该键写入
+        """
+        with self._lock:
+            key = f"{self._epoch}:{tag}:{self._generations.get(tag, 0)}:{digest}"
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+            return key, value
+
+    async def store(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._data[key] = value
+            self._bytes += len(value)
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def invalidate(self, tags: Sequence[str]) -> None:
+        with self._lock:
+            if RESYNC_TOPIC in tags:
+                self._epoch += 1
+                self._data.clear()
+                self._bytes = 0
+                return
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxSize": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+class RedisResultCache:
+    """
+    基于Redis（或兼容Redis协议的服务）的共享查询结果缓存，所有worker共用缓存内容和失效代数
+
+    查询在事件循环中通过异步客户端执行；失效在写入事务提交后于提交线程中通过同步客户端执行。
+    内存上限和淘汰由Redis的maxmemory和allkeys-lru策略控制，条目另设过期时间兜底。
+    redis为可选依赖，仅在使用该后端时导入
+    """
+    def __init__(self, url: str, ttl: int, max_bytes: int, prefix: str = "sensor_config_query:"):
+        import redis
+        import redis.asyncio as redis_asyncio
+
+        self._errors = redis.RedisError
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self._client = redis_asyncio.from_url(url)
+        self._sync_client = redis.from_url(url)
+
+    async def lookup(self, tag: str, digest: str) -> Tuple[Optional[str], Optional[bytes]]:
+        try:
+            generation = await self._client.get(f"{self.prefix}gen:{tag}")
+            key = f"{self.prefix}{tag}:{int(generation or 0)}:{digest}"
+            value = await self._client.get(key)
+        except self._errors:
+            logger.warning("查询结果缓存读取失败，直接查询数据库", exc_info=True)
+            return None, None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return key, value
+
+    async def store(self, key: Optional[str], value: bytes) -> None:
+        if key is None or len(value) > self.max_bytes:
+            return
+        try:
+            await self._client.set(key, value, ex=self.ttl)
+        except self._errors:
+            logger.warning("查询结果缓存写入失败", exc_info=True)
+
+    def invalidate(self, tags: Sequence[str]) -> None:
+        try:
+            pipeline = self._sync_client.pipeline(transaction=False)
+            for tag in tags:
+                pipeline.incr(f"{self.prefix}gen:{tag}")
+            pipeline.execute()
+        except self._errors:
+            # 失效失败时缓存内容最长在过期时间后更新
+            logger.exception(f"查询结果缓存失效失败: {tags}")
+
+    def stats(self) -> dict:
+        return {"size": 0, "maxSize": 0, "hits": self.hits, "misses": self.misses}
+
+
+class QueryCoalescer:
+    """
+    进程内相同查询合并：同一查询正在执行时，之后到达的相同请求等待它完成并共用序列化后的响应字节
+
+    不是缓存，查询完成后立即移除，只在时间上重叠的请求之间共享结果。与MemoryResultCache相同，
+    键包含查询开始前读取的失效标签代数，变更提交后到达的请求不会加入提交前开始的查询
+    """
+    def __init__(self):
+        self.leaders = 0
+        self.followers = 0
+        self._calls: Dict[str, "asyncio.Future[Any]"] = {}
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    async def run(self, tag: str, digest: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        执行fn或等待正在执行的相同查询，返回其结果（通常为响应字节）；查询失败时所有等待的请求得到同一异常
+        """
+        with self._lock:
+            key = f"{self._epoch}:{tag}:{self._generations.get(tag, 0)}:{digest}"
+        task = self._calls.get(key)
+        if task is not None:
+            self.followers += 1
+            return await asyncio.shield(task)
+
+        self.leaders += 1
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # 查询使用发起请求的数据库会话，请求被取消时等查询结束再退出，会话在此之后才由依赖关闭
+            await asyncio.wait([task])
+            raise
+
+    def _finish(self, key: str, task: "asyncio.Future[Any]") -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # 没有请求在等待时避免未读取异常的警告
+            task.exception()
+
+    def invalidate(self, tags: Sequence[str]) -> None:
+        with self._lock:
+            if RESYNC_TOPIC in tags:
+                self._epoch += 1
+                return
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def stats(self) -> dict:
+        return {"size": len(self._calls), "maxSize": 0, "hits": self.followers, "misses": self.leaders}
+
+
+def create_query_cache():
+    """
+    按QUERY_CACHE_BACKEND创建传感器配置查询结果缓存，未开启时返回None
+    """
+    backend = settings.QUERY_CACHE_BACKEND
+    if backend == "memory":
+        cache = MemoryResultCache(settings.QUERY_CACHE_MAX_ENTRIES, settings.QUERY_CACHE_MAX_BYTES)
+        # 其他worker和主机提交的变更通过PostgreSQL LISTEN/NOTIFY到达后同样失效本进程的缓存
+        add_change_listener(cache.invalidate)
+        return cache
+    if backend == "redis":
+        if not settings.QUERY_CACHE_REDIS_URL:
+            raise RuntimeError("QUERY_CACHE_BACKEND=redis 需要设置QUERY_CACHE_REDIS_URL")
+        cache = RedisResultCache(
+            settings.QUERY_CACHE_REDIS_URL, settings.QUERY_CACHE_TTL_SECONDS, settings.QUERY_CACHE_MAX_BYTES
+        )
+        # 失效代数保存在Redis中，只需在提交变更的进程中失效一次
+        add_change_listener(cache.invalidate, include_remote=False)
+        return cache
+    return None
+
+
+def create_query_coalescer() -> Optional[QueryCoalescer]:
+    """
+    按QUERY_COALESCING创建相同查询合并器，关闭时返回None
+    """
+    if not settings.QUERY_COALESCING:
+        return None
+    coalescer = QueryCoalescer()
+    # 其他worker和主机提交的变更同样使之后的请求开始新的查询
+    add_change_listener(coalescer.invalidate)
+    return coalescer
+
+
+query_cache = create_query_cache()
+query_coalescer = create_query_coalescer()
@@ -0,0 +1,85 @@
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, Set, Tuple
+
+
+class NgramIndex:
+    """
+    进程内n-gram倒排索引，用于不支持pg_trgm的数据库上的子串搜索
+
+    索引内容为小写后的文本，查询时先按n-gram求交集得到候选集，再逐个校验子串
+    """
+    def __init__(self, n: int = 3):
+        self.n = n
+        self.loaded = False
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._texts: Dict[int, str] = {}
+        self.lock = threading.RLock()
+
+    def _grams(self, text: str) -> Set[str]:
+        return {text[i:i + self.n] for i in range(len(text) - self.n + 1)}
+
+    def load(self, items: Iterable[Tuple[int, str]]) -> None:
+        """
+        全量重建索引
+        """
+        with self.lock:
+            self._postings.clear()
+            self._texts.clear()
+            for doc_id, text in items:
+                self._add(doc_id, text)
+            self.loaded = True
+
+    def add(self, doc_id: int, text: str) -> None:
+        """
+        新增或替换索引条目，索引尚未加载时忽略，加载时会读取最新数据
+        """
+        with self.lock:
+            if self.loaded:
+                self._remove(doc_id)
+                self._add(doc_id, text)
+
+    def remove(self, doc_id: int) -> None:
+        """
+        删除索引条目
+        """
+        with self.lock:
+            if self.loaded:
+                self._remove(doc_id)
+
+    def search(self, query: str) -> Set[int]:
+        """
+        返回文本中包含query（不区分大小写）的条目ID
+        """
+        query = query.lower()
+        with self.lock:
+            if len(query) < self.n:
+                # 查询词短于n时无法使用倒排表，直接扫描内存中的文本
+                return {doc_id for doc_id, text in self._texts.items() if query in text}
+            postings = sorted((self._postings.get(gram, set()) for gram in self._grams(query)), key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates &= posting
+                if not candidates:
+                    break
+            return {doc_id for doc_id in candidates if query in self._texts[doc_id]}
+
+    def _add(self, doc_id: int, text: str) -> None:
+        text = text.lower()
+        self._texts[doc_id] = text
+        for gram in self._grams(text):
+            self._postings[gram].add(doc_id)
+
+    def _remove(self, doc_id: int) -> None:
+        text = self._texts.pop(doc_id, None)
+        if text is None:
+            return
+        for gram in self._grams(text):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(doc_id)
+                if not posting:
+                    del self._postings[gram]
+
+    def __len__(self) -> int:
+        return len(self._texts)
@@ -1,12 +1,41 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional, Union
+from typing import Any, Callable, Dict, Optional, TypeVar, Union
 
 from jose import jwt
-from passlib.context import CryptContext
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@functools.lru_cache(maxsize=None)
+def get_pwd_context():
+    """
+    密码哈希上下文，首次使用时导入passlib，只在登录和创建用户时需要，不拖慢worker启动
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+
+# 密码哈希专用进程池，避免bcrypt占用线程池和GIL，首次使用时创建
+_password_executor: Optional[ProcessPoolExecutor] = None
+# 当前worker中排队和执行中的密码哈希任务数，仅在事件循环线程中修改
+_password_tasks = 0
+
+
+class PasswordHasherBusyError(Exception):
+    """
+    密码哈希进程池排队已满
+    """
 
 
 def create_access_token(
@@ -34,11 +63,64 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     验证密码
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """
     获取密码哈希
     """
-    return pwd_context.hash(password) 
\ No newline at end of file
+    return get_pwd_context().hash(password)
+
+
+def _get_password_executor() -> ProcessPoolExecutor:
+    global _password_executor
+    if _password_executor is None:
+        _password_executor = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _password_executor
+
+
+async def _run_password_task(fn: Callable[..., T], *args: Any) -> T:
+    """
+    在密码哈希进程池中执行任务，排队任务数达到上限时立即抛出PasswordHasherBusyError
+
+    子进程异常退出（如被OOM终止）后进程池不可再用，丢弃该进程池并抛出PasswordHasherBusyError，
+    下一次任务创建新的进程池
+    """
+    global _password_executor, _password_tasks
+    if _password_tasks >= settings.PASSWORD_HASH_QUEUE_LIMIT:
+        raise PasswordHasherBusyError("密码校验繁忙，请稍后重试")
+    _password_tasks += 1
+    executor = _get_password_executor()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, fn, *args)
+    except BrokenProcessPool as exc:
+        # 同一进程池上并发的任务都会失败，只由第一个任务丢弃
+        if _password_executor is executor:
+            logger.warning("密码哈希进程池子进程异常退出，重新创建进程池", exc_info=True)
+            executor.shutdown(wait=False, cancel_futures=True)
+            _password_executor = None
+        raise PasswordHasherBusyError("密码校验繁忙，请稍后重试") from exc
+    finally:
+        _password_tasks -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    在独立进程池中验证密码
+    """
+    return await _run_password_task(verify_password, plain_password, hashed_password)
+
+
+def shutdown_password_executor() -> None:
+    """
+    关闭密码哈希进程池
+    """
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False, cancel_futures=True)
+        _password_executor = None
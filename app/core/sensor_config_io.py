@@ -0,0 +1,194 @@
+import codecs
+import csv
+import io
+import json
+import zlib
+from typing import Any, AsyncIterator, Iterable, Optional, Tuple, Union
+
+from pydantic import ValidationError
+
+from app.core.model_fields import ResolvedRow, merge_model_fields
+from app.core.serialization import dumps
+from app.schemas.sensor_config import ModelField, SensorConfigCreate
+
+# CSV导入的列，modelFieldList列为JSON字符串
+CSV_COLUMNS = ("port", "sensorID", "sensorName", "modelToken", "modelName", "modelFieldList")
+# CSV导出的列，包含导入所需的全部列，导出文件可直接导入
+EXPORT_CSV_COLUMNS = (
+    "id", *CSV_COLUMNS, "createUserID", "createTime", "updateUserID", "updateTime"
+)
+MODEL_FIELD_KEYS = tuple(ModelField.model_fields)
+
+
+class ImportFormatError(ValueError):
+    """
+    导入数据整体格式错误（编码错误、CSV表头缺列、JSON不是数组等），无法逐行报告
+    """
+
+
+def detect_import_format(content_type: Optional[str]) -> str:
+    """
+    根据Content-Type判断导入格式，默认为JSON数组
+    """
+    content_type = (content_type or "").lower()
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonl" in content_type or "json-seq" in content_type:
+        return "ndjson"
+    return "json"
+
+
+async def _iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    按行增量解码请求体，兼容UTF-8 BOM和CRLF换行
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    try:
+        async for chunk in stream:
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                yield line.rstrip("\r")
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError as exc:
+        raise ImportFormatError("导入数据不是有效的UTF-8编码") from exc
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_import_records(
+    stream: AsyncIterator[bytes], import_format: str
+) -> AsyncIterator[Tuple[int, Union[str, dict, Any]]]:
+    """
+    增量解析导入数据，逐条返回(行号, 原始记录)
+
+    行号为数据记录序号，从1开始，不含CSV表头和空行。NDJSON记录为JSON字符串，CSV记录为按表头组成的字典，
+    JSON数组的记录为数组元素
+    """
+    if import_format == "json":
+        body = b"".join([chunk async for chunk in stream])
+        try:
+            items = json.loads(body)
+        except ValueError as exc:
+            raise ImportFormatError(f"导入数据不是有效的JSON: {exc}") from exc
+        if not isinstance(items, list):
+            raise ImportFormatError("JSON格式的导入数据必须是数组")
+        for row, item in enumerate(items, start=1):
+            yield row, item
+        return
+
+    row = 0
+    header = None
+    record = ""
+    async for line in _iter_lines(stream):
+        if import_format == "ndjson":
+            if line.strip():
+                row += 1
+                yield row, line
+            continue
+
+        # CSV的引号字段内可以包含换行，引号数为奇数时说明记录尚未结束
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue
+        line, record = record, ""
+        if not line.strip():
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [column.strip() for column in values]
+            missing = [column for column in CSV_COLUMNS if column not in header]
+            if missing:
+                raise ImportFormatError(f"CSV表头缺少列: {', '.join(missing)}")
+            continue
+        row += 1
+        yield row, dict(zip(header, values))
+    if record:
+        raise ImportFormatError("CSV数据不完整，引号未闭合")
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" if error["loc"] else error["msg"]
+        for error in exc.errors()
+    )
+
+
+def validate_import_record(record: Union[str, dict, Any]) -> Union[SensorConfigCreate, str]:
+    """
+    按SensorConfigCreate校验单条记录，失败时返回错误信息
+    """
+    try:
+        if isinstance(record, str):
+            return SensorConfigCreate.model_validate_json(record)
+        if isinstance(record, dict) and isinstance(record.get("modelFieldList"), str):
+            # CSV记录的modelFieldList列为JSON字符串
+            try:
+                record = {**record, "modelFieldList": json.loads(record["modelFieldList"])}
+            except ValueError:
+                return "modelFieldList: 不是有效的JSON"
+        return SensorConfigCreate.model_validate(record)
+    except ValidationError as exc:
+        return _format_validation_error(exc)
+
+
+def convert_to_response_dict(sensor_config: Any) -> dict:
+    """
+    将数据库模型（或列名相同的查询行）直接转换为响应字典，不经过pydantic校验
+
+    键顺序与SensorConfigInDB的字段顺序一致，物模型字段按ModelField的字段顺序重建，保证序列化结果与响应模型相同
+    """
+    return {
+        "port": sensor_config.port,
+        "sensorID": sensor_config.sensor_id,
+        "sensorName": sensor_config.sensor_name,
+        "modelToken": sensor_config.model_token,
+        "modelName": sensor_config.model_name,
+        "modelFieldList": [
+            {key: model_field[key] for key in MODEL_FIELD_KEYS}
+            for model_field in sensor_config.model_fields
+        ],
+        "id": sensor_config.id,
+        "createUserID": sensor_config.creator_id,
+        "createTime": sensor_config.created_at,
+        "updateUserID": sensor_config.updater_id,
+        "updateTime": sensor_config.updated_at,
+    }
+
+
+def format_export_rows(rows: Iterable[Any], export_format: str, header: bool = False) -> bytes:
+    """
+    将一批查询行格式化为NDJSON或CSV，header为True时在CSV前输出表头
+
+    查询行包含模板字段列表template_fields和配置的差异model_field_overrides，在此合并
+    """
+    rows = [
+        ResolvedRow(row, merge_model_fields(row.template_fields or [], row.model_field_overrides)) for row in rows
+    ]
+    if export_format == "ndjson":
+        return b"".join(dumps(convert_to_response_dict(row)) + b"\n" for row in rows)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(EXPORT_CSV_COLUMNS)
+    for row in rows:
+        item = convert_to_response_dict(row)
+        item["modelFieldList"] = json.dumps(item["modelFieldList"], ensure_ascii=False)
+        item["createTime"] = item["createTime"].isoformat() if item["createTime"] else ""
+        item["updateTime"] = item["updateTime"].isoformat() if item["updateTime"] else ""
+        writer.writerow([item[column] for column in EXPORT_CSV_COLUMNS])
+    return buffer.getvalue().encode("utf-8")
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """
+    边生成边gzip压缩，只保留压缩器内部的窗口，不缓存完整数据
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,20 @@
+from typing import Any
+
+import pydantic_core
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    将由dict/list/str/int/datetime等组成的数据序列化为紧凑的UTF-8 JSON
+
+    输出与FastAPI默认响应逐字节一致：不转义非ASCII字符，datetime格式与pydantic相同（UTC时区输出为Z）。
+    安装了orjson时使用orjson，否则使用pydantic_core.to_json
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_UTC_Z)
+    return pydantic_core.to_json(obj)
@@ -0,0 +1,93 @@
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.model_fields import merge_model_fields
+from app.models.model_template import ModelTemplate
+from app.models.sensor_config import SensorConfig
+
+
+def get_model_template_fields(
+    db: Session, *, company_id: int, model_tokens: Iterable[str]
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    一次查询取出公司多个物模型模板的字段列表，返回{物模型编号: 字段列表}
+    """
+    model_tokens = sorted(set(model_tokens))
+    if not model_tokens:
+        return {}
+    return dict(db.execute(
+        select(ModelTemplate.model_token, ModelTemplate.model_fields).where(
+            ModelTemplate.company_id == company_id, ModelTemplate.model_token.in_(model_tokens)
+        )
+    ).all())
+
+
+def attach_model_fields(db: Session, *, company_id: int, sensor_configs: Sequence[SensorConfig]) -> None:
+    """
+    为读取出的传感器配置填充合并后的物模型字段列表
+
+    每个请求中不同的模板只加载一次，无论有多少条配置引用
+    """
+    templates = get_model_template_fields(
+        db, company_id=company_id, model_tokens=(sensor_config.model_token for sensor_config in sensor_configs)
+    )
+    for sensor_config in sensor_configs:
+        sensor_config.model_fields = merge_model_fields(
+            templates.get(sensor_config.model_token, []), sensor_config.model_field_overrides
+        )
+
+
+def ensure_model_templates(
+    db: Session,
+    *,
+    company_id: int,
+    candidates: Dict[str, Tuple[str, List[Dict[str, Any]]]],
+    updater_id: int,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    确保公司的物模型模板存在，返回{物模型编号: 模板字段列表}，由调用方提交
+
+    candidates为{物模型编号: (物模型名称, 字段列表)}，模板不存在时以候选项创建，已存在（包括并发创建）时保持不变
+    """
+    if not candidates:
+        return {}
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    db.execute(
+        insert(ModelTemplate).on_conflict_do_nothing(
+            index_elements=[ModelTemplate.company_id, ModelTemplate.model_token]
+        ),
+        [
+            {
+                "company_id": company_id,
+                "model_token": model_token,
+                "model_name": model_name,
+                "model_fields": model_fields,
+                "updater_id": updater_id,
+            }
+            for model_token, (model_name, model_fields) in candidates.items()
+        ],
+    )
+    return get_model_template_fields(db, company_id=company_id, model_tokens=candidates)
+
+
+def get_model_templates(db: Session, *, company_id: int) -> List[Tuple[ModelTemplate, int, int]]:
+    """
+    获取公司的物模型模板列表，返回[(模板, 引用的配置数, 其中有差异的配置数)]
+    """
+    stmt = (
+        select(ModelTemplate, func.count(SensorConfig.id), func.count(SensorConfig.model_field_overrides))
+        .outerjoin(
+            SensorConfig,
+            and_(
+                SensorConfig.company_id == ModelTemplate.company_id,
+                SensorConfig.model_token == ModelTemplate.model_token,
+            ),
+        )
+        .where(ModelTemplate.company_id == company_id)
+        .group_by(ModelTemplate.company_id, ModelTemplate.model_token)
+        .order_by(ModelTemplate.model_token)
+    )
+    return [tuple(row) for row in db.execute(stmt).all()]
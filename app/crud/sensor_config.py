@@ -1,92 +1,820 @@
-from typing import List, Optional
+import base64
+import itertools
+import json
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
 
-from sqlalchemy import and_, or_
+from sqlalchemy import (Integer, String, and_, bindparam, cast, delete, func, insert, literal, or_, select,
+                        text, tuple_, type_coerce, union, update)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.models.sensor_config import SensorConfig
+from app.core.config_bundle import build_bundle, encode_bundle
+from app.core.model_fields import (ResolvedRow, diff_model_fields, merge_model_fields,
+                                   rebase_model_field_overrides)
+from app.core.notify import notify_sensor_config_change
+from app.core.search import NgramIndex
+from app.crud.model_template import attach_model_fields, ensure_model_templates, get_model_template_fields
+from app.db.explain import ExplainJSON
+from app.models.model_template import ModelTemplate
+from app.models.sensor_config import (SensorConfig, SensorConfigBundle, SensorConfigChangeLog,
+                                       SensorConfigPortRevision, SensorConfigTombstone)
+from app.schemas.model_template import ModelTemplateUpdate
 from app.schemas.sensor_config import SensorConfigCreate, SensorConfigUpdate
 
+# 非PostgreSQL数据库（如测试用的SQLite）下按公司的传感器名称子串索引，公司ID -> 索引，首次搜索时加载。
+# 索引只随本进程提交的增删改同步，其他worker、命令行脚本的写入不会更新，只适用于单进程的开发和测试环境；
+# 索引只用于缩小候选范围，查询时仍由数据库按ILIKE校验
+sensor_name_indexes: Dict[int, NgramIndex] = {}
+_sensor_name_indexes_lock = threading.Lock()
+
+# 候选ID超过该数量时说明过滤条件区分度很低，直接扫表比大IN列表更快
+SENSOR_NAME_INDEX_MAX_IDS = 10000
+
+# 批量导入时每条INSERT语句的行数
+IMPORT_BATCH_SIZE = 1000
+
+# 导出时服务端游标每次读取的行数
+EXPORT_BATCH_SIZE = 1000
+
+
+class ConcurrentUpdateError(Exception):
+    """
+    批量写入时与并发请求冲突，事务已回滚，可重试
+    """
+
+
+class ChangeLogResyncError(Exception):
+    """
+    增量同步的起始版本号无效（早于已清理的删除记录，或大于当前版本号），需要全量同步
+    """
+
+
+class SensorIdConflictError(Exception):
+    """
+    同一公司同一串口下传感器ID重复，由(company_id, port, sensor_id)唯一约束保证
+    """
+    def __init__(self, port: str, sensor_id: int):
+        super().__init__(f"传感器ID {sensor_id} 在串口 {port} 下已存在")
+        self.port = port
+        self.sensor_id = sensor_id
+
+
+def _insert(db: Session):
+    """
+    返回当前数据库方言的insert构造函数，用于ON CONFLICT语句
+    """
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+
+def _model_field_overrides(
+    db: Session,
+    *,
+    company_id: int,
+    sensor_configs: Sequence[Union[SensorConfigCreate, SensorConfigUpdate]],
+    updater_id: int,
+) -> List[Optional[List[Dict]]]:
+    """
+    确保配置引用的物模型模板存在，返回与输入一一对应的物模型字段差异，与模板相同为None
+
+    物模型编号没有模板时，以本批配置中引用最多的字段列表创建，其余配置保存差异
+    """
+    model_fields = [
+        [field.model_dump() for field in sensor_config.modelFieldList] for sensor_config in sensor_configs
+    ]
+    variants: Dict[str, Counter] = {}
+    first_seen: Dict[Tuple[str, str], Tuple[str, List[Dict]]] = {}
+    for sensor_config, fields in zip(sensor_configs, model_fields):
+        key = json.dumps(fields, sort_keys=True)
+        variants.setdefault(sensor_config.modelToken, Counter())[key] += 1
+        first_seen.setdefault((sensor_config.modelToken, key), (sensor_config.modelName, fields))
+    candidates = {
+        model_token: first_seen[(model_token, counter.most_common(1)[0][0])]
+        for model_token, counter in variants.items()
+    }
+    templates = ensure_model_templates(db, company_id=company_id, candidates=candidates, updater_id=updater_id)
+    return [
+        diff_model_fields(templates[sensor_config.modelToken], fields)
+        for sensor_config, fields in zip(sensor_configs, model_fields)
+    ]
+
 
 def create_sensor_config(
-    db: Session, *, sensor_config: SensorConfigCreate, creator_id: int
-) -> SensorConfig:
+    db: Session, *, company_id: int, sensor_config: SensorConfigCreate, creator_id: int
+) -> int:
     """
-    创建传感器配置
+    创建传感器配置，返回新配置ID
+
+    通过INSERT ... ON CONFLICT DO NOTHING RETURNING一条语句完成唯一性校验和插入
     """
-    db_sensor_config = SensorConfig(
+    (overrides,) = _model_field_overrides(
+        db, company_id=company_id, sensor_configs=[sensor_config], updater_id=creator_id
+    )
+    bump_port_revisions(db, company_id=company_id, ports=[sensor_config.port])
+    revision = allocate_revisions(db, 1)
+    stmt = _insert(db)(SensorConfig).values(
+        company_id=company_id,
         port=sensor_config.port,
         sensor_id=sensor_config.sensorID,
         sensor_name=sensor_config.sensorName,
         model_token=sensor_config.modelToken,
         model_name=sensor_config.modelName,
-        model_fields=[field.model_dump() for field in sensor_config.modelFieldList],
+        model_field_overrides=overrides,
         creator_id=creator_id,
         updater_id=creator_id,
+        revision=revision,
     )
-    db.add(db_sensor_config)
+    stmt = stmt.on_conflict_do_nothing(
+        index_elements=[SensorConfig.company_id, SensorConfig.port, SensorConfig.sensor_id]
+    ).returning(SensorConfig.id)
+    sensor_config_id = db.execute(stmt).scalar()
+    if sensor_config_id is None:
+        db.rollback()
+        raise SensorIdConflictError(sensor_config.port, sensor_config.sensorID)
+
+    _port_configs_changed(db, company_id=company_id, ports=[sensor_config.port], revision=revision)
+    db.commit()
+    _sync_sensor_name_index(company_id, sensor_config_id, sensor_config.sensorName)
+    return sensor_config_id
+
+
+def _existing_port_sensor_ids(db: Session, company_id: int, keys: Set[Tuple[str, int]]) -> Set[Tuple[str, int]]:
+    """
+    查询公司在表中已存在的(串口, 传感器ID)
+
+    PostgreSQL下把全部键作为两个数组参数，通过unnest与唯一索引连接，一条语句完成；
+    其他数据库按批使用行值IN查询
+    """
+    if not keys:
+        return set()
+    if db.get_bind().dialect.name == "postgresql":
+        ports, sensor_ids = zip(*keys)
+        pairs = func.unnest(
+            bindparam("ports", list(ports), type_=postgresql.ARRAY(String)),
+            bindparam("sensor_ids", list(sensor_ids), type_=postgresql.ARRAY(Integer)),
+        ).table_valued("port", "sensor_id").render_derived()
+        stmt = select(SensorConfig.port, SensorConfig.sensor_id).join(
+            pairs,
+            and_(
+                SensorConfig.company_id == company_id,
+                SensorConfig.port == pairs.c.port,
+                SensorConfig.sensor_id == pairs.c.sensor_id,
+            ),
+        )
+        return {tuple(row) for row in db.execute(stmt)}
+
+    existing = set()
+    keys = list(keys)
+    for start in range(0, len(keys), IMPORT_BATCH_SIZE):
+        stmt = select(SensorConfig.port, SensorConfig.sensor_id).where(
+            SensorConfig.company_id == company_id,
+            tuple_(SensorConfig.port, SensorConfig.sensor_id).in_(keys[start:start + IMPORT_BATCH_SIZE]),
+        )
+        existing.update(tuple(row) for row in db.execute(stmt))
+    return existing
+
+
+def import_sensor_configs(
+    db: Session, *, company_id: int, sensor_configs: Sequence[SensorConfigCreate], creator_id: int
+) -> Tuple[int, List[Tuple[int, str]]]:
+    """
+    批量导入传感器配置，返回导入条数和失败项列表[(下标, 原因)]
+
+    批内重复的(串口, 传感器ID)只保留第一条，与表中已有数据的冲突通过一次集合查询找出；
+    其余数据按IMPORT_BATCH_SIZE分批executemany插入，全部在一个事务中提交
+    """
+    errors: List[Tuple[int, str]] = []
+    keys: Set[Tuple[str, int]] = set()
+    candidates = []
+    for index, sensor_config in enumerate(sensor_configs):
+        key = (sensor_config.port, sensor_config.sensorID)
+        if key in keys:
+            errors.append((index, f"传感器ID {sensor_config.sensorID} 在串口 {sensor_config.port} 下重复"))
+            continue
+        keys.add(key)
+        candidates.append(index)
+
+    existing = _existing_port_sensor_ids(db, company_id, keys)
+    pending = []
+    for index in candidates:
+        sensor_config = sensor_configs[index]
+        if (sensor_config.port, sensor_config.sensorID) in existing:
+            errors.append((index, str(SensorIdConflictError(sensor_config.port, sensor_config.sensorID))))
+        else:
+            pending.append(index)
+
+    overrides = _model_field_overrides(
+        db, company_id=company_id, sensor_configs=[sensor_configs[index] for index in pending], updater_id=creator_id
+    )
+    # 检查之后并发写入的冲突行由ON CONFLICT DO NOTHING跳过，不会出现在RETURNING结果中
+    stmt = _insert(db)(SensorConfig).on_conflict_do_nothing(
+        index_elements=[SensorConfig.company_id, SensorConfig.port, SensorConfig.sensor_id]
+    ).returning(SensorConfig.id, SensorConfig.port, SensorConfig.sensor_id)
+    inserted = {}
+    # 全局变更版本号最后分配，版本行锁只在插入和提交期间持有；并发写入跳过的行所在串口多加一次版本号不影响设备
+    bump_port_revisions(db, company_id=company_id, ports={sensor_configs[index].port for index in pending})
+    # 每条配置分配独立的变更版本号
+    first_revision = allocate_revisions(db, len(pending)) if pending else 0
+    for start in range(0, len(pending), IMPORT_BATCH_SIZE):
+        rows = [
+            {
+                "company_id": company_id,
+                "port": sensor_configs[index].port,
+                "sensor_id": sensor_configs[index].sensorID,
+                "sensor_name": sensor_configs[index].sensorName,
+                "model_token": sensor_configs[index].modelToken,
+                "model_name": sensor_configs[index].modelName,
+                "model_field_overrides": overrides[offset],
+                "creator_id": creator_id,
+                "updater_id": creator_id,
+                "revision": first_revision + offset,
+            }
+            for offset, index in enumerate(pending[start:start + IMPORT_BATCH_SIZE], start=start)
+        ]
+        for sensor_config_id, port, sensor_id in db.execute(stmt, rows):
+            inserted[(port, sensor_id)] = sensor_config_id
+
+    for index in pending:
+        sensor_config = sensor_configs[index]
+        if (sensor_config.port, sensor_config.sensorID) not in inserted:
+            errors.append((index, str(SensorIdConflictError(sensor_config.port, sensor_config.sensorID))))
+
+    if inserted:
+        _port_configs_changed(
+            db,
+            company_id=company_id,
+            ports={port for port, _ in inserted},
+            revision=first_revision + len(pending) - 1,
+        )
     db.commit()
-    db.refresh(db_sensor_config)
-    return db_sensor_config
+    for index in pending:
+        sensor_config = sensor_configs[index]
+        sensor_config_id = inserted.get((sensor_config.port, sensor_config.sensorID))
+        if sensor_config_id is not None:
+            _sync_sensor_name_index(company_id, sensor_config_id, sensor_config.sensorName)
+    errors.sort()
+    return len(inserted), errors
 
 
 def get_sensor_configs(
-    db: Session, *, port: Optional[str] = None, sensor_name: Optional[str] = None
+    db: Session,
+    *,
+    company_id: int,
+    port: Optional[str] = None,
+    sensor_name: Optional[str] = None,
+    model_field: Optional[Dict[str, str]] = None,
 ) -> List[SensorConfig]:
     """
-    获取传感器配置列表
+    获取公司的传感器配置列表
+    """
+    query = _filter_sensor_configs(
+        db, db.query(SensorConfig), company_id=company_id, port=port, sensor_name=sensor_name,
+        model_field=model_field,
+    )
+    # 按ID排序，与分页查询的默认顺序一致，不随执行计划选用的索引变化
+    sensor_configs = query.order_by(SensorConfig.id).all()
+    attach_model_fields(db, company_id=company_id, sensor_configs=sensor_configs)
+    return sensor_configs
+
+
+def _filter_sensor_configs(
+    db: Session,
+    query,
+    *,
+    company_id: int,
+    port: Optional[str] = None,
+    sensor_name: Optional[str] = None,
+    model_field: Optional[Dict[str, str]] = None,
+):
+    """
+    为查询添加公司、串口、传感器名称和物模型字段过滤条件，Query和Select均可使用
     """
-    query = db.query(SensorConfig)
+    query = query.filter(SensorConfig.company_id == company_id)
     if port:
         query = query.filter(SensorConfig.port == port)
     if sensor_name:
-        query = query.filter(SensorConfig.sensor_name.ilike(f"%{sensor_name}%"))
-    return query.all()
+        query = query.filter(_sensor_name_condition(db, company_id, sensor_name))
+    if model_field:
+        query = query.filter(_model_field_condition(db, company_id, model_field))
+    return query
 
 
-def get_sensor_config_by_id(db: Session, sensor_config_id: int) -> Optional[SensorConfig]:
+def _sync_sensor_name_index(company_id: int, doc_id: int, sensor_name: Optional[str] = None) -> None:
     """
-    通过ID获取传感器配置
+    提交后同步公司的进程内传感器名称索引，sensor_name为None表示删除，公司的索引尚未加载时忽略
     """
-    return db.query(SensorConfig).filter(SensorConfig.id == sensor_config_id).first()
+    index = sensor_name_indexes.get(company_id)
+    if index is None:
+        return
+    if sensor_name is None:
+        index.remove(doc_id)
+    else:
+        index.add(doc_id, sensor_name)
+
+
+def _sensor_name_condition(db: Session, company_id: int, sensor_name: str):
+    """
+    传感器名称子串匹配条件
+
+    PostgreSQL下ILIKE可以走pg_trgm的GIN索引；其他数据库先用公司的进程内n-gram索引求出候选ID，
+    再由数据库对候选行校验ILIKE，索引过期或与ILIKE的匹配规则（通配符、大小写）不同时结果仍以ILIKE为准
+    """
+    condition = SensorConfig.sensor_name.ilike(f"%{sensor_name}%")
+    # 索引按字面匹配，包含ILIKE通配符的查询求出的候选会漏掉匹配的行
+    if db.get_bind().dialect.name == "postgresql" or "%" in sensor_name or "_" in sensor_name:
+        return condition
+
+    with _sensor_name_indexes_lock:
+        index = sensor_name_indexes.setdefault(company_id, NgramIndex(n=3))
+    with index.lock:
+        if not index.loaded:
+            # 加载期间持有锁，并发写入的同步会在加载完成后执行，不会丢失
+            index.load(db.execute(
+                select(SensorConfig.id, SensorConfig.sensor_name).where(SensorConfig.company_id == company_id)
+            ).all())
+        ids = index.search(sensor_name)
+    if len(ids) > SENSOR_NAME_INDEX_MAX_IDS:
+        return condition
+    return and_(SensorConfig.id.in_(ids), condition)
+
+
+def _model_field_condition(db: Session, company_id: int, model_field: Dict[str, str]):
+    """
+    物模型字段过滤条件，合并模板与差异后存在某个字段的属性包含model_field中的所有键值时匹配
+
+    与模板相同的配置按物模型编号匹配：PostgreSQL下为模板表上的JSONB包含查询(@>)，可以走模板字段的GIN索引，
+    其他数据库（如测试用的SQLite）用json_each展开模板字段列表逐个比较。有差异的配置展开差异列表，
+    每个属性取差异中的值，差异中没有时取模板同一下标字段的值
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        template_matches = type_coerce(ModelTemplate.model_fields, postgresql.JSONB).contains([model_field])
+        override = func.jsonb_array_elements(SensorConfig.model_field_overrides).table_valued(
+            "value", with_ordinality="ordinality"
+        ).alias("override")
+
+        def attribute(key: str):
+            template_field = ModelTemplate.model_fields.op("->", return_type=postgresql.JSONB)(
+                cast(override.c.ordinality - 1, Integer)
+            )
+            return func.coalesce(
+                override.c.value.op("->>", return_type=String)(key),
+                template_field.op("->>", return_type=String)(key),
+            )
+    else:
+        template_field = func.json_each(ModelTemplate.model_fields).table_valued("value").alias("template_field")
+        template_matches = (
+            select(literal(1))
+            .select_from(template_field)
+            .where(*[func.json_extract(template_field.c.value, f"$.{key}") == value for key, value in model_field.items()])
+            .exists()
+        )
+        override = func.json_each(SensorConfig.model_field_overrides).table_valued("key", "value").alias("override")
+
+        def attribute(key: str):
+            return func.coalesce(
+                func.json_extract(override.c.value, f"$.{key}"),
+                func.json_extract(ModelTemplate.model_fields, func.printf(f"$[%d].{key}", override.c.key)),
+            )
+
+    matching_tokens = select(ModelTemplate.model_token).where(ModelTemplate.company_id == company_id, template_matches)
+    override_matches = (
+        select(literal(1))
+        .select_from(override)
+        .outerjoin(
+            ModelTemplate,
+            and_(
+                ModelTemplate.company_id == SensorConfig.company_id,
+                ModelTemplate.model_token == SensorConfig.model_token,
+            ),
+        )
+        .where(*[attribute(key) == value for key, value in model_field.items()])
+    )
+    return or_(
+        and_(SensorConfig.model_field_overrides.is_(None), SensorConfig.model_token.in_(matching_tokens)),
+        and_(SensorConfig.model_field_overrides.is_not(None), override_matches.exists()),
+    )
+
+
+def prepare_sensor_config_export(
+    db: Session, *, company_id: int, port: Optional[str] = None, sensor_name: Optional[str] = None
+):
+    """
+    准备导出查询，返回按ID排序、按EXPORT_BATCH_SIZE分批读取的列查询
+
+    PostgreSQL下先把当前事务设为REPEATABLE READ只读，导出期间的并发写入对导出结果不可见；
+    查询只选列不构造ORM对象，配合服务端游标内存占用与总行数无关。模板字段列表在同一快照中连接查出，
+    列名为template_fields
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        db.execute(text("SET TRANSACTION READ ONLY"))
+    stmt = select(*SensorConfig.__table__.columns, ModelTemplate.model_fields.label("template_fields")).outerjoin(
+        ModelTemplate,
+        and_(ModelTemplate.company_id == SensorConfig.company_id, ModelTemplate.model_token == SensorConfig.model_token),
+    )
+    stmt = _filter_sensor_configs(db, stmt, company_id=company_id, port=port, sensor_name=sensor_name)
+    return stmt.order_by(SensorConfig.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+def encode_page_cursor(sensor_config: SensorConfig, order_by: str) -> str:
+    """
+    根据当前页最后一行生成翻页游标
+    """
+    if order_by == "updateTime":
+        key = [sensor_config.updated_at.isoformat(), sensor_config.id]
+    else:
+        key = [sensor_config.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+
+
+def decode_page_cursor(cursor: str, order_by: str) -> list:
+    """
+    解析翻页游标，格式不正确时抛出ValueError
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if order_by == "updateTime":
+            updated_at, last_id = key
+            return [datetime.fromisoformat(updated_at), int(last_id)]
+        (last_id,) = key
+        return [int(last_id)]
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"无效的翻页游标: {cursor}") from exc
+
+
+def _timestamp_key(db: Session, value):
+    """
+    按时间排序和比较游标时使用的表达式
+
+    SQLite中时间以文本保存，CURRENT_TIMESTAMP写入的值不带小数秒，绑定的datetime参数带6位小数秒，
+    直接比较文本会跳过时间相同的行，两侧都规范化为相同格式后再比较
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return func.strftime("%Y-%m-%d %H:%M:%f", value)
+    return value
+
+
+def get_sensor_config_page(
+    db: Session,
+    *,
+    company_id: int,
+    port: Optional[str] = None,
+    sensor_name: Optional[str] = None,
+    model_field: Optional[Dict[str, str]] = None,
+    page_size: int,
+    page_num: Optional[int] = None,
+    cursor: Optional[str] = None,
+    order_by: str = "id",
+) -> Tuple[List[SensorConfig], Optional[str]]:
+    """
+    分页获取传感器配置列表
+
+    指定page_num时按偏移量分页，否则按游标(keyset)分页，返回当前页数据和下一页游标
+    """
+    if order_by == "updateTime":
+        order_columns = (_timestamp_key(db, SensorConfig.updated_at), SensorConfig.id)
+    else:
+        order_columns = (SensorConfig.id,)
+
+    stmt = _filter_sensor_configs(
+        db, select(SensorConfig), company_id=company_id, port=port, sensor_name=sensor_name,
+        model_field=model_field,
+    )
+    stmt = stmt.order_by(*order_columns)
+    if page_num is not None:
+        stmt = stmt.offset((page_num - 1) * page_size)
+    elif cursor:
+        key = decode_page_cursor(cursor, order_by)
+        if order_by == "updateTime":
+            key[0] = _timestamp_key(db, literal(key[0], SensorConfig.updated_at.type))
+        stmt = stmt.where(tuple_(*order_columns) > tuple_(*key))
+
+    # 多取一行用于判断是否存在下一页
+    sensor_configs = db.execute(stmt.limit(page_size + 1)).scalars().all()
+    next_cursor = None
+    if len(sensor_configs) > page_size:
+        sensor_configs = sensor_configs[:page_size]
+        next_cursor = encode_page_cursor(sensor_configs[-1], order_by)
+    attach_model_fields(db, company_id=company_id, sensor_configs=sensor_configs)
+    return sensor_configs, next_cursor
+
+
+def count_sensor_configs(
+    db: Session,
+    *,
+    company_id: int,
+    port: Optional[str] = None,
+    sensor_name: Optional[str] = None,
+    model_field: Optional[Dict[str, str]] = None,
+    approximate: bool = False,
+) -> int:
+    """
+    统计公司的传感器配置数量
+
+    approximate为True且使用PostgreSQL时读取查询计划的估算行数，避免大量数据全量count
+    """
+    if approximate and db.get_bind().dialect.name == "postgresql":
+        stmt = _filter_sensor_configs(
+            db, select(SensorConfig.id), company_id=company_id, port=port, sensor_name=sensor_name,
+            model_field=model_field,
+        )
+        plan = db.execute(ExplainJSON(stmt)).scalar()
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    stmt = _filter_sensor_configs(
+        db, select(func.count()).select_from(SensorConfig), company_id=company_id, port=port, sensor_name=sensor_name,
+        model_field=model_field,
+    )
+    return db.execute(stmt).scalar_one()
+
+
+def get_sensor_config_by_id(db: Session, sensor_config_id: int, *, company_id: int) -> Optional[SensorConfig]:
+    """
+    通过ID获取公司的传感器配置
+    """
+    sensor_config = db.query(SensorConfig).filter(
+        SensorConfig.company_id == company_id, SensorConfig.id == sensor_config_id
+    ).first()
+    if sensor_config is not None:
+        attach_model_fields(db, company_id=company_id, sensor_configs=[sensor_config])
+    return sensor_config
 
 
 def update_sensor_config(
-    db: Session, *, db_sensor_config: SensorConfig, sensor_config: SensorConfigUpdate, updater_id: int
-) -> SensorConfig:
+    db: Session, *, company_id: int, sensor_config: SensorConfigUpdate, updater_id: int
+) -> bool:
     """
-    更新传感器配置
+    更新传感器配置，配置不存在或不属于该公司时返回False
+
+    通过UPDATE ... RETURNING一条语句完成存在性判断和更新，唯一性由数据库约束保证
     """
-    update_data = sensor_config.model_dump(exclude={"id"})
-    
+    (overrides,) = _model_field_overrides(
+        db, company_id=company_id, sensor_configs=[sensor_config], updater_id=updater_id
+    )
+    # 串口变更时新旧串口的版本都需要更新，旧串口需在更新前按ID查出
+    bump_port_revisions(db, company_id=company_id, ports=[sensor_config.port], ids=[sensor_config.id])
+    # 移出原串口时为原串口写入删除记录，按串口增量同步的设备才能删除本地配置
+    revision = allocate_revisions(db, 2)
+    moved_from = db.execute(
+        insert(SensorConfigTombstone).from_select(
+            ["config_id", "company_id", "port", "sensor_id", "revision"],
+            select(
+                SensorConfig.id, SensorConfig.company_id, SensorConfig.port, SensorConfig.sensor_id, literal(revision)
+            ).where(
+                SensorConfig.company_id == company_id,
+                SensorConfig.id == sensor_config.id,
+                SensorConfig.port != sensor_config.port,
+            ),
+        ).returning(SensorConfigTombstone.port)
+    ).scalars().all()
+
     # 将驼峰命名转为下划线命名
-    db_sensor_config.port = update_data["port"]
-    db_sensor_config.sensor_id = update_data["sensorID"]
-    db_sensor_config.sensor_name = update_data["sensorName"]
-    db_sensor_config.model_token = update_data["modelToken"]
-    db_sensor_config.model_name = update_data["modelName"]
-    db_sensor_config.model_fields = [field.model_dump() for field in sensor_config.modelFieldList]
-    db_sensor_config.updater_id = updater_id
-    
-    db.add(db_sensor_config)
+    stmt = (
+        update(SensorConfig)
+        .where(SensorConfig.company_id == company_id, SensorConfig.id == sensor_config.id)
+        .values(
+            port=sensor_config.port,
+            sensor_id=sensor_config.sensorID,
+            sensor_name=sensor_config.sensorName,
+            model_token=sensor_config.modelToken,
+            model_name=sensor_config.modelName,
+            model_field_overrides=overrides,
+            updater_id=updater_id,
+            revision=revision + 1,
+        )
+        .returning(SensorConfig.id)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        updated_id = db.execute(stmt).scalar()
+    except IntegrityError:
+        db.rollback()
+        raise SensorIdConflictError(sensor_config.port, sensor_config.sensorID)
+    if updated_id is None:
+        db.rollback()
+        return False
+
+    _port_configs_changed(
+        db, company_id=company_id, ports=[sensor_config.port, *moved_from], revision=revision + 1
+    )
+    db.commit()
+    _sync_sensor_name_index(company_id, sensor_config.id, sensor_config.sensorName)
+    return True
+
+
+def update_sensor_configs(
+    db: Session,
+    *,
+    company_id: int,
+    sensor_configs: Sequence[SensorConfigUpdate],
+    updater_id: int,
+    atomic: bool = True,
+) -> List[Optional[str]]:
+    """
+    批量更新传感器配置，返回与输入一一对应的失败原因，成功为None
+
+    一条查询同时取出待更新配置和目标(串口, 传感器ID)的现有占用者，在内存中完成存在性和唯一性校验，
+    通过校验的项按主键executemany批量更新，在一个事务中提交。atomic为True时任一项失败则全部不更新
+    """
+    errors: List[Optional[str]] = [None] * len(sensor_configs)
+    ids: Set[int] = set()
+    keys: Set[Tuple[str, int]] = set()
+    for index, sensor_config in enumerate(sensor_configs):
+        key = (sensor_config.port, sensor_config.sensorID)
+        if sensor_config.id in ids:
+            errors[index] = f"传感器配置 ID {sensor_config.id} 在本次编辑中重复"
+        elif key in keys:
+            errors[index] = f"传感器ID {sensor_config.sensorID} 在串口 {sensor_config.port} 下重复"
+        ids.add(sensor_config.id)
+        keys.add(key)
+
+    # 其他公司的配置视为不存在
+    stmt = select(SensorConfig.id, SensorConfig.port, SensorConfig.sensor_id).where(
+        SensorConfig.company_id == company_id,
+        or_(SensorConfig.id.in_(ids), tuple_(SensorConfig.port, SensorConfig.sensor_id).in_(keys)),
+    )
+    # PostgreSQL下锁定相关行，避免校验后被并发修改或删除
+    rows = db.execute(stmt.with_for_update()).all()
+    current = {row.id: row for row in rows}
+    owners = {(row.port, row.sensor_id): row.id for row in rows}
+
+    for index, sensor_config in enumerate(sensor_configs):
+        if errors[index] is not None:
+            continue
+        owner = owners.get((sensor_config.port, sensor_config.sensorID))
+        if sensor_config.id not in current:
+            errors[index] = f"传感器配置 ID {sensor_config.id} 不存在"
+        elif owner is not None and owner != sensor_config.id:
+            errors[index] = str(SensorIdConflictError(sensor_config.port, sensor_config.sensorID))
+
+    if atomic and any(error is not None for error in errors):
+        db.rollback()
+        return [error or "其他配置项校验失败，未更新" for error in errors]
+
+    valid = [sensor_config for sensor_config, error in zip(sensor_configs, errors) if error is None]
+    if not valid:
+        db.rollback()
+        return errors
+
+    overrides = _model_field_overrides(db, company_id=company_id, sensor_configs=valid, updater_id=updater_id)
+    # 新旧串口的版本都需要更新，旧串口在更新前按ID查出
+    bump_port_revisions(
+        db,
+        company_id=company_id,
+        ports=[sensor_config.port for sensor_config in valid],
+        ids=[sensor_config.id for sensor_config in valid],
+    )
+    # 移出原串口的配置先写入原串口的删除记录，再以更大的版本号写入更新
+    moved = [sensor_config for sensor_config in valid if current[sensor_config.id].port != sensor_config.port]
+    first_revision = allocate_revisions(db, len(moved) + len(valid))
+    if moved:
+        db.execute(
+            insert(SensorConfigTombstone),
+            [
+                {
+                    "config_id": sensor_config.id,
+                    "company_id": company_id,
+                    "port": current[sensor_config.id].port,
+                    "sensor_id": current[sensor_config.id].sensor_id,
+                    "revision": first_revision + offset,
+                }
+                for offset, sensor_config in enumerate(moved)
+            ],
+        )
+    first_revision += len(moved)
+    try:
+        db.execute(
+            update(SensorConfig),
+            [
+                {
+                    "id": sensor_config.id,
+                    "port": sensor_config.port,
+                    "sensor_id": sensor_config.sensorID,
+                    "sensor_name": sensor_config.sensorName,
+                    "model_token": sensor_config.modelToken,
+                    "model_name": sensor_config.modelName,
+                    "model_field_overrides": overrides[offset],
+                    "updater_id": updater_id,
+                    "revision": first_revision + offset,
+                }
+                for offset, sensor_config in enumerate(valid)
+            ],
+        )
+    except IntegrityError as exc:
+        db.rollback()
+        raise ConcurrentUpdateError("批量编辑与其他修改冲突，请重试") from exc
+    ports = {sensor_config.port for sensor_config in valid}
+    ports.update(current[sensor_config.id].port for sensor_config in moved)
+    _port_configs_changed(db, company_id=company_id, ports=ports, revision=first_revision + len(valid) - 1)
     db.commit()
-    db.refresh(db_sensor_config)
-    return db_sensor_config
+    for sensor_config in valid:
+        _sync_sensor_name_index(company_id, sensor_config.id, sensor_config.sensorName)
+    return errors
 
 
-def delete_sensor_configs(db: Session, *, ids: List[int]) -> None:
+def delete_sensor_configs(db: Session, *, company_id: int, ids: List[int]) -> None:
     """
-    删除传感器配置
+    删除公司的传感器配置，并为每条被删除的配置写入删除记录，其他公司的ID忽略
     """
-    db.query(SensorConfig).filter(SensorConfig.id.in_(ids)).delete(synchronize_session=False)
+    deleted = db.execute(
+        delete(SensorConfig)
+        .where(SensorConfig.company_id == company_id, SensorConfig.id.in_(ids))
+        .returning(SensorConfig.id, SensorConfig.port, SensorConfig.sensor_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if deleted:
+        bump_port_revisions(db, company_id=company_id, ports={row.port for row in deleted})
+        first_revision = allocate_revisions(db, len(deleted))
+        db.execute(
+            insert(SensorConfigTombstone),
+            [
+                {
+                    "config_id": row.id,
+                    "company_id": company_id,
+                    "port": row.port,
+                    "sensor_id": row.sensor_id,
+                    "revision": first_revision + offset,
+                }
+                for offset, row in enumerate(deleted)
+            ],
+        )
+        _port_configs_changed(
+            db, company_id=company_id, ports={row.port for row in deleted}, revision=first_revision + len(deleted) - 1
+        )
+    db.commit()
+    for row in deleted:
+        _sync_sensor_name_index(company_id, row.id)
+
+
+def update_model_template(
+    db: Session, *, company_id: int, model_template: ModelTemplateUpdate, updater_id: int
+) -> Optional[int]:
+    """
+    编辑公司的物模型模板，返回随模板变更的传感器配置数，模板不存在时返回None
+
+    引用该模板的配置中与模板相同的属性随模板变更，差异保持不变，物模型名称同步更新到这些配置；
+    字段数变化时各配置的差异按新模板重新计算（见rebase_model_field_overrides）。
+    每条配置分配新的变更版本号，所在串口的版本号加一，增量同步和设备拉取都能收到变更
+    """
+    # PostgreSQL下锁定模板行，并发编辑同一模板时按顺序基于最新的模板重新计算差异
+    old_template_fields = db.execute(
+        select(ModelTemplate.model_fields)
+        .where(ModelTemplate.company_id == company_id, ModelTemplate.model_token == model_template.modelToken)
+        .with_for_update()
+    ).scalar()
+    if old_template_fields is None:
+        db.rollback()
+        return None
+    new_template_fields = [field.model_dump() for field in model_template.modelFieldList]
+    db.execute(
+        update(ModelTemplate)
+        .where(ModelTemplate.company_id == company_id, ModelTemplate.model_token == model_template.modelToken)
+        .values(model_name=model_template.modelName, model_fields=new_template_fields, updater_id=updater_id)
+    )
+
+    # PostgreSQL下锁定引用模板的配置，避免并发编辑把配置改为其他模板后仍分配到本次的版本号
+    rows = db.execute(
+        select(SensorConfig.id, SensorConfig.port, SensorConfig.model_field_overrides)
+        .where(SensorConfig.company_id == company_id, SensorConfig.model_token == model_template.modelToken)
+        .order_by(SensorConfig.id)
+        .with_for_update()
+    ).all()
+    if rows:
+        ports = {row.port for row in rows}
+        bump_port_revisions(db, company_id=company_id, ports=ports)
+        first_revision = allocate_revisions(db, len(rows))
+        db.execute(
+            update(SensorConfig),
+            [
+                {
+                    "id": row.id,
+                    "model_name": model_template.modelName,
+                    "model_field_overrides": rebase_model_field_overrides(
+                        old_template_fields, new_template_fields, row.model_field_overrides
+                    ),
+                    "updater_id": updater_id,
+                    "revision": first_revision + offset,
+                }
+                for offset, row in enumerate(rows)
+            ],
+        )
+        _port_configs_changed(db, company_id=company_id, ports=ports, revision=first_revision + len(rows) - 1)
     db.commit()
+    return len(rows)
 
 
-def check_sensor_id_exists(db: Session, *, port: str, sensor_id: int, exclude_id: Optional[int] = None) -> bool:
+def check_sensor_id_exists(
+    db: Session, *, company_id: int, port: str, sensor_id: int, exclude_id: Optional[int] = None
+) -> bool:
     """
-    检查传感器ID在同一串口下是否已存在
+    检查传感器ID在公司的同一串口下是否已存在
     """
     query = db.query(SensorConfig).filter(
         and_(
+            SensorConfig.company_id == company_id,
             SensorConfig.port == port,
             SensorConfig.sensor_id == sensor_id
         )
@@ -95,4 +823,246 @@ def check_sensor_id_exists(db: Session, *, port: str, sensor_id: int, exclude_id
     if exclude_id:
         query = query.filter(SensorConfig.id != exclude_id)
     
-    return db.query(query.exists()).scalar() 
\ No newline at end of file
+    return db.query(query.exists()).scalar()
+
+
+def get_port_revision(db: Session, *, company_id: int, port: str) -> int:
+    """
+    获取公司串口当前的配置版本号，只查询版本表单列，不加载配置数据
+    """
+    revision = db.execute(
+        select(SensorConfigPortRevision.revision).where(
+            SensorConfigPortRevision.company_id == company_id, SensorConfigPortRevision.port == port
+        )
+    ).scalar()
+    return revision or 0
+
+
+def bump_port_revisions(
+    db: Session, *, company_id: int, ports: Iterable[str] = (), ids: Iterable[int] = ()
+) -> None:
+    """
+    公司串口配置版本号加一，与配置变更在同一事务中执行，由调用方提交
+
+    ports为直接指定的串口，ids为该公司的配置ID，其所在串口在同一条语句中查出，不额外往返数据库
+    """
+    ports = sorted(set(ports))
+    ids = sorted(set(ids))
+    if not ports and not ids:
+        return
+    selects = [select(literal(port).label("port")) for port in ports]
+    if ids:
+        selects.append(
+            select(SensorConfig.port).where(SensorConfig.company_id == company_id, SensorConfig.id.in_(ids))
+        )
+    changed_ports = union(*selects).subquery()
+    stmt = _insert(db)(SensorConfigPortRevision).from_select(
+        ["company_id", "port", "revision"],
+        # WHERE条件避免SQLite将ON CONFLICT解析为JOIN的ON子句
+        select(literal(company_id), changed_ports.c.port, literal(1)).where(changed_ports.c.port.is_not(None)),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SensorConfigPortRevision.company_id, SensorConfigPortRevision.port],
+        set_={"revision": SensorConfigPortRevision.revision + 1},
+    )
+    db.execute(stmt)
+
+
+def _port_configs_changed(db: Session, *, company_id: int, ports: Iterable[str], revision: int) -> None:
+    """
+    公司串口配置变更后、提交前调用：发送变更通知
+
+    配置包不在写入事务中重建，全局版本行锁持有期间只执行依赖版本号的写入；
+    新版本的配置包在首次下载时补建（见build_sensor_config_bundle）
+    """
+    notify_sensor_config_change(db, company_id=company_id, ports=ports, revision=revision)
+
+
+def rebuild_sensor_config_bundles(
+    db: Session, *, company_id: int, ports: Iterable[str]
+) -> Dict[str, Tuple[int, Dict[Tuple[str, str], bytes]]]:
+    """
+    按公司串口当前版本号重建配置包并写入配置包表，由调用方提交，返回{串口: (版本号, {(格式, 压缩方式): 内容})}
+
+    只会用更新的版本覆盖已有配置包
+    """
+    ports = sorted(set(ports))
+    if not ports:
+        return {}
+    # 先读版本号再读配置，与写入并发时配置包的内容只会比版本号新，设备之后按新版本号重新下载
+    revisions = dict(db.execute(
+        select(SensorConfigPortRevision.port, SensorConfigPortRevision.revision).where(
+            SensorConfigPortRevision.company_id == company_id, SensorConfigPortRevision.port.in_(ports)
+        )
+    ).all())
+    rows = db.execute(
+        select(
+            SensorConfig.port, SensorConfig.id, SensorConfig.sensor_id, SensorConfig.sensor_name,
+            SensorConfig.model_token, SensorConfig.model_name, SensorConfig.model_field_overrides,
+        )
+        .where(SensorConfig.company_id == company_id, SensorConfig.port.in_(ports))
+        .order_by(SensorConfig.port, SensorConfig.sensor_id)
+    ).all()
+    templates = get_model_template_fields(db, company_id=company_id, model_tokens=(row.model_token for row in rows))
+    rows = [
+        ResolvedRow(row, merge_model_fields(templates.get(row.model_token, []), row.model_field_overrides))
+        for row in rows
+    ]
+    grouped = {port: list(group) for port, group in itertools.groupby(rows, key=lambda row: row.port)}
+
+    bundles = {}
+    for port in ports:
+        revision = revisions.get(port, 0)
+        bundles[port] = (revision, encode_bundle(build_bundle(port, revision, grouped.get(port, ()))))
+
+    # 没有版本记录的串口从未有过配置，不保存
+    values = [
+        {
+            "company_id": company_id,
+            "port": port,
+            "format": bundle_format,
+            "encoding": encoding,
+            "revision": revision,
+            "content": content,
+        }
+        for port, (revision, contents) in bundles.items() if port in revisions
+        for (bundle_format, encoding), content in contents.items()
+    ]
+    if values:
+        stmt = _insert(db)(SensorConfigBundle)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                SensorConfigBundle.company_id,
+                SensorConfigBundle.port,
+                SensorConfigBundle.format,
+                SensorConfigBundle.encoding,
+            ],
+            set_={"revision": stmt.excluded.revision, "content": stmt.excluded.content},
+            # 首次下载时的补建与写入并发时，不会用旧版本覆盖新版本
+            where=SensorConfigBundle.revision <= stmt.excluded.revision,
+        )
+        db.execute(stmt, values)
+    return bundles
+
+
+def get_sensor_config_bundle(
+    db: Session, *, company_id: int, port: str, revision: int, bundle_format: str, encoding: str
+) -> Optional[bytes]:
+    """
+    获取公司指定版本的串口配置包，不存在或已过期时返回None
+    """
+    return db.execute(
+        select(SensorConfigBundle.content).where(
+            SensorConfigBundle.company_id == company_id,
+            SensorConfigBundle.port == port,
+            SensorConfigBundle.format == bundle_format,
+            SensorConfigBundle.encoding == encoding,
+            SensorConfigBundle.revision == revision,
+        )
+    ).scalar()
+
+
+def build_sensor_config_bundle(
+    db: Session, *, company_id: int, port: str
+) -> Tuple[int, Dict[Tuple[str, str], bytes]]:
+    """
+    补建公司串口配置包并提交，串口配置变更后首次下载新版本时调用，在写入事务之外编码配置包
+    """
+    bundle = rebuild_sensor_config_bundles(db, company_id=company_id, ports=[port])[port]
+    db.commit()
+    return bundle
+
+
+def allocate_revisions(db: Session, count: int) -> int:
+
+    """
+    分配count个连续的全局变更版本号，返回第一个，与配置变更在同一事务中执行，由调用方提交
+
+    版本号在变更日志状态表唯一的一行上递增，行锁持有到事务结束，版本号小的事务一定先提交，
+    按版本号增量同步时不会漏掉提交较晚的变更。所有写入共用该行锁，调用方应在其他准备工作
+    （校验、模板、串口版本号）完成后最后分配，之后只执行写入版本号的语句并提交
+    """
+    stmt = _insert(db)(SensorConfigChangeLog).values(id=1, revision=count, compacted_revision=0)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SensorConfigChangeLog.id],
+        set_={"revision": SensorConfigChangeLog.revision + count},
+    ).returning(SensorConfigChangeLog.revision)
+    return db.execute(stmt).scalar_one() - count + 1
+
+
+def get_sensor_config_changes(
+    db: Session, *, company_id: int, since: int, port: Optional[str] = None, limit: int = 1000
+) -> Tuple[List[Tuple[int, Optional[SensorConfig], Optional[SensorConfigTombstone]]], int, bool]:
+    """
+    获取公司版本号大于since的变更，返回([(版本号, 配置, 删除记录)], 下次请求的since, 是否还有更多)
+
+    版本号全局分配，各公司的变更版本号不连续。每条变更的配置和删除记录只有一个不为空，配置只返回其最新状态。
+    since早于已清理的删除记录或大于当前版本号（如数据库已恢复到更早的状态）时抛出ChangeLogResyncError
+    """
+    # 先读取当前版本号再查询变更，之后提交的变更版本号一定更大，不会被跳过
+    state = db.execute(
+        select(SensorConfigChangeLog.revision, SensorConfigChangeLog.compacted_revision)
+    ).first()
+    current_revision, compacted_revision = state if state is not None else (0, 0)
+    if 0 < since < compacted_revision:
+        raise ChangeLogResyncError(f"版本号 {since} 之前的删除记录已清理（至 {compacted_revision}），请全量同步")
+    if since > current_revision:
+        raise ChangeLogResyncError(f"版本号 {since} 大于当前版本号 {current_revision}，请全量同步")
+
+    upserts = select(SensorConfig).where(SensorConfig.company_id == company_id, SensorConfig.revision > since)
+    tombstones = select(SensorConfigTombstone).where(
+        SensorConfigTombstone.company_id == company_id, SensorConfigTombstone.revision > since
+    )
+    if port:
+        upserts = upserts.where(SensorConfig.port == port)
+        tombstones = tombstones.where(SensorConfigTombstone.port == port)
+    # 两边各多取一行，合并后截取前limit条，并判断是否还有更多
+    changes = [
+        (sensor_config.revision, sensor_config, None)
+        for sensor_config in db.execute(upserts.order_by(SensorConfig.revision).limit(limit + 1)).scalars()
+    ]
+    changes.extend(
+        (tombstone.revision, None, tombstone)
+        for tombstone in db.execute(
+            tombstones.order_by(SensorConfigTombstone.revision).limit(limit + 1)
+        ).scalars()
+    )
+    changes.sort(key=lambda change: change[0])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    attach_model_fields(
+        db, company_id=company_id, sensor_configs=[sensor_config for _, sensor_config, _ in changes if sensor_config]
+    )
+    if has_more:
+        next_revision = changes[-1][0]
+    else:
+        next_revision = max([since, current_revision] + [change[0] for change in changes[-1:]])
+    return changes, next_revision, has_more
+
+
+def get_change_log_revision(db: Session) -> int:
+    """
+    获取当前已分配的最大变更版本号
+    """
+    return db.execute(select(SensorConfigChangeLog.revision)).scalar() or 0
+
+
+def compact_sensor_config_tombstones(db: Session, *, retention: timedelta) -> int:
+    """
+    清理超过保留时长的删除记录，返回清理条数
+
+    记录已清理的最大版本号，增量同步的since早于该版本号时需要全量同步
+    """
+    cutoff = datetime.now(timezone.utc) - retention
+    compacted_revision = db.execute(
+        select(func.max(SensorConfigTombstone.revision)).where(SensorConfigTombstone.deleted_at < cutoff)
+    ).scalar()
+    if compacted_revision is None:
+        return 0
+    deleted = db.execute(
+        delete(SensorConfigTombstone).where(SensorConfigTombstone.revision <= compacted_revision)
+    ).rowcount
+    # 更早的删除记录在之前的清理中已删除，本次的最大版本号一定大于已记录的值
+    db.execute(update(SensorConfigChangeLog).values(compacted_revision=compacted_revision))
+    db.commit()
+    return deleted
@@ -2,4 +2,11 @@
 # imported by Alembic
 from app.db.base_class import Base  # noqa
 from app.models.user import User  # noqa
-from app.models.sensor_config import SensorConfig  # noqa
\ No newline at end of file
+from app.models.model_template import ModelTemplate  # noqa
+from app.models.sensor_config import (  # noqa
+    SensorConfig,
+    SensorConfigBundle,
+    SensorConfigChangeLog,
+    SensorConfigPortRevision,
+    SensorConfigTombstone,
+)
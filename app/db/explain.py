@@ -0,0 +1,19 @@
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+class ExplainJSON(Executable, ClauseElement):
+    """
+    PostgreSQL的EXPLAIN (FORMAT JSON)语句，仅生成查询计划不执行查询
+
+    被解释的查询按正常方式编译，参数作为绑定参数传入并经过列类型的转换，用户输入不会被当作SQL解析
+    """
+    inherit_cache = False
+
+    def __init__(self, stmt):
+        self.stmt = stmt
+
+
+@compiles(ExplainJSON, "postgresql")
+def _compile_explain_json(element: ExplainJSON, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.stmt, **kw)
@@ -8,22 +8,38 @@ from app.db.base import Base
 from app.db.session import engine
 
 
+def create_tables() -> None:
+    """
+    按模型创建所有缺失的表，仅用于开发和测试，生产环境通过Alembic迁移管理表结构
+    """
+    Base.metadata.create_all(bind=engine)
+
+
+def seed_default_user(db: Session) -> bool:
+    """
+    创建默认用户，已存在时跳过，返回是否新建
+    """
+    user = get_user_by_account(db, settings.DEFAULT_USER_ACCOUNT)
+    if user:
+        return False
+    create_user(
+        db,
+        account=settings.DEFAULT_USER_ACCOUNT,
+        password=settings.DEFAULT_USER_PASSWORD,
+        name=settings.DEFAULT_USER_NAME,
+        company_id=settings.DEFAULT_USER_COMPANY_ID,
+        company_name=settings.DEFAULT_USER_COMPANY_NAME,
+    )
+    logging.info("Created default user: %s", settings.DEFAULT_USER_ACCOUNT)
+    return True
+
+
 def init_db(db: Session) -> None:
     """
     初始化数据库
     """
     # 创建所有表
-    Base.metadata.create_all(bind=engine)
-    
+    create_tables()
+
     # 创建默认用户
-    user = get_user_by_account(db, settings.DEFAULT_USER_ACCOUNT)
-    if not user:
-        create_user(
-            db,
-            account=settings.DEFAULT_USER_ACCOUNT,
-            password=settings.DEFAULT_USER_PASSWORD,
-            name=settings.DEFAULT_USER_NAME,
-            company_id=settings.DEFAULT_USER_COMPANY_ID,
-            company_name=settings.DEFAULT_USER_COMPANY_NAME,
-        )
-        logging.info("Created default user: %s", settings.DEFAULT_USER_ACCOUNT) 
\ No newline at end of file
+    seed_default_user(db)
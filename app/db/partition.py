@@ -0,0 +1,63 @@
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.models.sensor_config import SensorConfig
+
+logger = logging.getLogger(__name__)
+
+# 传感器配置表主键序列，由SERIAL列自动创建
+SENSOR_CONFIG_ID_SEQUENCE = "sensor_configs_id_seq"
+
+
+def is_partitioned(connection: Connection, table_name: str) -> bool:
+    """
+    判断表是否已是PostgreSQL声明式分区表
+    """
+    return connection.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:name))"),
+        {"name": table_name},
+    ).scalar()
+
+
+def partition_sensor_configs(connection: Connection, partitions: int) -> None:
+    """
+    将传感器配置表转换为按company_id哈希分区的表，仅支持PostgreSQL，由调用方提交
+
+    分区表的唯一约束必须包含分区键，主键改为(company_id, id)；其余索引与模型定义相同，在分区表上创建后
+    自动应用到每个分区。按公司的查询只访问一个分区。转换期间持有表的排他锁，读写请求会等待
+    """
+    if connection.dialect.name != "postgresql":
+        raise RuntimeError("只有PostgreSQL支持声明式分区")
+    table = SensorConfig.__table__
+    if is_partitioned(connection, table.name):
+        logger.info(f"{table.name} 已是分区表，跳过")
+        return
+
+    connection.execute(text(f"LOCK TABLE {table.name} IN ACCESS EXCLUSIVE MODE"))
+    connection.execute(text(
+        f"CREATE TABLE {table.name}_partitioned (LIKE {table.name} INCLUDING DEFAULTS) PARTITION BY HASH (company_id)"
+    ))
+    for remainder in range(partitions):
+        connection.execute(text(
+            f"CREATE TABLE {table.name}_p{remainder} PARTITION OF {table.name}_partitioned "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+        ))
+    connection.execute(text(f"INSERT INTO {table.name}_partitioned SELECT * FROM {table.name}"))
+
+    # 序列归属原表的id列，删除原表前解除归属，新表继续使用该序列生成id
+    connection.execute(text(f"ALTER SEQUENCE {SENSOR_CONFIG_ID_SEQUENCE} OWNED BY NONE"))
+    connection.execute(text(f"DROP TABLE {table.name}"))
+    connection.execute(text(f"ALTER TABLE {table.name}_partitioned RENAME TO {table.name}"))
+    connection.execute(text(f"ALTER SEQUENCE {SENSOR_CONFIG_ID_SEQUENCE} OWNED BY {table.name}.id"))
+
+    # 数据导入后再建约束和索引
+    connection.execute(text(f"ALTER TABLE {table.name} ADD PRIMARY KEY (company_id, id)"))
+    connection.execute(text(
+        f"ALTER TABLE {table.name} ADD CONSTRAINT uq_sensor_configs_company_port_sensor_id "
+        "UNIQUE (company_id, port, sensor_id)"
+    ))
+    for index in table.indexes:
+        index.create(bind=connection)
+    logger.info(f"{table.name} 已转换为 {partitions} 个哈希分区")
@@ -0,0 +1,84 @@
+import itertools
+import logging
+import time
+from typing import List, Optional, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# 从库选择策略
+REPLICA_SELECTIONS = ("round_robin", "least_connections")
+
+
+class Replica:
+    """
+    只读从库引擎及其健康状态
+
+    从库连接失败（建立连接失败或连接被断开）时标记为不可用，retry_seconds后再次尝试
+    """
+    def __init__(self, name: str, engine: Union[Engine, AsyncEngine], retry_seconds: float):
+        self.name = name
+        self.engine = engine
+        self.retry_seconds = retry_seconds
+        self.unhealthy_until = 0.0
+        self.failures = 0
+        if isinstance(engine, AsyncEngine):
+            self.sync_engine = engine.sync_engine
+            self.session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        else:
+            self.sync_engine = engine
+            self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        event.listen(self.sync_engine, "handle_error", self._handle_error)
+
+    @property
+    def pool(self):
+        return self.sync_engine.pool
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def mark_unhealthy(self) -> None:
+        if self.healthy:
+            logger.warning(f"从库 {self.name} 连接失败，{self.retry_seconds}秒内读请求改由其他数据库执行")
+        self.failures += 1
+        self.unhealthy_until = time.monotonic() + self.retry_seconds
+
+    def _handle_error(self, context) -> None:
+        # 连接检测失败时连接池会自动重连，重连失败才会以无连接的错误再次进入
+        if context.is_pre_ping:
+            return
+        if context.is_disconnect or context.connection is None:
+            self.mark_unhealthy()
+
+
+class ReplicaSet:
+    """
+    从库集合，按策略选择可用的从库
+
+    round_robin依次轮询；least_connections选择当前借出连接最少的从库，连接数相同时轮询。
+    没有可用从库时返回None，由调用方改用主库
+    """
+    def __init__(self, replicas: List[Replica], selection: str = "round_robin"):
+        if selection not in REPLICA_SELECTIONS:
+            raise ValueError(f"不支持的从库选择策略: {selection}")
+        self.replicas = replicas
+        self.selection = selection
+        self._counter = itertools.count()
+
+    def choose(self) -> Optional[Replica]:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        offset = next(self._counter) % len(healthy)
+        healthy = healthy[offset:] + healthy[:offset]
+        if self.selection == "least_connections":
+            return min(healthy, key=lambda replica: replica.pool.checkedout())
+        return healthy[0]
+
+    def __len__(self) -> int:
+        return len(self.replicas)
@@ -1,12 +1,116 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import logging
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Optional, Sequence, TypeVar
+
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from app.core.cache import LRUCache
+from app.core.config import settings, to_async_url
+from app.core.metrics import instrument_engine
+from app.db.pool import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool
+from app.db.replica import Replica, ReplicaSet
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _pool_options() -> dict:
+    """
+    连接池参数
+    """
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
 
-from app.core.config import settings
 
 # 将PostgreSQL URL转换为字符串格式
-engine = create_engine(str(settings.DATABASE_URL))
+connect_args = {}
+if settings.DB_STATEMENT_TIMEOUT_MS:
+    connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+engine = create_engine(
+    str(settings.DATABASE_URL),
+    poolclass=InstrumentedQueuePool,
+    connect_args=connect_args,
+    **_pool_options(),
+)
+instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 异步数据库引擎，仅在开启DB_ASYNC时创建
+async_engine = None
+AsyncSessionLocal = None
+if settings.DB_ASYNC:
+    async_connect_args = {}
+    if settings.DB_STATEMENT_TIMEOUT_MS:
+        async_connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+    async_engine = create_async_engine(
+        settings.async_database_url,
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        connect_args=async_connect_args,
+        **_pool_options(),
+    )
+    instrument_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+def _create_replica_set() -> Optional[ReplicaSet]:
+    """
+    按DATABASE_REPLICA_URLS创建从库引擎，未配置从库时返回None
+
+    从库只创建当前模式实际使用的引擎（同步或异步），连接池参数与主库相同
+    """
+    replicas = []
+    for index, url in enumerate(settings.replica_urls, start=1):
+        if settings.DB_ASYNC:
+            replica_engine = create_async_engine(
+                to_async_url(url),
+                poolclass=InstrumentedAsyncAdaptedQueuePool,
+                connect_args=async_connect_args,
+                **_pool_options(),
+            )
+            instrument_engine(replica_engine.sync_engine)
+        else:
+            replica_engine = create_engine(
+                url, poolclass=InstrumentedQueuePool, connect_args=connect_args, **_pool_options()
+            )
+            instrument_engine(replica_engine)
+        replicas.append(Replica(f"replica{index}", replica_engine, settings.DB_REPLICA_RETRY_SECONDS))
+    if not replicas:
+        return None
+    return ReplicaSet(replicas, settings.DB_REPLICA_SELECTION)
+
+
+replica_set = _create_replica_set()
+
+# 最近提交过写入的token，这些请求方的读请求在DB_READ_YOUR_WRITES_SECONDS内访问主库，
+# 以读到自己刚写入的数据。只记录在当前worker中，多worker部署时请求方应固定到同一worker或适当放宽读取时机
+recent_writers = LRUCache(maxsize=settings.DB_READ_YOUR_WRITES_MAX_KEYS, ttl=settings.DB_READ_YOUR_WRITES_SECONDS)
+
+
+def _read_your_writes_key(request: Request) -> Optional[str]:
+    """
+    读写一致性按请求的Authorization头区分请求方，不需要先解析token
+    """
+    return request.headers.get("Authorization")
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_writer(session: Session) -> None:
+    key = session.info.get("read_your_writes_key")
+    if key is not None:
+        recent_writers.set(key, True)
+
 
 def get_db():
     """
@@ -16,4 +120,142 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+class SessionRunner:
+    """
+    在异步端点中执行CRUD函数
+
+    CRUD函数统一以同步Session为第一个参数编写。同步模式下在线程池中执行；
+    异步模式下通过AsyncSession.run_sync在事件循环中执行，数据库IO由asyncpg完成，不占用线程池
+    """
+    def __init__(self, session):
+        self.session = session
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if isinstance(self.session, AsyncSession):
+            return await self.session.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+    async def close(self) -> None:
+        if isinstance(self.session, AsyncSession):
+            await self.session.close()
+        else:
+            await run_in_threadpool(self.session.close)
+
+
+def _open_primary_session():
+    """
+    打开主库会话，根据DB_ASYNC选择同步或异步会话
+    """
+    if AsyncSessionLocal is not None:
+        return AsyncSessionLocal()
+    return SessionLocal()
+
+
+class ReadSessionRunner(SessionRunner):
+    """
+    只读会话执行器，replica为None时在主库执行
+
+    从库连接失败时从库被标记为不可用，当前请求关闭从库会话后改在主库重新执行，只读查询重试是安全的
+    """
+    def __init__(self, replica: Optional[Replica]):
+        super().__init__(replica.session_factory() if replica is not None else _open_primary_session())
+        self.replica = replica
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if self.replica is not None:
+            try:
+                return await super().run(fn, *args, **kwargs)
+            except DBAPIError:
+                if self.replica.healthy:
+                    raise
+                logger.warning(f"从库 {self.replica.name} 不可用，改在主库执行 {fn.__name__}")
+            await self.close()
+            self.session = _open_primary_session()
+            self.replica = None
+        return await super().run(fn, *args, **kwargs)
+
+
+async def get_session_runner(request: Request) -> AsyncGenerator[SessionRunner, None]:
+    """
+    获取主库会话执行器依赖，写入和写入后需要立即读到结果的请求使用
+    """
+    runner = SessionRunner(_open_primary_session())
+    # 提交后记录请求方，之后一段时间内该请求方的读请求也访问主库
+    runner.session.info["read_your_writes_key"] = _read_your_writes_key(request)
+    try:
+        yield runner
+    finally:
+        await runner.close()
+
+
+async def get_read_session_runner(request: Request) -> AsyncGenerator[SessionRunner, None]:
+    """
+    获取只读会话执行器依赖
+
+    配置了从库时按DB_REPLICA_SELECTION选择可用的从库；没有可用从库或请求方刚提交过写入时使用主库
+    """
+    replica = None
+    if replica_set is not None:
+        key = _read_your_writes_key(request)
+        if key is None or not recent_writers.get(key):
+            replica = replica_set.choose()
+    runner = ReadSessionRunner(replica)
+    try:
+        yield runner
+    finally:
+        await runner.close()
+
+
+async def run_in_session(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    在独立的短会话中执行CRUD函数，执行完立即归还连接
+
+    用于SSE、长轮询等长时间挂起的请求，等待期间不占用数据库连接
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            return await session.run_sync(fn, *args, **kwargs)
+
+    def run() -> T:
+        db: Session = SessionLocal()
+        try:
+            return fn(db, *args, **kwargs)
+        finally:
+            db.close()
+
+    return await run_in_threadpool(run)
+
+
+async def stream_partitions(prepare: Callable[..., Any], *args: Any, **kwargs: Any) -> AsyncIterator[Sequence[Any]]:
+    """
+    在独立会话中通过服务端游标分批读取查询结果
+
+    prepare以同步Session为第一个参数，返回设置了yield_per的查询。整个读取过程使用同一个事务，
+    会话在迭代结束或被中断时关闭；同步模式下每批数据在线程池中读取
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            stmt = await session.run_sync(prepare, *args, **kwargs)
+            result = await session.stream(stmt)
+            async for partition in result.partitions():
+                yield partition
+        return
+
+    def iterate() -> Any:
+        db: Session = SessionLocal()
+        try:
+            stmt = prepare(db, *args, **kwargs)
+            yield from db.execute(stmt).partitions()
+        finally:
+            db.close()
+
+    partitions = iterate()
+    try:
+        async for partition in iterate_in_threadpool(partitions):
+            yield partition
+    finally:
+        # 客户端提前断开时关闭生成器，释放游标和连接
+        await run_in_threadpool(partitions.close)
@@ -0,0 +1,102 @@
+import math
+from typing import Dict, List, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.admission import AdmissionBudget
+from app.core.deps import decode_token_claims
+from app.core.metrics import http_requests_rejected_total
+
+# 长轮询和SSE请求挂起期间不占用数据库连接，只按速率限制，不计入并发名额和在途请求数
+LONG_LIVED_PATHS = ("/WaitMR702SensorConfigChanges", "/SubscribeMR702SensorConfigChanges")
+
+
+def client_key(scope: Scope, mode: str) -> str:
+    """
+    按预算的客户端标识方式生成限流键，没有有效token时按客户端地址
+    """
+    if mode in ("subject", "company"):
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                claims = decode_token_claims(value.decode("latin-1"))
+                if claims is not None:
+                    user_id, company_id = claims
+                    if mode == "company" and company_id is not None:
+                        return f"company:{company_id}"
+                    return f"user:{user_id}"
+                break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+async def reject(scope: Scope, receive: Receive, send: Send, status_code: int, msg: str, retry_after: float) -> None:
+    response = JSONResponse(
+        status_code=status_code,
+        content={"code": status_code, "msg": msg, "data": None},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+    await response(scope, receive, send)
+
+
+class AdmissionControlMiddleware:
+    """
+    准入控制中间件，在进入路由和访问数据库之前按客户端限流
+
+    - 令牌桶：每个客户端按预算的速率和突发量放行，超限返回429
+    - 并发名额：每个客户端同时处理的请求数超限返回503
+    - 在途上限：每个worker同时处理的请求总数超限返回503，避免排队等待数据库连接拖慢所有请求
+    拒绝的响应都带Retry-After，客户端按该时间退避重连
+    """
+    def __init__(self, app: ASGIApp, store, budgets: List[AdmissionBudget]):
+        self.app = app
+        self.store = store
+        self.budgets = budgets
+        self._inflight: Dict[str, int] = {budget.name: 0 for budget in budgets}
+
+    def match(self, path: str) -> Optional[AdmissionBudget]:
+        for budget in self.budgets:
+            if path.startswith(budget.path):
+                return budget
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        budget = self.match(scope["path"])
+        if budget is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = f"{budget.name}:{client_key(scope, budget.key)}"
+        if budget.rate > 0:
+            retry_after = await self.store.take_token(key, budget.rate, budget.burst)
+            if retry_after:
+                http_requests_rejected_total.inc((budget.name, "rate"))
+                await reject(scope, receive, send, 429, "请求过于频繁，请稍后重试", retry_after)
+                return
+
+        if scope["path"].endswith(LONG_LIVED_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        if budget.max_inflight and self._inflight[budget.name] >= budget.max_inflight:
+            http_requests_rejected_total.inc((budget.name, "overload"))
+            await reject(scope, receive, send, 503, "服务繁忙，请稍后重试", 1)
+            return
+        # 先计入在途请求再等待并发计数，等待期间进入的请求同样受在途上限约束
+        self._inflight[budget.name] += 1
+        held = None
+        try:
+            if budget.concurrency > 0:
+                held = await self.store.acquire_slot(key, budget.concurrency)
+                if held is False:
+                    http_requests_rejected_total.inc((budget.name, "concurrency"))
+                    await reject(scope, receive, send, 503, "同时处理的请求过多，请稍后重试", 1)
+                    return
+            await self.app(scope, receive, send)
+        finally:
+            self._inflight[budget.name] -= 1
+            if held:
+                await self.store.release_slot(key)
@@ -1,36 +1,90 @@
+import json
+import logging
+import queue
+import random
+import sys
 import time
-from typing import Callable
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
 
-from fastapi import FastAPI, Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app.core.config import settings
 
-class LoggingMiddleware(BaseHTTPMiddleware):
+access_logger = logging.getLogger("access")
+_access_log_listener: Optional[QueueListener] = None
+
+
+def start_access_log() -> None:
+    """
+    启动访问日志后台写入线程
+
+    请求处理中只把日志记录放入内存队列，由后台线程写到stdout，事件循环不会阻塞在输出上
+    """
+    global _access_log_listener
+    if _access_log_listener is not None:
+        return
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(message)s"))
+    access_logger.addHandler(QueueHandler(log_queue))
+    access_logger.setLevel(logging.INFO)
+    access_logger.propagate = False
+    _access_log_listener = QueueListener(log_queue, stream_handler)
+    _access_log_listener.start()
+
+
+def stop_access_log() -> None:
+    """
+    停止后台写入线程，写完队列中剩余的日志
     """
-    日志中间件，记录请求和响应信息
+    global _access_log_listener
+    if _access_log_listener is not None:
+        _access_log_listener.stop()
+        _access_log_listener = None
+
+
+class LoggingMiddleware:
+    """
+    日志中间件，以JSON行格式记录请求和响应信息
+
+    纯ASGI实现，不缓冲响应体，流式响应不受影响。状态码小于400的请求按ACCESS_LOG_SAMPLE_RATE采样记录
     """
-    def __init__(self, app: FastAPI):
-        super().__init__(app)
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        start_time = time.time()
-        
-        # 处理请求
-        response = await call_next(request)
-        
-        # 计算处理时间
-        process_time = time.time() - start_time
-        
-        # 记录请求信息
-        request_info = {
-            "method": request.method,
-            "url": str(request.url),
-            "client": request.client.host if request.client else None,
-            "process_time": f"{process_time:.3f}s",
-            "status_code": response.status_code,
-        }
-        
-        # 在实际应用中，可以使用logger记录
-        print(request_info)
-        
-        return response 
\ No newline at end of file
+    def __init__(self, app: ASGIApp, sample_rate: Optional[float] = None):
+        self.app = app
+        self.sample_rate = settings.ACCESS_LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if status_code >= 400 or self.sample_rate >= 1 or random.random() < self.sample_rate:
+                # 计算处理时间
+                process_time = time.perf_counter() - start_time
+                client = scope.get("client")
+                access_logger.info(json.dumps(
+                    {
+                        "time": datetime.now(timezone.utc).isoformat(),
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "query": scope["query_string"].decode("latin-1"),
+                        "client": client[0] if client else None,
+                        "status_code": status_code,
+                        "process_time_ms": round(process_time * 1000, 3),
+                    },
+                    ensure_ascii=False,
+                ))
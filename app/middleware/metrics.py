@@ -0,0 +1,53 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import (
+    RequestDBStats,
+    http_request_db_duration_seconds,
+    http_request_db_statements,
+    http_request_duration_seconds,
+    http_requests_total,
+    request_db_stats,
+)
+
+# 未匹配到路由的请求统一使用该标签，避免任意路径造成标签数量膨胀
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """
+    指标中间件，按路由模板和状态码统计请求数、耗时以及每个请求的SQL语句数和耗时
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+        db_stats = RequestDBStats()
+        token = request_db_stats.set(db_stats)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_db_stats.reset(token)
+            # FastAPI匹配路由后会把路由对象写入scope
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            method = scope["method"]
+            status = str(status_code)
+            http_requests_total.inc((method, route_path, status))
+            http_request_duration_seconds.observe((method, route_path, status), time.perf_counter() - start_time)
+            http_request_db_statements.observe((method, route_path), db_stats.statements)
+            http_request_db_duration_seconds.observe((method, route_path), db_stats.duration)
@@ -0,0 +1,27 @@
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+
+
+class ModelTemplate(Base):
+    """物模型模板表，同一公司同一物模型编号的字段列表只保存一份，传感器配置按物模型编号引用"""
+    __tablename__ = "model_templates"
+
+    company_id = Column(Integer, primary_key=True)  # 公司ID
+    model_token = Column(String, primary_key=True)  # 物模型编号
+    model_name = Column(String, nullable=False)  # 物模型名称
+    model_fields = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)  # 物模型字段列表
+    updater_id = Column(Integer, nullable=False)  # 最近一次修改者ID
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())  # 更新时间
+
+    __table_args__ = (
+        # 按物模型字段属性过滤使用的GIN索引，仅PostgreSQL创建
+        Index(
+            "ix_model_templates_model_fields",
+            "model_fields",
+            postgresql_using="gin",
+            postgresql_ops={"model_fields": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON
+from sqlalchemy import (DDL, BigInteger, Column, Integer, Index, LargeBinary, String, DateTime, JSON,
+                        UniqueConstraint, event, text)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 
 from app.db.base_class import Base
@@ -9,13 +11,108 @@ class SensorConfig(Base):
     __tablename__ = "sensor_configs"
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    company_id = Column(Integer, nullable=False)  # 所属公司ID，所有查询都按公司过滤
     port = Column(String, nullable=False)  # 串口号: 485-1 或 485-2
     sensor_id = Column(Integer, nullable=False)  # 传感器ID
     sensor_name = Column(String, nullable=False)  # 传感器名称
     model_token = Column(String, nullable=False)  # 物模型编号
     model_name = Column(String, nullable=False)  # 物模型名称
-    model_fields = Column(JSON, nullable=False)  # 物模型字段列表，JSON格式
+    # 与物模型模板字段列表的差异，为空时与模板相同；列表长度即字段数，每项为该下标与模板不同的属性
+    model_field_overrides = Column(
+        JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql"), nullable=True
+    )
     creator_id = Column(Integer, nullable=False)  # 创建者ID
     created_at = Column(DateTime(timezone=True), server_default=func.now())  # 创建时间
     updater_id = Column(Integer, nullable=False)  # 更新者ID
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())  # 更新时间 
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())  # 更新时间
+    revision = Column(BigInteger, nullable=False, server_default="0")  # 最近一次变更的全局版本号
+
+    # 合并模板与差异后的物模型字段列表，不是数据库列，由crud读取配置时按请求批量加载模板后填充
+    model_fields = None
+
+    # 唯一约束和索引都以company_id开头，单个公司的查询只扫描该公司的索引范围，与表中其他公司的数据量无关；
+    # 表很大时可通过 python -m app.cli partition-sensor-configs 转为按company_id哈希分区的表，
+    # 分区表的主键为(company_id, id)，id仍由序列生成且唯一，ORM映射不变
+    __table_args__ = (
+        # 同一公司同一串口下传感器ID唯一
+        UniqueConstraint("company_id", "port", "sensor_id", name="uq_sensor_configs_company_port_sensor_id"),
+        # 按ID排序的列表查询和游标翻页
+        Index("ix_sensor_configs_company_id_id", "company_id", "id"),
+        # 增量同步按版本号查询变更
+        Index("ix_sensor_configs_company_revision", "company_id", "revision"),
+        Index("ix_sensor_configs_company_port_revision", "company_id", "port", "revision"),
+        # 传感器名称子串搜索使用的trigram索引，仅PostgreSQL创建
+        Index(
+            "ix_sensor_configs_sensor_name_trgm",
+            "sensor_name",
+            postgresql_using="gin",
+            postgresql_ops={"sensor_name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        # 编辑物模型模板时查找引用该模板的配置
+        Index("ix_sensor_configs_company_model_token", "company_id", "model_token"),
+        # 按物模型字段属性过滤时逐行检查有差异的配置，部分索引只包含这些行
+        Index(
+            "ix_sensor_configs_company_overridden",
+            "company_id",
+            postgresql_where=text("model_field_overrides IS NOT NULL"),
+            sqlite_where=text("model_field_overrides IS NOT NULL"),
+        ),
+    )
+
+
+class SensorConfigPortRevision(Base):
+    """传感器配置串口版本表，每次公司的该串口下的配置变更时版本号加一"""
+    __tablename__ = "sensor_config_port_revisions"
+
+    company_id = Column(Integer, primary_key=True)  # 公司ID
+    port = Column(String, primary_key=True)  # 串口号
+    revision = Column(Integer, nullable=False, default=0)  # 配置版本号
+
+
+class SensorConfigBundle(Base):
+    """传感器配置包表，按串口保存预先编码和压缩好的配置，串口配置变更后首次下载新版本时重建"""
+    __tablename__ = "sensor_config_bundles"
+
+    company_id = Column(Integer, primary_key=True)  # 公司ID
+    port = Column(String, primary_key=True)  # 串口号
+    format = Column(String, primary_key=True)  # 编码格式: json 或 msgpack
+    encoding = Column(String, primary_key=True)  # 压缩方式: identity、gzip 或 br
+    revision = Column(Integer, nullable=False)  # 构建时的串口配置版本号
+    content = Column(LargeBinary, nullable=False)  # 配置包内容
+
+
+class SensorConfigChangeLog(Base):
+    """传感器配置变更日志状态表，只有一行，保存全局变更版本号"""
+    __tablename__ = "sensor_config_change_log"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # 固定为1
+    revision = Column(BigInteger, nullable=False, default=0)  # 已分配的最大变更版本号
+    compacted_revision = Column(BigInteger, nullable=False, default=0)  # 已清理的删除记录中最大的版本号
+
+
+class SensorConfigTombstone(Base):
+    """传感器配置删除记录表，配置被删除或移出串口时写入，用于增量同步"""
+    __tablename__ = "sensor_config_tombstones"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    config_id = Column(Integer, nullable=False)  # 被删除的传感器配置ID
+    company_id = Column(Integer, nullable=False)  # 所属公司ID
+    port = Column(String, nullable=False)  # 删除时所在串口号
+    sensor_id = Column(Integer, nullable=False)  # 删除时的传感器ID
+    revision = Column(BigInteger, nullable=False)  # 变更版本号
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())  # 删除时间
+
+    __table_args__ = (
+        # 清理过期删除记录按全局版本号删除
+        Index("ix_sensor_config_tombstones_revision", "revision"),
+        Index("ix_sensor_config_tombstones_company_revision", "company_id", "revision"),
+        Index("ix_sensor_config_tombstones_company_port_revision", "company_id", "port", "revision"),
+    )
+
+
+# trigram索引依赖pg_trgm扩展，create_all建表前先确保扩展已安装
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
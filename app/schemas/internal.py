@@ -0,0 +1,36 @@
+from pydantic import BaseModel, Field
+
+
+class DBPoolStats(BaseModel):
+    """
+    数据库连接池统计响应模型
+    """
+    engine: str = Field(..., description="引擎类型: sync、async 或从库名称（replica1、replica2...）")
+    healthy: bool = Field(True, description="是否可用，从库连接失败后的暂停期间为false")
+    poolSize: int = Field(..., description="连接池大小")
+    maxOverflow: int = Field(..., description="最大溢出连接数")
+    checkedOut: int = Field(..., description="当前借出的连接数")
+    checkedIn: int = Field(..., description="当前空闲的连接数")
+    overflow: int = Field(..., description="当前使用中的溢出连接数")
+    checkouts: int = Field(..., description="累计取连接次数")
+    timeouts: int = Field(..., description="累计取连接超时次数")
+    avgWaitMs: float = Field(..., description="平均取连接等待毫秒数")
+    maxWaitMs: float = Field(..., description="最大取连接等待毫秒数")
+
+
+class CacheStats(BaseModel):
+    """
+    进程内缓存统计响应模型
+    """
+    name: str = Field(..., description="缓存名称")
+    size: int = Field(..., description="当前条目数")
+    maxSize: int = Field(..., description="最大条目数")
+    hits: int = Field(..., description="累计命中次数")
+    misses: int = Field(..., description="累计未命中次数")
+
+
+class ChangeLogCompactResult(BaseModel):
+    """
+    变更日志清理结果
+    """
+    deleted: int = Field(..., description="清理的删除记录数")
@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.schemas.sensor_config import ModelField
+
+
+class ModelTemplateUpdate(BaseModel):
+    """
+    编辑物模型模板请求模型
+    """
+    modelToken: str
+    modelName: str
+    modelFieldList: List[ModelField]
+
+
+class ModelTemplateInDB(ModelTemplateUpdate):
+    """
+    数据库中的物模型模板模型
+    """
+    sensorCount: int = Field(..., description="引用该模板的传感器配置数")
+    overriddenCount: int = Field(..., description="其中物模型字段与模板不同的配置数")
+    updateUserID: int
+    updateTime: Optional[datetime] = None
+
+
+class ModelTemplateResponse(BaseModel):
+    """
+    物模型模板列表响应模型
+    """
+    templateList: List[ModelTemplateInDB]
+
+
+class ModelTemplateUpdateResponse(BaseModel):
+    """
+    编辑物模型模板响应模型
+    """
+    updated: int = Field(..., description="随模板变更的传感器配置数")
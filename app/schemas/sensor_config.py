@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -21,6 +21,23 @@ class ModelField(BaseModel):
     ngateval: str
 
 
+class ModelFieldFilter(BaseModel):
+    """
+    物模型字段过滤条件，配置中存在某个字段同时满足所有指定属性时匹配
+    """
+    fieldName: Optional[str] = None
+    engUnit: Optional[str] = None
+    hydrologicalIdentification: Optional[str] = None
+    collectionInstructions: Optional[str] = None
+    ratio: Optional[str] = None
+    dataFormat: Optional[str] = None
+    triggerValue: Optional[str] = None
+    upperLimit: Optional[str] = None
+    lowerLimit: Optional[str] = None
+    correctValue: Optional[str] = None
+    ngateval: Optional[str] = None
+
+
 class SensorConfigCreate(BaseModel):
     """
     创建传感器配置请求模型
@@ -46,6 +63,32 @@ class SensorConfigUpdate(BaseModel):
     modelFieldList: List[ModelField]
 
 
+class SensorConfigBatchUpdateRequest(BaseModel):
+    """
+    批量编辑传感器配置请求模型
+    """
+    items: List[SensorConfigUpdate] = Field(..., min_length=1, max_length=1000)
+    atomic: bool = Field(True, description="为True时任一项失败则全部不修改，为False时只修改校验通过的项")
+
+
+class SensorConfigBatchUpdateResult(BaseModel):
+    """
+    批量编辑单项结果
+    """
+    id: int
+    success: bool
+    msg: Optional[str] = None
+
+
+class SensorConfigBatchUpdateResponse(BaseModel):
+    """
+    批量编辑传感器配置响应模型
+    """
+    updated: int = Field(..., description="成功更新的条数")
+    failed: int = Field(..., description="失败的条数")
+    results: List[SensorConfigBatchUpdateResult] = Field(..., description="与请求items一一对应的结果")
+
+
 class SensorConfigInDB(SensorConfigCreate):
     """
     数据库中的传感器配置模型
@@ -63,6 +106,12 @@ class SensorConfigQuery(BaseModel):
     """
     port: Optional[str] = None
     sensorName: Optional[str] = None
+    modelField: Optional[ModelFieldFilter] = Field(None, description="按物模型字段属性过滤")
+    pageSize: Optional[int] = Field(None, ge=1, le=1000, description="每页条数，为空时返回全部数据")
+    pageNum: Optional[int] = Field(None, ge=1, description="页码，指定时按偏移量分页，否则按游标分页")
+    cursor: Optional[str] = Field(None, description="游标分页时上一页返回的nextCursor")
+    orderBy: Literal["id", "updateTime"] = Field("id", description="排序字段")
+    countMode: Literal["exact", "approximate", "none"] = Field("exact", description="总数统计方式")
 
 
 class SensorConfigDeleteRequest(BaseModel):
@@ -72,11 +121,53 @@ class SensorConfigDeleteRequest(BaseModel):
     ids: List[int]
 
 
+class SensorConfigChange(BaseModel):
+    """
+    传感器配置变更
+    """
+    revision: int = Field(..., description="变更版本号")
+    op: Literal["upsert", "delete"] = Field(..., description="upsert为新增或更新，delete为删除或移出该串口")
+    id: int
+    port: str
+    sensorID: int
+    sensorConfig: Optional[SensorConfigInDB] = Field(None, description="变更后的配置，删除时为空")
+
+
+class SensorConfigChangesResponse(BaseModel):
+    """
+    传感器配置增量变更响应模型
+    """
+    changes: List[SensorConfigChange] = Field(default_factory=list, description="按版本号升序排列的变更")
+    revision: int = Field(..., description="下次请求使用的since")
+    hasMore: bool = Field(False, description="是否还有更多变更，为True时应立即用revision继续请求")
+    resync: bool = Field(False, description="since早于已清理的删除记录，需要全量同步后从revision开始增量同步")
+
+
 class SensorConfigResponse(BaseModel):
     """
     传感器配置响应模型
     """
     sensorList: List[SensorConfigInDB]
+    total: Optional[int] = Field(None, description="符合条件的总数，countMode为none时为空")
+    nextCursor: Optional[str] = Field(None, description="下一页游标，没有下一页时为空")
+
+
+class SensorConfigImportError(BaseModel):
+    """
+    批量导入失败项
+    """
+    row: int = Field(..., description="数据记录序号，从1开始，不含CSV表头和空行")
+    msg: str
+
+
+class SensorConfigImportResponse(BaseModel):
+    """
+    批量导入传感器配置响应模型
+    """
+    total: int = Field(..., description="解析到的记录数")
+    imported: int = Field(..., description="成功导入的记录数")
+    failed: int = Field(..., description="失败的记录数")
+    errors: List[SensorConfigImportError] = Field(default_factory=list, description="失败项，按行号排序")
 
 
 class SensorConfigCreateResponse(BaseModel):
@@ -0,0 +1,79 @@
+"""
+访问日志中间件单请求开销基准测试
+
+直接以ASGI方式调用最小应用（不经过网络），对比有无访问日志中间件时的单请求耗时。
+日志输出重定向到 /dev/null 以排除终端写入速度的影响：
+
+    python -m benchmarks.bench_access_log --requests 20000 > /dev/null
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.middleware.logging import LoggingMiddleware, start_access_log, stop_access_log
+
+
+async def ok(request):
+    return PlainTextResponse("ok")
+
+
+def build_app(with_middleware: bool):
+    app = Starlette(routes=[Route("/ping", ok)])
+    if with_middleware:
+        app.add_middleware(LoggingMiddleware)
+    return app
+
+
+async def measure(app, requests: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/ping", "raw_path": b"/ping", "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"testserver")], "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+
+    async def send(message):
+        pass
+
+    async def call() -> None:
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # 与真实服务器一致，请求体读完后阻塞直到客户端断开
+            await asyncio.Event().wait()
+
+        await app(dict(scope), receive, send)
+
+    for _ in range(1000):
+        await call()
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    start_access_log()
+    bare = asyncio.run(measure(build_app(False), args.requests))
+    wrapped = asyncio.run(measure(build_app(True), args.requests))
+    stop_access_log()
+    print(f"bare app:        {bare:8.1f} us/request", file=sys.stderr)
+    print(f"with access log: {wrapped:8.1f} us/request", file=sys.stderr)
+    print(f"overhead:        {wrapped - bare:8.1f} us/request", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
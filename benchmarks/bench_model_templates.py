@@ -0,0 +1,166 @@
+"""
+物模型模板存储与传输量基准测试
+
+--sensors 个传感器配置共用 --models 个物模型，其中 --override-ratio 比例的配置单独修改了一个字段属性。
+对比每行保存完整字段列表（旧布局，保存在对比表中）与模板加差异（当前布局）的：
+- 存储：字段列表占用的字节数（PostgreSQL为pg_column_size，其他数据库为JSON文本的字节数），
+  全量列表查询从数据库读取的字段列表字节数与此相同（每个模板每次请求只读取一次）
+- 列表查询：读取并还原全部配置字段列表的耗时
+- 调整一个物模型：需要改写的字段列表字节数
+
+用法:
+    python -m benchmarks.bench_model_templates
+    python -m benchmarks.bench_model_templates --sensors 100000 --database-url postgresql://...
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import (JSON, Column, Integer, LargeBinary, MetaData, Table, cast, create_engine, delete, func,
+                        select)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+from app.core.model_fields import merge_model_fields
+from app.crud import sensor_config as crud
+from app.crud.model_template import get_model_template_fields
+from app.db.base import Base
+from app.models.model_template import ModelTemplate
+from app.models.sensor_config import SensorConfig, SensorConfigChangeLog
+from app.schemas.sensor_config import SensorConfigCreate
+
+COMPANY_ID = 1
+FIELD_NAMES = ["水深", "温度", "流量", "雨量", "电压", "渗压", "含水率", "倾角"]
+
+legacy_metadata = MetaData()
+# 旧布局：每行保存完整字段列表
+legacy_sensor_configs = Table(
+    "bench_legacy_sensor_configs",
+    legacy_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("model_fields", JSON().with_variant(JSONB(), "postgresql"), nullable=False),
+)
+
+
+def build_models(models: int) -> list:
+    return [
+        [
+            {
+                "fieldName": FIELD_NAMES[index % len(FIELD_NAMES)],
+                "engUnit": "m",
+                "hydrologicalIdentification": f"{model:02X}",
+                "collectionInstructions": f"03{model:04X}{index:02X}0002",
+                "ratio": "0.001",
+                "dataFormat": "浮点型ABCD",
+                "triggerValue": "0",
+                "upperLimit": "10000",
+                "lowerLimit": "0",
+                "correctValue": "0",
+                "ngateval": "3",
+            }
+            for index in range(random.randint(4, 8))
+        ]
+        for model in range(models)
+    ]
+
+
+def build_sensor_configs(sensors: int, models: list, override_ratio: float) -> list:
+    sensor_configs = []
+    for i in range(sensors):
+        model = i % len(models)
+        model_fields = [dict(model_field) for model_field in models[model]]
+        if random.random() < override_ratio:
+            model_fields[0]["upperLimit"] = str(random.randint(1, 9999))
+        sensor_configs.append(SensorConfigCreate(
+            port=random.choice(["485-1", "485-2"]),
+            sensorID=i,
+            sensorName=f"传感器-{i:07d}",
+            modelToken=f"{model:03d}",
+            modelName=f"物模型{model}",
+            modelFieldList=model_fields,
+        ))
+    return sensor_configs
+
+
+def read_model_fields(db: Session) -> list:
+    rows = db.execute(
+        select(SensorConfig.id, SensorConfig.model_token, SensorConfig.model_field_overrides)
+        .where(SensorConfig.company_id == COMPANY_ID)
+    ).all()
+    templates = get_model_template_fields(db, company_id=COMPANY_ID, model_tokens=(row.model_token for row in rows))
+    return [
+        (row.id, merge_model_fields(templates[row.model_token], row.model_field_overrides)) for row in rows
+    ]
+
+
+def column_bytes(db: Session, column) -> int:
+    if db.get_bind().dialect.name == "postgresql":
+        size = func.pg_column_size(column)
+    else:
+        size = func.length(cast(column, LargeBinary))
+    return db.execute(select(func.coalesce(func.sum(size), 0))).scalar()
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sensors", type=int, default=10000)
+    parser.add_argument("--models", type=int, default=50)
+    parser.add_argument("--override-ratio", type=float, default=0.05)
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(engine)
+    legacy_metadata.create_all(engine)
+    sensor_configs = build_sensor_configs(args.sensors, build_models(args.models), args.override_ratio)
+    with Session(engine) as db:
+        db.execute(delete(SensorConfig))
+        db.execute(delete(ModelTemplate))
+        db.execute(delete(SensorConfigChangeLog))
+        db.execute(delete(legacy_sensor_configs))
+        crud.import_sensor_configs(db, company_id=COMPANY_ID, sensor_configs=sensor_configs, creator_id=1)
+        db.execute(legacy_sensor_configs.insert(), [
+            {"id": i, "model_fields": [field.model_dump() for field in sensor_config.modelFieldList]}
+            for i, sensor_config in enumerate(sensor_configs)
+        ])
+        db.commit()
+
+        legacy_bytes = column_bytes(db, legacy_sensor_configs.c.model_fields)
+        template_bytes = column_bytes(db, ModelTemplate.model_fields)
+        override_bytes = column_bytes(db, SensorConfig.model_field_overrides)
+        overridden = db.execute(
+            select(func.count()).where(SensorConfig.model_field_overrides.is_not(None))
+        ).scalar()
+
+        # 只比较读取并还原全部配置字段列表的耗时，不含两种布局相同的其他列和ORM开销
+        legacy_ms = timed(lambda: db.execute(select(legacy_sensor_configs)).all(), args.repeat)
+        template_ms = timed(lambda: read_model_fields(db), args.repeat)
+        # 与旧布局相比，当前布局返回的字段列表应完全相同
+        legacy = dict(db.execute(select(legacy_sensor_configs)).all())
+        current = {sensor_config.sensor_id: sensor_config.model_fields
+                   for sensor_config in crud.get_sensor_configs(db, company_id=COMPANY_ID)}
+        assert current == legacy, "合并后的物模型字段与原始数据不一致"
+
+    per_model = legacy_bytes / args.models
+    print(f"{args.sensors} sensors, {args.models} models, {overridden} overridden")
+    print(f"{'':<28} {'per-row fields':>15} {'templates':>15} {'ratio':>8}")
+    print(f"{'storage / list read (bytes)':<28} {legacy_bytes:>15} {template_bytes + override_bytes:>15}"
+          f" {(template_bytes + override_bytes) / legacy_bytes:>8.3f}")
+    print(f"{'field lists read (ms)':<28} {legacy_ms:>15.1f} {template_ms:>15.1f} {template_ms / legacy_ms:>8.3f}")
+    print(f"{'retune one model (bytes)':<28} {per_model:>15.0f} {template_bytes / args.models:>15.0f}"
+          f" {template_bytes / legacy_bytes:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+相同查询合并基准测试
+
+同一时刻到达 --concurrency 个相同的传感器配置列表查询（同一串口的设备同时唤醒），
+对比每个请求各自查询与合并相同查询时执行的SQL语句数和总耗时。合并时语句数应与并发数无关。
+
+用法:
+    python -m benchmarks.bench_query_coalescing
+    python -m benchmarks.bench_query_coalescing --concurrency 1,10,100,1000 --database-url postgresql://...
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, delete, event
+from sqlalchemy.orm import Session
+
+from app.api.v1.endpoints.config import load_sensor_config_list, render_sensor_config_response
+from app.core.notify import port_topic
+from app.core.result_cache import QueryCoalescer, make_digest
+from app.crud import sensor_config as crud
+from app.db.base import Base
+from app.db.session import SessionRunner
+from app.models.model_template import ModelTemplate
+from app.models.sensor_config import SensorConfig, SensorConfigChangeLog
+from app.schemas.sensor_config import SensorConfigCreate, SensorConfigQuery
+
+COMPANY_ID = 1
+QUERY = SensorConfigQuery(port="485-1", pageSize=100)
+
+
+def populate(engine, sensors: int) -> None:
+    with Session(engine) as db:
+        db.execute(delete(SensorConfig))
+        db.execute(delete(ModelTemplate))
+        db.execute(delete(SensorConfigChangeLog))
+        crud.import_sensor_configs(db, company_id=COMPANY_ID, creator_id=1, sensor_configs=[
+            SensorConfigCreate(
+                port=random.choice(["485-1", "485-2"]),
+                sensorID=i,
+                sensorName=f"传感器-{i:07d}",
+                modelToken=f"{i % 20:03d}",
+                modelName=f"物模型{i % 20}",
+                modelFieldList=[],
+            )
+            for i in range(sensors)
+        ])
+        db.commit()
+
+
+async def request(engine, connections: asyncio.Semaphore, coalescer) -> bytes:
+    async def render() -> bytes:
+        # 每次查询使用自己的会话，超过连接池大小的查询等待连接，与接口的请求级会话相同
+        async with connections:
+            db = SessionRunner(Session(engine))
+            try:
+                sensor_configs, total, next_cursor = await load_sensor_config_list(db, QUERY, COMPANY_ID)
+            finally:
+                await db.close()
+        return render_sensor_config_response(sensor_configs, total, next_cursor)
+
+    if coalescer is None:
+        return await render()
+    digest = make_digest(COMPANY_ID, QUERY.port, None, None, QUERY.pageSize, QUERY.pageNum,
+                         QUERY.cursor, QUERY.orderBy, QUERY.countMode)
+    return await coalescer.run(port_topic(COMPANY_ID, QUERY.port), digest, render)
+
+
+async def burst(engine, pool_size: int, concurrency: int, coalescer) -> float:
+    connections = asyncio.Semaphore(pool_size)
+    start = time.perf_counter()
+    bodies = await asyncio.gather(*(request(engine, connections, coalescer) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    assert len(set(bodies)) == 1, "合并后的响应与单独查询不一致"
+    return elapsed * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sensors", type=int, default=2000)
+    parser.add_argument("--concurrency", default="1,10,100,1000")
+    parser.add_argument("--pool-size", type=int, default=15, help="连接池大小，默认与DB_POOL_SIZE+DB_MAX_OVERFLOW相同")
+    parser.add_argument("--database-url", default=None, help="默认使用临时SQLite文件")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if database_url is None:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_engine(database_url, pool_size=args.pool_size, max_overflow=0)
+    Base.metadata.create_all(engine)
+    populate(engine, args.sensors)
+
+    statements = 0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_statement(*_) -> None:
+        nonlocal statements
+        statements += 1
+
+    print(f"{'concurrency':>12} {'statements':>12} {'coalesced':>12} {'ms':>10} {'coalesced ms':>14}")
+    for concurrency in [int(value) for value in args.concurrency.split(",")]:
+        statements = 0
+        separate_ms = asyncio.run(burst(engine, args.pool_size, concurrency, None))
+        separate = statements
+        statements = 0
+        coalesced_ms = asyncio.run(burst(engine, args.pool_size, concurrency, QueryCoalescer()))
+        print(f"{concurrency:>12} {separate:>12} {statements:>12} {separate_ms:>10.1f} {coalesced_ms:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
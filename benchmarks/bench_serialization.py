@@ -0,0 +1,119 @@
+"""
+传感器配置列表序列化基准测试
+
+对比默认路径（逐行构造SensorConfigInDB、包装ResponseModel、FastAPI按response_model再次校验后用json编码）
+与FAST_JSON_RESPONSE快速路径（数据库行直接生成JSON）在不同行数下的耗时，并校验两者输出逐字节一致。
+
+用法:
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --sizes 100,1000,10000 --repeat 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.api.v1.endpoints.config import convert_to_response_model, render_sensor_config_response
+from app.core import serialization
+from app.core.config import settings
+from app.models.sensor_config import SensorConfig
+from app.schemas.response import ResponseModel
+from app.schemas.sensor_config import SensorConfigResponse
+
+MODEL_FIELDS = [
+    {
+        "fieldName": f"通道{i}",
+        "engUnit": "kPa",
+        "hydrologicalIdentification": "PJ",
+        "collectionInstructions": "01 03 00 00 00 02 C4 0B",
+        "ratio": "1",
+        "dataFormat": "float",
+        "triggerValue": "0",
+        "upperLimit": "100",
+        "lowerLimit": "0",
+        "correctValue": "0",
+        "ngateval": "3",
+    }
+    for i in range(4)
+]
+
+
+def build_rows(size: int) -> list:
+    now = datetime(2024, 5, 1, 8, 30, tzinfo=timezone.utc)
+    return [
+        SensorConfig(
+            id=i + 1,
+            port="485-1" if i % 2 else "485-2",
+            sensor_id=i,
+            sensor_name=f"MD-VWP数字渗压计-{i:07d}",
+            model_token="214",
+            model_name="水位",
+            model_fields=MODEL_FIELDS,
+            creator_id=1,
+            created_at=now,
+            updater_id=1,
+            updated_at=now + timedelta(microseconds=i),
+        )
+        for i in range(size)
+    ]
+
+
+response_field = create_response_field(name="response", type_=ResponseModel[SensorConfigResponse])
+loop = asyncio.new_event_loop()
+
+
+def default_path(rows: list) -> bytes:
+    """
+    与端点返回ResponseModel时FastAPI的处理过程一致
+    """
+    response = ResponseModel[SensorConfigResponse](
+        data=SensorConfigResponse(
+            sensorList=[convert_to_response_model(row) for row in rows], total=len(rows)
+        )
+    )
+    content = loop.run_until_complete(serialize_response(field=response_field, response_content=response))
+    return JSONResponse(content=content).body
+
+
+def fast_path(rows: list) -> bytes:
+    settings.FAST_JSON_RESPONSE = True
+    try:
+        return render_sensor_config_response(rows, len(rows))
+    finally:
+        settings.FAST_JSON_RESPONSE = False
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    encoder = "orjson" if serialization.orjson is not None else "pydantic_core"
+    print(f"fast path encoder: {encoder}")
+    print(f"{'rows':>7} {'bytes':>10} {'default(ms)':>12} {'fast(ms)':>9} {'speedup':>8}")
+    for size in [int(size) for size in args.sizes.split(",")]:
+        rows = build_rows(size)
+        expected = default_path(rows)
+        assert fast_path(rows) == expected, "快速路径输出与默认路径不一致"
+        default_ms = timed(lambda: default_path(rows), args.repeat)
+        fast_ms = timed(lambda: fast_path(rows), args.repeat)
+        print(f"{size:>7} {len(expected):>10} {default_ms:>12.2f} {fast_ms:>9.2f} {default_ms / fast_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+worker启动时间基准测试
+
+启动uvicorn子进程，测量从进程启动到第一个请求返回的时间，对比STARTUP_MODE=development（启动时建表、
+查询默认用户，默认用户不存在时还会执行bcrypt）与production（启动时不访问数据库）。同时单独测量导入main的耗时。
+development模式需要DATABASE_URL指向可连接的数据库。
+
+用法:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --modes production --repeat 10 --path /metrics
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(env: dict) -> float:
+    """
+    在新进程中导入main，返回耗时秒数
+    """
+    code = "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_first_request(env: dict, path: str, timeout: float) -> Optional[float]:
+    """
+    启动uvicorn并轮询path，返回从启动到收到第一个HTTP响应的秒数，启动失败返回None
+
+    任何HTTP状态码（包括401）都说明请求已被处理
+    """
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                return None
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1).read()
+            except urllib.error.HTTPError:
+                pass
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.005)
+                continue
+            return time.perf_counter() - start
+        return None
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", default="development,production")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--path", default="/metrics", help="第一个请求的路径")
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    print(f"{'mode':>12} {'import(ms)':>11} {'first request(ms)':>18} {'min(ms)':>8} {'max(ms)':>8}")
+    for mode in args.modes.split(","):
+        env = {**os.environ, "STARTUP_MODE": mode}
+        import_ms = statistics.median(measure_import(env) for _ in range(args.repeat)) * 1000
+        samples = [measure_first_request(env, args.path, args.timeout) for _ in range(args.repeat)]
+        if any(sample is None for sample in samples):
+            print(f"{mode:>12} {import_ms:>11.0f} {'启动失败或超时':>18}")
+            continue
+        samples = [sample * 1000 for sample in samples]
+        print(
+            f"{mode:>12} {import_ms:>11.0f} {statistics.median(samples):>18.0f}"
+            f" {min(samples):>8.0f} {max(samples):>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
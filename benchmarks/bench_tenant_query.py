@@ -0,0 +1,105 @@
+"""
+按公司查询传感器配置的基准测试
+
+目标公司固定有 --tenant-rows 条配置，其余数据分散在其他公司中，总数据量逐步增大。
+按公司查询通过以company_id开头的索引只扫描该公司的索引范围，耗时应与总数据量无关；
+作为对比同时给出全表count的耗时。
+
+用法:
+    python -m benchmarks.bench_tenant_query
+    python -m benchmarks.bench_tenant_query --sizes 10000,100000 --database-url postgresql://...
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine, delete, func, select
+from sqlalchemy.orm import Session
+
+from app.crud import sensor_config as crud
+from app.db.base import Base
+from app.models.sensor_config import SensorConfig, SensorConfigChangeLog
+
+TENANT_ID = 1
+
+
+def populate(db: Session, size: int, tenant_rows: int, companies: int) -> None:
+    db.execute(delete(SensorConfig))
+    db.execute(delete(SensorConfigChangeLog))
+    db.add(SensorConfigChangeLog(id=1, revision=size, compacted_revision=0))
+    rows = []
+    for i in range(size):
+        # 前tenant_rows条属于目标公司，其余随机分配给其他公司
+        company_id = TENANT_ID if i < tenant_rows else random.randint(TENANT_ID + 1, companies)
+        rows.append({
+            "company_id": company_id,
+            "port": random.choice(["485-1", "485-2"]),
+            "sensor_id": i,
+            "sensor_name": f"传感器-{i:07d}",
+            "model_token": "214",
+            "model_name": "水位",
+            "creator_id": 1,
+            "updater_id": 1,
+            "revision": i + 1,
+        })
+    # 打乱插入顺序，目标公司的数据分散在整张表中
+    random.shuffle(rows)
+    for start in range(0, size, 50000):
+        db.execute(SensorConfig.__table__.insert(), rows[start:start + 50000])
+    db.commit()
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--tenant-rows", type=int, default=500)
+    parser.add_argument("--companies", type=int, default=200)
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.create_all(engine)
+    print(
+        f"{'rows':>9} {'first page(ms)':>15} {'next page(ms)':>14} {'port list(ms)':>14}"
+        f" {'tenant count(ms)':>17} {'changes(ms)':>12} {'table count(ms)':>16}"
+    )
+    for size in [int(size) for size in args.sizes.split(",")]:
+        with Session(engine) as db:
+            populate(db, size, args.tenant_rows, args.companies)
+            if engine.dialect.name == "postgresql":
+                db.connection().exec_driver_sql("ANALYZE sensor_configs")
+
+            _, cursor = crud.get_sensor_config_page(db, company_id=TENANT_ID, page_size=20)
+            results = [
+                timed(lambda: crud.get_sensor_config_page(db, company_id=TENANT_ID, page_size=20), args.repeat),
+                timed(
+                    lambda: crud.get_sensor_config_page(db, company_id=TENANT_ID, page_size=20, cursor=cursor),
+                    args.repeat,
+                ),
+                timed(lambda: crud.get_sensor_configs(db, company_id=TENANT_ID, port="485-1"), args.repeat),
+                timed(lambda: crud.count_sensor_configs(db, company_id=TENANT_ID), args.repeat),
+                timed(
+                    lambda: crud.get_sensor_config_changes(db, company_id=TENANT_ID, since=size // 2),
+                    args.repeat,
+                ),
+                timed(lambda: db.execute(select(func.count()).select_from(SensorConfig)).scalar(), args.repeat),
+            ]
+            print(
+                f"{size:>9} {results[0]:>15.2f} {results[1]:>14.2f} {results[2]:>14.2f}"
+                f" {results[3]:>17.2f} {results[4]:>12.2f} {results[5]:>16.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,23 @@
+import asyncio
 import logging
 
 import uvicorn
 from fastapi import FastAPI, Request, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.orm import Session
 
 from app.api.v1.api import api_router
+from app.core.admission import build_admission_budgets, create_admission_store
 from app.core.config import settings
+from app.core.metrics import collect_metrics, metrics_flush_loop
+from app.core.notify import start_notifications, stop_notifications
+from app.core.security import shutdown_password_executor
 from app.db.init_db import init_db
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, async_engine, engine
+from app.middleware.admission import AdmissionControlMiddleware
 from app.middleware.cors import setup_cors_middleware
-from app.middleware.logging import LoggingMiddleware
+from app.middleware.logging import LoggingMiddleware, start_access_log, stop_access_log
+from app.middleware.metrics import MetricsMiddleware
 
 # 配置日志
 logging.basicConfig(
@@ -26,12 +33,20 @@ app = FastAPI(
     version="1.0.0",
 )
 
+# 添加准入控制中间件，位于CORS之内，拒绝的响应同样带跨域头，并计入访问日志和指标
+admission_store = create_admission_store()
+if admission_store is not None:
+    app.add_middleware(AdmissionControlMiddleware, store=admission_store, budgets=build_admission_budgets())
+
 # 设置CORS中间件
 setup_cors_middleware(app)
 
 # 添加日志中间件
 app.add_middleware(LoggingMiddleware)
 
+# 添加指标中间件
+app.add_middleware(MetricsMiddleware)
+
 # 认证错误处理
 @app.exception_handler(status.HTTP_401_UNAUTHORIZED)
 async def unauthorized_exception_handler(request: Request, exc: HTTPException):
@@ -74,14 +89,50 @@ async def global_exception_handler(request: Request, exc: Exception):
 # 添加API路由
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
-# 初始化数据库
+
+# Prometheus指标
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(await collect_metrics(), media_type="text/plain; version=0.0.4")
+
+
+# 初始化数据库，生产模式下由部署流程执行迁移和创建默认用户，worker启动时不访问数据库
 @app.on_event("startup")
 def startup_event():
+    start_access_log()
+    if settings.STARTUP_MODE == "production":
+        return
+    db: Session = SessionLocal()
     try:
-        db: Session = SessionLocal()
         init_db(db)
     finally:
         db.close()
 
+
+# 多worker部署时启动指标文件定期写入任务
+@app.on_event("startup")
+async def start_metrics_flush():
+    if settings.METRICS_MULTIPROC_DIR:
+        app.state.metrics_flush_task = asyncio.create_task(metrics_flush_loop())
+
+
+# 启动配置变更通知，PostgreSQL下监听其他worker和主机提交的变更
+@app.on_event("startup")
+async def start_change_notifications():
+    start_notifications(engine.dialect.name)
+
+
+# 停止访问日志写入线程，释放异步数据库连接池和密码哈希进程池
+@app.on_event("shutdown")
+async def shutdown_event():
+    stop_access_log()
+    shutdown_password_executor()
+    stop_notifications()
+    flush_task = getattr(app.state, "metrics_flush_task", None)
+    if flush_task is not None:
+        flush_task.cancel()
+    if async_engine is not None:
+        await async_engine.dispose()
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,21 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.crud import sensor_config as crud
+from app.db.base import Base
+
+
+@pytest.fixture
+def db():
+    """
+    内存SQLite会话，每个测试独立建表
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+    # 进程内名称索引按配置ID保存，不带到使用新数据库的下一个测试
+    crud.sensor_name_indexes.clear()
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from app.crud.sensor_config import (get_sensor_configs, import_sensor_configs, rebuild_sensor_config_bundles,
+                                    update_model_template)
+from app.schemas.model_template import ModelTemplateUpdate
+from app.schemas.sensor_config import SensorConfigCreate
+
+COMPANY_ID = 1
+
+
+def model_field(name: str, upper_limit: str = "100") -> dict:
+    return {
+        "fieldName": name,
+        "engUnit": "m",
+        "hydrologicalIdentification": "PJ",
+        "collectionInstructions": "0103",
+        "ratio": "1",
+        "dataFormat": "浮点型ABCD",
+        "triggerValue": "0",
+        "upperLimit": upper_limit,
+        "lowerLimit": "0",
+        "correctValue": "0",
+        "ngateval": "3",
+    }
+
+
+def import_configs(db, field_lists) -> None:
+    imported, errors = import_sensor_configs(db, company_id=COMPANY_ID, creator_id=1, sensor_configs=[
+        SensorConfigCreate(
+            port="485-1", sensorID=i, sensorName=f"sensor{i}", modelToken="214", modelName="水位",
+            modelFieldList=fields,
+        )
+        for i, fields in enumerate(field_lists)
+    ])
+    assert errors == []
+
+
+def edit_template(db, fields) -> int:
+    return update_model_template(
+        db,
+        company_id=COMPANY_ID,
+        model_template=ModelTemplateUpdate(modelToken="214", modelName="水位", modelFieldList=fields),
+        updater_id=1,
+    )
+
+
+def current_fields(db) -> dict:
+    return {config.sensor_id: config.model_fields for config in get_sensor_configs(db, company_id=COMPANY_ID)}
+
+
+def bundle_field_names(db) -> dict:
+    revision, contents = rebuild_sensor_config_bundles(db, company_id=COMPANY_ID, ports=["485-1"])["485-1"]
+    bundle = json.loads(contents[("json", "identity")])
+    name_index = bundle["fieldKeys"].index("fieldName")
+    return {sensor[1]: [field[name_index] for field in sensor[5]] for sensor in bundle["sensors"]}
+
+
+def field_names(fields: dict) -> dict:
+    return {sensor_id: [field["fieldName"] for field in model_fields] for sensor_id, model_fields in fields.items()}
+
+
+@pytest.fixture
+def configs(db):
+    template = [model_field("水深"), model_field("温度")]
+    import_configs(db, [
+        template,
+        template,
+        # 修改了一个属性
+        [model_field("水深", "50"), model_field("温度")],
+        # 比模板多一个字段
+        [*template, model_field("电压")],
+        # 比模板少一个字段
+        [model_field("水深")],
+    ])
+    return template
+
+
+def test_edit_template_to_fewer_fields(db, configs):
+    assert edit_template(db, [model_field("水深", "200")]) == 5
+
+    fields = current_fields(db)
+    assert fields[0] == [model_field("水深", "200")]
+    # 与模板字段数相同的配置随模板减少字段，差异保留
+    assert fields[2] == [model_field("水深", "50")]
+    # 字段数与模板不同的配置保持原字段数，超出新模板的字段保留完整属性
+    assert fields[3] == [model_field("水深", "200"), model_field("温度"), model_field("电压")]
+    assert fields[4] == [model_field("水深", "200")]
+    assert bundle_field_names(db) == field_names(fields)
+
+
+def test_edit_template_to_more_fields(db, configs):
+    new_template = [*configs, model_field("流量")]
+    assert edit_template(db, new_template) == 5
+
+    fields = current_fields(db)
+    assert fields[0] == new_template
+    assert fields[2] == [model_field("水深", "50"), model_field("温度"), model_field("流量")]
+    assert fields[3] == [*configs, model_field("电压")]
+    assert fields[4] == [model_field("水深")]
+    assert bundle_field_names(db) == field_names(fields)
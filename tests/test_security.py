@@ -0,0 +1,30 @@
+import asyncio
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.core import security
+
+
+class BrokenExecutor(Executor):
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, fn, *args, **kwargs):
+        raise BrokenProcessPool("子进程异常退出")
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_broken_password_pool_is_replaced(monkeypatch):
+    broken = BrokenExecutor()
+    monkeypatch.setattr(security, "_password_executor", broken)
+
+    with pytest.raises(security.PasswordHasherBusyError):
+        asyncio.run(security.verify_password_async("password", "hash"))
+
+    assert broken.shut_down
+    assert security._password_executor is None
+    assert security._password_tasks == 0
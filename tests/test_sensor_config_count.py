@@ -0,0 +1,43 @@
+from sqlalchemy import create_mock_engine, select
+from sqlalchemy.dialects.postgresql import psycopg2
+from sqlalchemy.orm import Session
+
+from app.crud.sensor_config import _filter_sensor_configs, count_sensor_configs, import_sensor_configs
+from app.db.explain import ExplainJSON
+from app.models.sensor_config import SensorConfig
+from app.schemas.sensor_config import SensorConfigCreate
+
+COMPANY_ID = 1
+SENSOR_NAME = "a :b 50%"
+
+
+def test_approximate_count_binds_user_input_as_parameters():
+    # 只编译不执行，检查EXPLAIN语句中的用户输入都是绑定参数
+    db = Session(bind=create_mock_engine("postgresql+psycopg2://", lambda *args, **kwargs: None))
+    stmt = _filter_sensor_configs(
+        db, select(SensorConfig.id), company_id=COMPANY_ID, sensor_name=SENSOR_NAME,
+        model_field={"fieldName": "水深:%"},
+    )
+    compiled = ExplainJSON(stmt).compile(dialect=psycopg2.dialect())
+
+    sql = str(compiled)
+    assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert "a :b" not in sql and "水深" not in sql
+    assert compiled.params["sensor_name_1"] == f"%{SENSOR_NAME}%"
+    assert [{"fieldName": "水深:%"}] in compiled.params.values()
+    assert "b" not in compiled.params
+
+
+def test_count_with_colon_and_percent_in_sensor_name(db):
+    imported, errors = import_sensor_configs(db, company_id=COMPANY_ID, creator_id=1, sensor_configs=[
+        SensorConfigCreate(
+            port="485-1", sensorID=i, sensorName=name, modelToken="214", modelName="水位", modelFieldList=[],
+        )
+        for i, name in enumerate(["a :b 50%", "xa :b 50%y", "a b 50"])
+    ])
+    assert errors == []
+
+    for approximate in (False, True):
+        assert count_sensor_configs(
+            db, company_id=COMPANY_ID, sensor_name=SENSOR_NAME, approximate=approximate
+        ) == 2
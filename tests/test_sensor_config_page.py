@@ -0,0 +1,49 @@
+from sqlalchemy import text, update
+
+from app.crud.sensor_config import get_sensor_config_page, import_sensor_configs
+from app.models.sensor_config import SensorConfig
+from app.schemas.sensor_config import SensorConfigCreate
+
+COMPANY_ID = 1
+
+
+def import_configs(db, count: int) -> None:
+    imported, errors = import_sensor_configs(db, company_id=COMPANY_ID, creator_id=1, sensor_configs=[
+        SensorConfigCreate(
+            port="485-1", sensorID=i, sensorName=f"sensor{i}", modelToken="214", modelName="水位", modelFieldList=[],
+        )
+        for i in range(count)
+    ])
+    assert imported == count
+
+
+def page_through(db, page_size: int, order_by: str) -> list:
+    pages = []
+    cursor = None
+    while True:
+        sensor_configs, cursor = get_sensor_config_page(
+            db, company_id=COMPANY_ID, page_size=page_size, cursor=cursor, order_by=order_by
+        )
+        pages.append([sensor_config.sensor_id for sensor_config in sensor_configs])
+        if cursor is None:
+            return pages
+
+
+def test_update_time_cursor_pages_through_rows_with_same_timestamp(db):
+    import_configs(db, 3)
+    # 与CURRENT_TIMESTAMP写入的格式相同，不带小数秒
+    db.execute(update(SensorConfig).values(updated_at=text("'2026-10-18 10:00:30'")))
+    db.commit()
+
+    assert page_through(db, 1, "updateTime") == [[0], [1], [2]]
+
+
+def test_update_time_cursor_orders_by_timestamp_then_id(db):
+    import_configs(db, 4)
+    db.execute(update(SensorConfig).values(updated_at=text("'2026-10-18 10:00:30'")))
+    db.execute(
+        update(SensorConfig).where(SensorConfig.sensor_id == 0).values(updated_at=text("'2026-10-18 10:00:31'"))
+    )
+    db.commit()
+
+    assert page_through(db, 2, "updateTime") == [[1, 2], [3, 0]]
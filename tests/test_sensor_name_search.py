@@ -0,0 +1,47 @@
+from sqlalchemy import update
+
+from app.crud.sensor_config import get_sensor_configs, import_sensor_configs
+from app.models.sensor_config import SensorConfig
+from app.schemas.sensor_config import SensorConfigCreate
+
+
+def import_configs(db, company_id: int, names) -> None:
+    imported, errors = import_sensor_configs(db, company_id=company_id, creator_id=1, sensor_configs=[
+        SensorConfigCreate(
+            port="485-1", sensorID=i, sensorName=name, modelToken="214", modelName="水位", modelFieldList=[],
+        )
+        for i, name in enumerate(names)
+    ])
+    assert errors == []
+
+
+def search(db, company_id: int, sensor_name: str) -> list:
+    return sorted(
+        config.sensor_name for config in get_sensor_configs(db, company_id=company_id, sensor_name=sensor_name)
+    )
+
+
+def test_search_is_scoped_to_company(db):
+    import_configs(db, 1, ["渗压计-001", "雨量计-001"])
+    import_configs(db, 2, ["渗压计-002"])
+
+    assert search(db, 1, "渗压计") == ["渗压计-001"]
+    assert search(db, 2, "渗压计") == ["渗压计-002"]
+
+
+def test_database_rechecks_stale_index(db):
+    import_configs(db, 1, ["渗压计-001", "雨量计-001"])
+    assert search(db, 1, "渗压计") == ["渗压计-001"]
+
+    # 其他进程的写入不会同步到本进程的索引
+    db.execute(update(SensorConfig).where(SensorConfig.sensor_name == "渗压计-001").values(sensor_name="水位计-001"))
+    db.commit()
+
+    assert search(db, 1, "渗压计") == []
+
+
+def test_wildcards_follow_ilike(db):
+    import_configs(db, 1, ["MD-VWP渗压计", "MD_VWP渗压计", "MD%VWP渗压计"])
+
+    assert search(db, 1, "MD%VWP") == ["MD%VWP渗压计", "MD-VWP渗压计", "MD_VWP渗压计"]
+    assert search(db, 1, "MD_VWP") == ["MD%VWP渗压计", "MD-VWP渗压计", "MD_VWP渗压计"]